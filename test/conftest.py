@@ -0,0 +1,20 @@
+# pytest configuration of the tests of the python analysis tools (tools/analysis)
+# the tools are imported as the package petar from a temporary directory with a symbolic link to tools/analysis, the same layout as the installed package
+import os
+import sys
+import tempfile
+import pytest
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOOLS_PATH = os.path.join(ROOT_PATH, 'tools')
+PACKAGE_PATH = tempfile.mkdtemp(prefix='petar_test_')
+os.symlink(os.path.join(TOOLS_PATH, 'analysis'), os.path.join(PACKAGE_PATH, 'petar'))
+sys.path.insert(0, PACKAGE_PATH)
+
+@pytest.fixture
+def tool_env():
+    """ Environment variables to run the command line tools in tools/ by subprocess
+    """
+    env = os.environ.copy()
+    env['PYTHONPATH'] = PACKAGE_PATH + os.pathsep + env.get('PYTHONPATH', '')
+    return env
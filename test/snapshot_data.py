@@ -0,0 +1,58 @@
+# synthetic snapshots for the tests of the python analysis tools
+import numpy as np
+import petar
+
+def createParticles(n_single=200, n_binary=20, n_escaper=4, seed=1):
+    """ Create a star cluster with singles, binaries with a range of separations and a few single and one binary escapers far away (G=1)
+
+    Return
+    ----------
+    particles: petar.Particle (interrupt_mode = none)
+    """
+    rng = np.random.default_rng(seed)
+    n = n_single + 2*n_binary + n_escaper
+    particles = petar.Particle(np.zeros((n, petar.Particle().ncols)))
+    particles.mass[:] = 1.0/n
+    r = rng.uniform(0.1, 2.0, n)
+    direction = rng.normal(size=(n,3))
+    direction /= np.sqrt(np.sum(direction**2, axis=1))[:,None]
+    particles.pos[:] = direction*r[:,None]
+    particles.vel[:] = rng.normal(scale=0.3, size=(n,3))
+    # binary members: the second component is placed around the first one with a circular velocity
+    i1 = n_single + 2*np.arange(n_binary)
+    i2 = i1 + 1
+    semi = np.logspace(-3, np.log10(0.3), n_binary)
+    offset = rng.normal(size=(n_binary,3))
+    offset /= np.sqrt(np.sum(offset**2, axis=1))[:,None]
+    vdir = np.cross(offset, rng.normal(size=(n_binary,3)))
+    vdir /= np.sqrt(np.sum(vdir**2, axis=1))[:,None]
+    vcir = np.sqrt(2.0/n/semi)
+    particles.pos[i2] = particles.pos[i1] + offset*semi[:,None]
+    particles.vel[i2] = particles.vel[i1] + vdir*vcir[:,None]
+    # escapers: far away and fast
+    iesc = np.arange(n-n_escaper, n)
+    particles.pos[iesc] = direction[iesc]*100.0
+    particles.vel[iesc] = direction[iesc]*5.0
+    # the first binary also escapes
+    particles.pos[[i1[0],i2[0]]] += direction[i1[0]]*100.0
+    particles.vel[[i1[0],i2[0]]] += direction[i1[0]]*5.0
+    particles.id[:] = np.arange(1, n+1)
+    particles.r_search[:] = 0.01
+    return particles
+
+def writeSnapshots(path, n_snap=4, dt=0.25, **kwargs):
+    """ Write snapshots [path]/data.[file id] with the PeTar header, the particles are drifted by the velocities
+
+    Return
+    ----------
+    path_list: list
+        snapshot paths
+    """
+    particles = createParticles(**kwargs)
+    path_list = []
+    for i in range(n_snap):
+        file_path = str(path) + '/data.' + str(i)
+        np.savetxt(file_path, particles.getherDataToArray(), header='%d %d %.17e' % (i, particles.size, i*dt), comments='')
+        path_list.append(file_path)
+        particles.pos += particles.vel*dt
+    return path_list
@@ -0,0 +1,38 @@
+# SnapshotWatcher finds the snapshots completely written by a running petar
+import numpy as np
+import petar
+from snapshot_data import writeSnapshots
+
+def test_is_complete(tmp_path):
+    file_path = writeSnapshots(tmp_path, n_snap=1)[0]
+    text = open(file_path).read()
+    assert petar.SnapshotWatcher.isComplete(file_path)
+    for name, content in [('cut_line', text[:-10]), ('cut_newline', text[:-1]), ('empty', ''), ('no_header', text[text.index('\n')+1:]),
+                          ('extra_line', text + text.splitlines(True)[1]), ('bad_header', 'a b c\n' + text[text.index('\n')+1:])]:
+        with open(tmp_path/name, 'w') as f: f.write(content)
+        assert not petar.SnapshotWatcher.isComplete(str(tmp_path/name)), name
+
+def test_poll(tmp_path, monkeypatch):
+    path_list = writeSnapshots(tmp_path, n_snap=2)
+    text = open(path_list[1]).read()
+    with open(path_list[1], 'w') as f: f.write(text[:len(text)//2])
+    n_check = []
+    is_complete = petar.SnapshotWatcher.isComplete
+    monkeypatch.setattr(petar.SnapshotWatcher, 'isComplete', staticmethod(lambda file_path: n_check.append(file_path) or is_complete(file_path)))
+
+    watcher = petar.SnapshotWatcher(str(tmp_path/'data'), stable_time=0.0)
+    assert watcher.poll() == []
+    assert sorted(watcher.pending.keys()) == path_list
+    assert watcher.poll() == [path_list[0]]
+    # the incomplete snapshot is not read again until it is modified
+    assert list(watcher.failed.keys()) == [path_list[1]]
+    assert len(watcher.pending) == 0
+    for i in range(3): assert watcher.poll() == []
+    assert sorted(n_check) == path_list
+
+    with open(path_list[1], 'w') as f: f.write(text)
+    assert watcher.poll() == []
+    assert list(watcher.pending.keys()) == [path_list[1]]
+    assert watcher.poll() == [path_list[1]]
+    assert len(watcher.failed) == 0
+    assert watcher.completed == set(path_list)
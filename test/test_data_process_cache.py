@@ -0,0 +1,24 @@
+# the cache of petar.data.process gives the same results as processing the snapshots again
+import os
+import subprocess
+import sys
+import filecmp
+import pytest
+from conftest import TOOLS_PATH
+from snapshot_data import writeSnapshots
+
+def runProcess(env, cwd, *args):
+    subprocess.run([sys.executable, os.path.join(TOOLS_PATH, 'data_process.py'), '-n', '1'] + list(args), cwd=cwd, env=env, check=True, stdout=subprocess.DEVNULL)
+
+# with r_max_binary = 1e-6, no binary is found and the .binary files are empty
+@pytest.mark.parametrize('r_bin', ['1e-6', '0.05'])
+def test_cache_reuse(tmp_path, tool_env, r_bin):
+    path_list = writeSnapshots(tmp_path)
+    with open(tmp_path/'snap.lst', 'w') as f:
+        for path in path_list: f.write(path+'\n')
+    runProcess(tool_env, tmp_path, '--cache', '-b', r_bin, 'snap.lst')
+    for key in ['lagr', 'esc_single', 'esc_binary']:
+        os.rename(tmp_path/('data.'+key), tmp_path/('first.'+key))
+    runProcess(tool_env, tmp_path, '--cache', '-b', r_bin, 'snap.lst')
+    for key in ['lagr', 'esc_single', 'esc_binary']:
+        assert filecmp.cmp(tmp_path/('data.'+key), tmp_path/('first.'+key), shallow=False), key
@@ -0,0 +1,33 @@
+# additional configurations of petar.data.process (--config-file) should give the same results as standalone runs
+import os
+import subprocess
+import sys
+import filecmp
+import pytest
+import petar
+from conftest import TOOLS_PATH
+from snapshot_data import writeSnapshots
+
+def runProcess(env, cwd, *args):
+    subprocess.run([sys.executable, os.path.join(TOOLS_PATH, 'data_process.py'), '-n', '1'] + list(args), cwd=cwd, env=env, check=True, stdout=subprocess.DEVNULL)
+
+@pytest.mark.parametrize('r_bin_config', [[0.01, 0.5], [0.5], [0.01]])
+def test_config_file_same_as_standalone(tmp_path, tool_env, r_bin_config):
+    path_list = writeSnapshots(tmp_path)
+    with open(tmp_path/'snap.lst', 'w') as f:
+        for path in path_list: f.write(path+'\n')
+    with open(tmp_path/'config.txt', 'w') as f:
+        for i, r_bin in enumerate(r_bin_config): f.write('-p cfg%d -b %g\n' % (i, r_bin))
+    runProcess(tool_env, tmp_path, '-p', 'main', '-b', '0.1', '--config-file', 'config.txt', 'snap.lst')
+    for i, r_bin in enumerate(r_bin_config):
+        runProcess(tool_env, tmp_path, '-p', 'solo%d' % i, '-b', str(r_bin), 'snap.lst')
+        for key in ['lagr', 'esc_single', 'esc_binary']:
+            assert filecmp.cmp(tmp_path/('cfg%d.%s' % (i, key)), tmp_path/('solo%d.%s' % (i, key)), shallow=False), key
+
+def test_configs_api_same_as_standalone(tmp_path):
+    path_list = writeSnapshots(tmp_path)
+    result, profile = petar.dataProcessList(path_list, False, configs=[dict(filename_prefix='y', r_max_binary=0.01)], filename_prefix='x', r_max_binary=0.1)
+    config_result = result['configs'][0][1]
+    solo, profile = petar.dataProcessList(path_list, False, filename_prefix='z', r_max_binary=0.01)
+    for key in ['lagr', 'esc_single', 'esc_binary']:
+        assert (config_result[key].getherDataToArray() == solo[key].getherDataToArray()).all(), key
@@ -0,0 +1,24 @@
+# the resume mode of petar.data.process appends the results and the profile of new snapshots
+import os
+import subprocess
+import sys
+import petar
+from conftest import TOOLS_PATH
+from snapshot_data import writeSnapshots
+
+def runProcess(env, cwd, path_list):
+    with open(os.path.join(cwd, 'snap.lst'), 'w') as f:
+        for path in path_list: f.write(path+'\n')
+    subprocess.run([sys.executable, os.path.join(TOOLS_PATH, 'data_process.py'), '-n', '1', '-b', '0.1', '--resume', 'snap.lst'], cwd=cwd, env=env, check=True, stdout=subprocess.DEVNULL)
+
+def test_resume(tmp_path, tool_env):
+    path_list = writeSnapshots(tmp_path)
+    runProcess(tool_env, tmp_path, path_list[:2])
+    runProcess(tool_env, tmp_path, path_list)
+    lagr = petar.LagrangianMultiple()
+    lagr.loadtxt(tmp_path/'data.lagr')
+    prof = petar.ProcessProfile()
+    prof.loadtxt(tmp_path/'data.process_prof')
+    assert lagr.size == len(path_list)
+    assert prof.size == len(path_list)
+    assert (prof.time == lagr.time).all()
@@ -0,0 +1,62 @@
+# tests of petar.find.dt (TreeStepOptimizer) with the stub petar executable (stub_petar)
+import os
+import sys
+import numpy as np
+import pytest
+import petar
+from conftest import PACKAGE_PATH
+from snapshot_data import writeSnapshots
+
+STUB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stub_petar')
+
+@pytest.fixture
+def stub_env(monkeypatch):
+    """ Environment of the stub petar, the optimizer copies the environment at the initialization
+    """
+    monkeypatch.setenv('PYTHONPATH', PACKAGE_PATH + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    monkeypatch.setenv('STUB_DT_BEST', repr(0.5**5))
+    monkeypatch.delenv('OMP_NUM_THREADS', raising=False)
+
+def createOptimizer(path, **kwargs):
+    filename = writeSnapshots(path, n_snap=1)[0]
+    return petar.TreeStepOptimizer(filename, STUB_PATH, prefix=sys.executable, work_dir=str(path/'find_dt'), n_step=2, **kwargs)
+
+def test_search(tmp_path, stub_env):
+    optimizer = createOptimizer(tmp_path)
+    best = optimizer.search(None, [0.3, 0.6], 3)
+    assert sorted(best.keys()) == [0.3, 0.6]
+    for theta, res in best.items():
+        assert res.flag[0] == 0
+        assert res.dt_soft[0] == 0.5**5
+        assert res.theta[0] == theta
+        assert res.cost[0] == pytest.approx(2.0*0.3/theta)
+        assert res.error_sd[0] == pytest.approx(0.5**5*theta)
+    assert (optimizer.results.flag==0).all()
+    # golden-section search does not evaluate all steps in the range
+    assert optimizer.results.size < 2*7
+
+def test_omp_threads(tmp_path, stub_env):
+    assert not 'OMP_NUM_THREADS' in createOptimizer(tmp_path).env.keys()
+    assert createOptimizer(tmp_path, n_omp=2).env['OMP_NUM_THREADS'] == '2'
+
+def test_kill_slow_run(tmp_path, stub_env, monkeypatch):
+    monkeypatch.setenv('STUB_SLEEP', '1.0')
+    optimizer = createOptimizer(tmp_path, n_core=1, kill_factor=0.1)
+    assert optimizer.n_parallel == 1
+    # the best step runs first, then the run with dt_soft = 0.5 (16 s) exceeds the time limit
+    optimizer.evaluate([(5, 0.3), (1, 0.3)])
+    fast = optimizer.cache[(5, 0.3)]
+    slow = optimizer.cache[(1, 0.3)]
+    assert fast.flag[0] == 0
+    assert slow.flag[0] == 1
+    assert slow.wallclock[0] < 8.0
+    assert optimizer._cost((1, 0.3)) == np.inf
+
+def test_pareto_front():
+    res = petar.TreeStepResult(np.zeros((6, petar.TreeStepResult().ncols)))
+    res.cost[:] = [1.0, 2.0, 3.0, 1.5, 0.5, 0.8]
+    res.error_sd[:] = [1e-3, 1e-4, 1e-5, 1e-3, 1e-6, np.nan]
+    res.flag[:] = [0, 0, 0, 0, 1, 0]
+    front = res.findParetoFront()
+    # run 3 is slower than run 0 with the same error, run 4 is terminated, run 5 has no error
+    assert front.tolist() == [True, True, True, False, False, False]
@@ -0,0 +1,64 @@
+# getherData merges the files of MPI ranks in the time order and splits the records by size and type
+import numpy as np
+import petar
+
+def recordLine(prefix, n, itime, time, rank):
+    words = ['%d' % (rank*100+k) for k in range(n)]
+    words[itime] = '%.17g' % time
+    return ' '.join(([prefix] if prefix!='' else []) + words) + '\n'
+
+def writeRankFiles(path, n_rank=2, n_row=5):
+    """ Write rank files with interleaved times, return the expected records of each suffix and split output in the time order
+    """
+    expected = dict()
+    def add(key, time, rank, i, line):
+        expected.setdefault(key, []).append((time, rank, i, line))
+    for rank in range(n_rank):
+        times = 0.1*np.arange(n_row) + 0.03*rank
+        esc = ['time mass pos vel\n']
+        group = []
+        sse = []
+        bse = []
+        for i, t in enumerate(times):
+            line = recordLine('', 4, 0, t, rank)
+            esc.append(line)
+            add('esc', t, rank, i+1, line)
+            n_member = 2 + i%2
+            line = ('%d %d ' % (rank, n_member)) + recordLine('', 3, 0, t, rank)
+            group.append(line)
+            add('group', t, rank, i, line)
+            add('group.n%d' % n_member, t, rank, i, line)
+            for prefix, suffix, n, itime in [('Type_change', 'type_change', 25, 19), ('SN_kick', 'sn_kick', 15, 10)]:
+                line = recordLine(prefix, n, itime, t, rank)
+                sse.append(line)
+                add('sse', t, rank, len(sse)-1, line)
+                add('sse.'+suffix, t, rank, len(sse)-1, line.split(' ',1)[1])
+            for prefix, suffix, n, itime in [('Dynamic_merge:', 'dynamic_merge', 30, 18), ('SN_kick', 'sn_kick', 20, 12), ('Wide', 'type_change', 20, 11)]:
+                line = recordLine(prefix, n, itime, t, rank)
+                bse.append(line)
+                add('bse', t, rank, len(bse)-1, line)
+                add('bse.'+suffix, t, rank, len(bse)-1, line.split(' ',1)[1])
+        for suffix, lines in [('esc', esc), ('group', group), ('sse', sse), ('bse', bse)]:
+            with open(str(path)+'/data.'+suffix+'.'+str(rank), 'w') as f:
+                f.write(''.join(lines))
+    for key in expected.keys():
+        expected[key] = ''.join([line for t, rank, i, line in sorted(expected[key])])
+    expected['esc'] = 'time mass pos vel\n' + expected['esc']
+    return expected
+
+def test_gether(tmp_path):
+    expected = writeRankFiles(tmp_path)
+    for i in range(3): open(str(tmp_path)+'/data.'+str(i*2), 'w').close()
+    output_list = petar.getherData(str(tmp_path/'data'), str(tmp_path/'out'), n_cpu=2)
+    assert sorted(output_list) == sorted([str(tmp_path)+'/out.'+key for key in expected.keys()] + [str(tmp_path)+'/out.snap.lst'])
+    for key, text in expected.items():
+        assert open(str(tmp_path)+'/out.'+key).read() == text, key
+    assert open(str(tmp_path)+'/out.snap.lst').read().split() == [str(tmp_path)+'/data.'+str(i) for i in [0, 2, 4]]
+
+def test_gether_n_rank(tmp_path):
+    writeRankFiles(tmp_path, n_rank=3)
+    output_list = petar.getherData(str(tmp_path/'data'), suffixes=['esc'], n_rank=2, n_cpu=1)
+    lines = open(str(tmp_path)+'/data.esc').read().splitlines()
+    assert len(lines) == 1 + 2*5
+    # only the first two ranks are merged
+    assert all([int(line.split()[1])//100 < 2 for line in lines[1:]])
@@ -0,0 +1,118 @@
+# GroupLog reads raw group logs with different numbers of members and selects rows by time, GroupInfo extracts the hierarchical orbit pairs
+import numpy as np
+import pytest
+import petar
+
+def writeGroupLogs(path, n_file=2, n_row=20, seed=1):
+    """ Write raw group logs with 2 and 3 members in random order of times, return the rows of each file
+    """
+    rng = np.random.default_rng(seed)
+    file_list = []
+    rows = []
+    for ifile in range(n_file):
+        filename = str(path)+'/data.group.'+str(ifile)
+        lines = []
+        for i in range(n_row):
+            n = 2 + (i%3==0)
+            dat = rng.uniform(0, 1, petar.GroupInfo(N=n).ncols)
+            dat[1] = n
+            dat[2] = np.round(rng.uniform(0, 10), 1)
+            lines.append(' '.join(['%.17g' % x for x in dat]) + '\n')
+            rows.append(dat)
+        with open(filename, 'w') as f:
+            # an incomplete last line of a running simulation
+            f.write(''.join(lines) + lines[0][:30])
+        file_list.append(filename)
+    return file_list, rows
+
+def sameRow(a, b):
+    return (a.size==b.size) and (a==b).all()
+
+def checkRows(log, rows):
+    assert log.size == len(rows)
+    assert (np.diff(log.time)>=0).all()
+    for t, n, i in zip(log.time, log.n, log.index):
+        row = log[n].getherDataToArray()[int(i)]
+        assert row[2] == t
+        assert any([sameRow(row, dat) for dat in rows])
+
+def test_group_log(tmp_path):
+    file_list, rows = writeGroupLogs(tmp_path)
+    log = petar.GroupLog(file_list)
+    assert sorted(log.keys()) == [2, 3]
+    for n in [2, 3]:
+        dat = np.array([row for row in rows if row[1]==n])
+        assert (log[n].getherDataToArray() == dat).all()
+    checkRows(log, rows)
+    # rows with the same time keep the order in files
+    for t in np.unique(log.time):
+        sel = np.where(log.time==t)[0]
+        order = [[sameRow(row, log[n].getherDataToArray()[int(i)]) for row in rows].index(True) for n, i in zip(log.n[sel], log.index[sel])]
+        assert order == sorted(order)
+
+    sub = log.selectTime(2.0, 5.0)
+    checkRows(sub, [row for row in rows if (row[2]>=2.0) & (row[2]<=5.0)])
+    assert (sub.time == log.time[(log.time>=2.0) & (log.time<=5.0)]).all()
+    assert log.selectTime(t_max=-1.0).size == 0
+    assert log.selectTime().size == log.size
+
+def createGroups(levels_list):
+    """ Create GroupInfo of groups with the same number of members, each group is a list of binary tree levels (m1, m2, semi) in the pre-order
+    """
+    n = len(levels_list[0]) + 1
+    group = petar.GroupInfo(np.zeros((len(levels_list), petar.GroupInfo(N=n).ncols)), N=n)
+    group.n[:] = n
+    group.time[:] = np.arange(len(levels_list))
+    for j in range(n-1):
+        level = np.array([levels[j] for levels in levels_list], dtype=float)
+        bj = group['bin'+str(j)]
+        bj.m1[:] = level[:,0]
+        bj.m2[:] = level[:,1]
+        bj.semi[:] = level[:,2]
+        bj.period[:] = level[:,2]**1.5
+        bj.stab[:] = 0.1*(j+1)
+        bj.sd[:] = j+1
+        bj.am[:] = [0, 0, 1]
+    return group
+
+def test_parent_level_equal_mass():
+    # triples: ((a,b),c) and (c,(a,b)) with equal masses
+    group = createGroups([[(2,1,100), (1,1,1)], [(1,2,100), (1,1,1)]])
+    parent, member = group.findParentLevel()
+    assert parent.tolist() == [[-1,0], [-1,0]]
+    assert member.tolist() == [[-1,0], [-1,1]]
+
+    # quadruples: (((a,b),c),d), ((a,b),(c,d)), ((c,(a,b)),d) with equal masses
+    group = createGroups([[(3,1,100), (2,1,10), (1,1,1)],
+                          [(2,2,100), (1,1,1), (1,1,2)],
+                          [(3,1,100), (1,2,10), (1,1,1)]])
+    parent, member = group.findParentLevel()
+    assert parent.tolist() == [[-1,0,1], [-1,0,0], [-1,0,1]]
+    assert member.tolist() == [[-1,0,0], [-1,0,1], [-1,0,1]]
+
+    # the reviewer example: bin0=(3,2), bin1=(2,1), bin2=(1,1), the mass of d equals the mass of (a,b)
+    group = createGroups([[(3,2,100), (2,1,10), (1,1,1)]])
+    parent, member = group.findParentLevel()
+    assert parent.tolist() == [[-1,0,1]]
+    pairs = group.getHierarchyPairs()
+    assert pairs.inner.tolist() == [1, 2]
+    assert pairs.outer.tolist() == [0, 1]
+    assert pairs.semi_out.tolist() == [100, 10]
+    assert pairs.period_ratio == pytest.approx([100**1.5/10**1.5, 10**1.5])
+    assert pairs.stab.tolist() == pytest.approx([0.1, 0.2])
+    assert pairs.sd_out.tolist() == [1, 2]
+    assert pairs.incline_rel.tolist() == [0, 0]
+
+def test_window_statistics():
+    pairs = petar.HierarchyPair(np.zeros((5, petar.HierarchyPair().ncols)))
+    pairs.time[:] = [0.5, 1.5, 1.6, 1.7, 5.0]
+    pairs.stab[:] = [2.0, 0.5, 1.5, 0.1, 3.0]
+    pairs.period_ratio[:] = [10, 20, 40, 30, 50]
+    stat = pairs.calcWindowStatistics(np.array([0.0, 1.0, 2.0, 3.0]))
+    assert stat.size == 3
+    assert stat.n.tolist() == [1, 3, 0]
+    assert stat.n_unstable.tolist() == [1, 1, 0]
+    assert stat.stab_mean[:2] == pytest.approx([2.0, 0.7])
+    assert stat.stab_median[:2].tolist() == [2.0, 0.5]
+    assert stat.period_ratio_median[:2].tolist() == [10, 30]
+    assert np.isnan(stat.stab_mean[2]) & np.isnan(stat.period_ratio_median[2])
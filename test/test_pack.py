@@ -0,0 +1,42 @@
+# snapshots packed by packSnapshots are read back by SnapshotPack without changes
+import numpy as np
+import pytest
+import petar
+from snapshot_data import writeSnapshots
+
+@pytest.mark.parametrize('n_cpu', [1, 2])
+def test_pack_round_trip(tmp_path, n_cpu):
+    path_list = writeSnapshots(tmp_path)
+    # a companion file of the first snapshot and an empty one of the second
+    single = np.loadtxt(path_list[0], skiprows=1)[:10]
+    np.savetxt(path_list[0]+'.single', single)
+    open(path_list[1]+'.single', 'w').close()
+    pack = petar.packSnapshots(path_list[::-1], str(tmp_path/'data.pack'), n_cpu)
+
+    assert pack.time.tolist() == [0.0, 0.25, 0.5, 0.75]
+    assert pack.getPathList() == [str(tmp_path/'data.pack')+'.'+str(i) for i in range(4)]
+    for i, file_path in enumerate(path_list):
+        dat = np.loadtxt(file_path, skiprows=1)
+        irow = pack.findTimeIndex(0.25*i)
+        assert irow == pack.findFileIndex(i)
+        assert (pack.readData(irow) == dat).all()
+        assert (pack.readData(irow, columns=[4,0]) == dat[:,[4,0]]).all()
+        header = pack.getHeader(irow)
+        assert (header.fid, header.n, header.time) == (i, dat.shape[0], 0.25*i)
+        particles = pack.load(fid=i, interrupt_mode='none')
+        assert (particles.getherDataToArray() == dat).all()
+        # the packed path is read as a snapshot
+        packed = petar.readSnapshotData(pack.getPathList()[i], False)
+        assert (packed == dat).all()
+    assert (pack.load(time=0.0, companion='.single', interrupt_mode='none').getherDataToArray() == single).all()
+    assert pack.load(fid=1, companion='.single', interrupt_mode='none').size == 0
+    assert pack.findFileIndex(2, '.single') == -1
+    assert (pack.selectTime(0.2, 0.6) == pack.findTimeIndex(np.array([0.25, 0.5]))).all()
+
+def test_pack_incomplete(tmp_path):
+    path_list = writeSnapshots(tmp_path, n_snap=1)
+    petar.packSnapshots(path_list, str(tmp_path/'data.pack'), 1)
+    data = open(tmp_path/'data.pack', 'rb').read()
+    open(tmp_path/'cut.pack', 'wb').write(data[:-4])
+    with pytest.raises(ValueError):
+        petar.SnapshotPack(str(tmp_path/'cut.pack'))
@@ -0,0 +1,42 @@
+# registered analysis stages should be available in worker processes created by both fork and spawn
+import multiprocessing as mp
+import numpy as np
+import pytest
+import petar
+from snapshot_data import writeSnapshots
+
+STAGE_MODULE = '''
+import numpy as np
+import petar
+
+def countSingle(time, particle, single, binary, core):
+    return single.size
+
+petar.registerProcessStage('n_single', countSingle)
+'''
+
+@pytest.fixture
+def stage_module(tmp_path):
+    module_path = tmp_path/'stage_module.py'
+    module_path.write_text(STAGE_MODULE)
+    petar.loadProcessStageModule(str(module_path))
+    yield str(module_path)
+    petar.removeProcessStage()
+    petar.process_stage_modules.clear()
+
+@pytest.mark.parametrize('method', ['fork', 'spawn'])
+def test_stage_in_workers(tmp_path, stage_module, method, monkeypatch):
+    path_list = writeSnapshots(tmp_path)
+    monkeypatch.setattr(mp, 'Pool', mp.get_context(method).Pool)
+    result, profile = petar.parallelDataProcessList(path_list, 2, filename_prefix=str(tmp_path/'data'), r_max_binary=0.1)
+    n_single = result['n_single']
+    assert n_single.shape == (len(path_list), 2)
+    assert (n_single[:,0] == result['lagr'].time).all()
+    assert (n_single[:,1] > 0).all()
+
+def test_worker_args(stage_module):
+    petar.registerProcessStage('n_binary', lambda time, particle, single, binary, core: binary.size)
+    module_paths, registry, names = petar.getProcessStageWorkerArgs()
+    assert module_paths == [stage_module]
+    assert list(registry.keys()) == ['n_binary']
+    assert names == ['n_single', 'n_binary']
@@ -0,0 +1,48 @@
+# TailReader follows a growing escaper file of a running simulation
+import io
+import numpy as np
+import petar
+from snapshot_data import createParticles
+
+def formatRows(dat):
+    text = io.StringIO()
+    np.savetxt(text, dat, fmt='%.17g')
+    return text.getvalue()
+
+def test_follow_single_escaper(tmp_path):
+    particles = createParticles()
+    dat = np.concatenate((np.linspace(0, 1, particles.size)[:,None], particles.getherDataToArray()), axis=1)
+    filename = tmp_path/'data.esc.0'
+    reader = petar.TailReader(petar.SingleEscaper, str(filename), interrupt_mode='none')
+    assert reader.update().size == 0
+
+    lines = formatRows(dat).splitlines(keepends=True)
+    # column title line, complete rows and an incomplete row being written
+    with open(filename, 'w') as f:
+        f.write('time mass pos vel\n' + ''.join(lines[:10]) + lines[10][:20])
+    new = reader.update()
+    assert new.size == 10
+    assert (new.id == particles.id[:10]).all()
+
+    with open(filename, 'a') as f:
+        f.write(lines[10][20:] + ''.join(lines[11:50]))
+    new = reader.update()
+    assert new.size == 40
+    assert (new.time == dat[10:50,0]).all()
+    assert reader.update().size == 0
+    assert (reader.data.getherDataToArray() == dat[:50]).all()
+
+    # append through follow
+    with open(filename, 'a') as f:
+        f.write(''.join(lines[50:]))
+    new_list = list(reader.follow(interval=0.01, timeout=0.05))
+    assert sum([new.size for new in new_list]) == particles.size-50
+    assert reader.data.size == particles.size
+    assert (reader.data.pos == particles.pos).all()
+
+    # restart without the append mode, the file is read again from the beginning
+    with open(filename, 'w') as f:
+        f.write(''.join(lines[:5]))
+    reader.update()
+    assert reader.data.size == 5
+    assert (reader.data.id == particles.id[:5]).all()
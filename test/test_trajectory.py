@@ -0,0 +1,52 @@
+# the trajectories in TrajectoryStore are the same as the rows of particles in snapshots
+import os
+import resource
+import numpy as np
+import pytest
+import petar
+from snapshot_data import writeSnapshots
+
+@pytest.mark.parametrize('n_cpu', [1, 2])
+def test_trajectory_round_trip(tmp_path, n_cpu):
+    path_list = writeSnapshots(tmp_path)
+    snaps = [np.loadtxt(path, skiprows=1) for path in path_list]
+    # the last 5 particles are removed in the last snapshot (e.g. escapers)
+    snaps[-1] = snaps[-1][:-5]
+    np.savetxt(path_list[-1], snaps[-1], header='3 %d %.17e' % (snaps[-1].shape[0], 0.75), comments='')
+    store = petar.createTrajectoryStore(path_list[::-1], str(tmp_path/'traj'), n_cpu, chunk_size=50, interrupt_mode='none')
+    store = petar.TrajectoryStore(str(tmp_path/'traj'))
+    times = np.array([0.0, 0.25, 0.5, 0.75])
+    assert (store.times == times).all()
+    ids = petar.Particle(snaps[0]).id
+    assert (store.index.id == np.sort(ids)).all()
+
+    for pid in [1, 49, 50, ids.max()]:
+        traj = store.getTrajectory([pid])
+        rows = [snap[petar.Particle(snap).id==pid] for snap in snaps]
+        assert (traj.time == np.concatenate([np.full(row.shape[0], t) for t, row in zip(times, rows)])).all()
+        assert (traj.getherDataToArray()[:,1:] == np.concatenate(rows)).all()
+    index = store.getTimeRange([1, ids.max(), ids.max()+1])
+    assert index.size == 2
+    assert index.t_last.tolist() == [0.75, 0.5]
+
+    traj = store.getTrajectory([ids.max()+1, 2, 1], t_min=0.2, t_max=0.6)
+    assert traj.id.tolist() == [2, 2, 1, 1]
+    assert traj.time.tolist() == [0.25, 0.5, 0.25, 0.5]
+
+def test_trajectory_many_chunks(tmp_path):
+    path_list = writeSnapshots(tmp_path)
+    snaps = [np.loadtxt(path, skiprows=1) for path in path_list]
+    # one chunk per particle, the number of chunks is larger than the limit of open files
+    n_fd = len(os.listdir('/proc/self/fd'))
+    limit = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (n_fd+20, limit[1]))
+    try:
+        store = petar.createTrajectoryStore(path_list, str(tmp_path/'traj'), 1, chunk_size=1, interrupt_mode='none')
+    finally:
+        resource.setrlimit(resource.RLIMIT_NOFILE, limit)
+    ids = petar.Particle(snaps[0]).id
+    assert np.unique(store.index.chunk).size == ids.size
+    traj = store.getTrajectory(ids)
+    dat = np.array(snaps).transpose(1,0,2).reshape(-1, snaps[0].shape[1])
+    assert (traj.getherDataToArray()[:,1:] == dat).all()
+    assert (traj.time == np.tile([0.0, 0.25, 0.5, 0.75], ids.size)).all()
@@ -1,10 +1,24 @@
 # PeTar data analysis tools
 from .base import *
+from .tail import *
 from .profile import *
+from .cost import *
 from .data import *
+from .pack import *
 from .status import *
+from .status_snapshot import *
+from .find_dt import *
 from .lagrangian import *
 from .escaper import *
+from .tidal import *
+from .stage import *
+from .cache import *
+from .shared_data import *
 from .parallel_data_process import *
+from .run import *
+from .daemon import *
+from .ensemble import *
 from .group import *
 from .bse import *
+from .gether import *
+from .trajectory import *
@@ -313,6 +313,66 @@ class DictNpArrayMix:
                 print(key,member.shape)
             elif (issubclass(type(member), DictNpArrayMix)):
                 member.printSize()
+
+    def findTimeIndex(self, times, rtol=1e-10, key='time'):
+        """ Find the indices of rows with given times by the binary search of a sorted time index
+        The sort index of the time member is generated at the first call and reused until the member is replaced (e.g. by append or readArray),
+        if the member is modified in place, call with a new copy of data.
+
+        Parameters
+        ----------
+        times: float | 1D numpy.ndarray
+            times to search
+        rtol: float (1e-10)
+            relative tolerance to match times, the absolute tolerance is rtol*max(|time|,1)
+        key: string ('time')
+            member name of times
+
+        Return
+        ----------
+        index: int | 1D numpy.ndarray
+            index of rows, -1 if the time is not found
+        """
+        time_data = self.__dict__[key]
+        if ('time_index' in self.__dict__.keys()):
+            if (self.time_index[0] is time_data) & (self.time_index[1] == key): 
+                sort_index = self.time_index[2]
+            else:
+                sort_index = None
+                self.time_index = None
+        else:
+            self.time_index = None
+        if (self.time_index is None):
+            if (time_data.size>1) & np.any(time_data[1:]<time_data[:-1]):
+                sort_index = time_data.argsort(kind='stable')
+            else:
+                sort_index = None
+            # use tuple to avoid being treated as a data member in join and append
+            self.time_index = (time_data, key, sort_index)
+        time_sort = time_data if sort_index is None else time_data[sort_index]
+        return searchTimeIndex(time_sort, times, rtol, sort_index)
+
+    def atTimes(self, times, rtol=1e-10, key='time'):
+        """ Return the rows with given times, see help(findTimeIndex)
+
+        Parameters
+        ----------
+        times: float | 1D numpy.ndarray
+            times to search
+        rtol: float (1e-10)
+            relative tolerance to match times
+        key: string ('time')
+            member name of times
+
+        Return
+        ----------
+        data: type of self
+            data of the given times in the same order, a float input gives data of one row
+        """
+        index = np.atleast_1d(self.findTimeIndex(times, rtol, key))
+        if (index<0).any():
+            raise ValueError('Times ',np.atleast_1d(times)[index<0],' are not found in the member ',key)
+        return self[index]
                 
                 
         
@@ -341,5 +401,41 @@ def join(*_dat):
     new_dat.size = np.sum(tuple(map(lambda x:x.size, _dat)))
     return new_dat
 
+def searchTimeIndex(time_sort, times, rtol=1e-10, sort_index=None):
+    """ Find the indices of times in a sorted time array with a tolerance by using numpy.searchsorted
+
+    Parameters
+    ----------
+    time_sort: 1D numpy.ndarray
+        sorted time array
+    times: float | 1D numpy.ndarray
+        times to search
+    rtol: float (1e-10)
+        relative tolerance to match times, the absolute tolerance is rtol*max(|time|,1)
+    sort_index: 1D numpy.ndarray (None)
+        if not None, the found indices are mapped by sort_index (the original array is unsorted and time_sort = time[sort_index])
+
+    Return
+    ----------
+    index: int | 1D numpy.ndarray
+        indices of times, -1 if the time is not found
+    """
+    scalar_flag = np.isscalar(times)
+    times = np.atleast_1d(np.asarray(times, dtype=float))
+    index = np.full(times.size, -1, dtype=int)
+    if (time_sort.size>0):
+        tol = rtol*np.maximum(np.abs(times),1.0)
+        right = np.searchsorted(time_sort, times)
+        left = np.maximum(right-1, 0)
+        right = np.minimum(right, time_sort.size-1)
+        dleft = np.abs(time_sort[left]-times)
+        dright = np.abs(time_sort[right]-times)
+        near = np.where(dright<dleft, right, left)
+        found = np.minimum(dleft, dright)<=tol
+        index[found] = near[found]
+        if (sort_index is not None): index[found] = sort_index[index[found]]
+    if (scalar_flag): return index[0]
+    return index
+
 # vector dot of x, y 
 vecDot = lambda x,y: np.sum(x*y,axis=1)
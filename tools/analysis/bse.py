@@ -261,32 +261,38 @@ class BSEStatus(DictNpArrayMix):
         self.time = np.append(self.time, time)
 
         keys = self.mmax.keys
-        
-        for ki in range(len(keys)):
+        n_type = len(keys)
+
+        # count and sum masses of all types in one pass
+        stype = single.star.type.astype(int)
+        b1type = binary.p1.star.type.astype(int)
+        b2type = binary.p2.star.type.astype(int)
+        bboth = (b1type==b2type)
+        count_single = np.bincount(stype[(stype>=0) & (stype<n_type)], minlength=n_type)
+        count_binary_both = np.bincount(b1type[bboth & (b1type>=0) & (b1type<n_type)], minlength=n_type)
+        count_binary_one = np.zeros(n_type, dtype=int)
+        for btype in [b1type[~bboth], b2type[~bboth]]:
+            count_binary_one += np.bincount(btype[(btype>=0) & (btype<n_type)], minlength=n_type)
+
+        types = np.concatenate((stype, b1type, b2type))
+        mass = np.concatenate((single.mass, binary.p1.mass, binary.p2.mass))
+        tsel = (types>=0) & (types<n_type)
+        types = types[tsel]
+        mass = mass[tsel]
+        count = np.bincount(types, minlength=n_type)
+        msum = np.bincount(types, weights=mass, minlength=n_type)
+        mmax = np.zeros(n_type)
+        np.maximum.at(mmax, types, mass)
+        mave = np.zeros(n_type)
+        np.divide(msum, count, out=mave, where=(count>0))
+
+        for ki in range(n_type):
             key = keys[ki][0]
-            ssel = (single.star.type==ki)
-            b1sel = (binary.p1.star.type==ki)
-            b2sel = (binary.p2.star.type==ki)
-
-            bsidesel = (b1sel & np.logical_not(b2sel)) | (b2sel & np.logical_not(b1sel))
-            bbothsel = b1sel & b2sel
-
-            self.count.single[key]     = np.append(self.count.single[key],ssel.sum())
-            self.count.binary_one[key] = np.append(self.count.binary_one[key],bsidesel.sum())
-            self.count.binary_both[key]= np.append(self.count.binary_both[key],bbothsel.sum())
-            
-            smass = single.mass[ssel]
-            b1mass = binary.p1.mass[b1sel]
-            b2mass = binary.p2.mass[b2sel]
-            
-            mass = np.concatenate((smass, b1mass, b2mass))
-
-            if (mass.size>0):
-                self.mmax[key] = np.append(self.mmax[key], np.amax(mass))
-                self.mave[key] = np.append(self.mave[key], np.average(mass))
-            else:
-                self.mmax[key] = np.append(self.mmax[key], 0.0)
-                self.mave[key] = np.append(self.mave[key], 0.0)
+            self.count.single[key]     = np.append(self.count.single[key], count_single[ki])
+            self.count.binary_one[key] = np.append(self.count.binary_one[key], count_binary_one[ki])
+            self.count.binary_both[key]= np.append(self.count.binary_both[key], count_binary_both[ki])
+            self.mmax[key] = np.append(self.mmax[key], mmax[ki])
+            self.mave[key] = np.append(self.mave[key], mave[ki])
 
         self.count.single.size += 1
         self.count.binary_one.size += 1
@@ -298,3 +304,251 @@ class BSEStatus(DictNpArrayMix):
         
         #self.printSize()
 
+
+def getBSEEventTime(data):
+    """ Get the event time of a SSE/BSE event table
+
+    Parameters
+    ----------
+    data: SSETypeChange | SSESNKick | BSETypeChange | BSESNKick | BSEDynamicMerge
+        event table
+
+    Return
+    ----------
+    time: 1D numpy.ndarray
+        time of each event (Myr)
+    """
+    if (type(data) == SSETypeChange) | (type(data) == BSETypeChange): 
+        return data.final.time
+    elif (type(data) == SSESNKick) | (type(data) == BSESNKick): 
+        return data.star.time
+    elif (type(data) == BSEDynamicMerge): 
+        return data.final.p1.time
+    else:
+        raise ValueError('Unknown event table type ', type(data))
+
+class BSEEventIndex():
+    """ Index of a SSE/BSE event table sorted by particle id
+    The rows of the table are sorted by (id, time) once, for binary events (with id1 and id2) each row is indexed by both ids.
+    The sorted rows of each id are stored contiguously (compressed sparse row format), thus the history of a star
+    and the events of a large number of stars are obtained by binary searches without scanning the table.
+
+    Members:
+        data: the event table
+        id: 1D numpy.ndarray, sorted unique ids
+        offset: 1D numpy.ndarray, the sorted rows of id[i] are row[offset[i]:offset[i+1]]
+        row: 1D numpy.ndarray, row indices of the table sorted by (id, time)
+        time: 1D numpy.ndarray, event time of row
+    """
+    def __init__(self, data, time=None):
+        """
+        Parameters
+        ----------
+        data: SSETypeChange | SSESNKick | BSETypeChange | BSESNKick | BSEDynamicMerge
+            event table, the table should contain the member id (single) or id1 and id2 (binary)
+        time: 1D numpy.ndarray (None)
+            event time of each row, if None, use getBSEEventTime(data)
+        """
+        self.data = data
+        if (time is None): time = getBSEEventTime(data)
+        rows = np.arange(data.size)
+        if ('id' in data.__dict__.keys()):
+            ids = data.id
+        elif ('id1' in data.__dict__.keys()) & ('id2' in data.__dict__.keys()):
+            # avoid indexing one row twice if id1 and id2 are the same
+            sel2 = (data.id2 != data.id1)
+            ids = np.concatenate((data.id1, data.id2[sel2]))
+            rows = np.concatenate((rows, rows[sel2]))
+            time = np.concatenate((time, time[sel2]))
+        else:
+            raise ValueError('The event table should have the member id or id1 and id2, type: ', type(data))
+        ids = ids.astype(np.int64)
+        order = np.lexsort((time, ids))
+        ids_sort = ids[order]
+        self.row = rows[order]
+        self.time = time[order]
+        self.id, index = np.unique(ids_sort, return_index=True)
+        self.offset = np.append(index, ids_sort.size)
+
+    def findIndex(self, ids):
+        """ Find the positions of ids in the unique id list
+
+        Parameters
+        ----------
+        ids: int | 1D numpy.ndarray
+            particle ids
+
+        Return
+        ----------
+        index: 1D numpy.ndarray
+            position of each id in the member id, -1 if the id has no event
+        """
+        ids = np.atleast_1d(ids).astype(np.int64)
+        if (self.id.size==0): return np.full(ids.size, -1)
+        index = np.searchsorted(self.id, ids)
+        index[index>=self.id.size] = 0
+        return np.where(self.id[index]==ids, index, -1)
+
+    def getRows(self, ids):
+        """ Get the rows of events of multiple ids in the compressed sparse row format
+
+        Parameters
+        ----------
+        ids: int | 1D numpy.ndarray
+            particle ids
+
+        Return
+        ----------
+        rows: 1D numpy.ndarray
+            row indices of the events sorted by time for each id, ordered by the input ids
+        offset: 1D numpy.ndarray
+            the events of ids[i] are rows[offset[i]:offset[i+1]]
+        """
+        index = self.findIndex(ids)
+        found = (index>=0)
+        start = np.where(found, self.offset[index], 0)
+        count = np.where(found, self.offset[index+1] - start, 0)
+        offset = np.append(0, np.cumsum(count))
+        rows = self.row[np.repeat(start - offset[:-1], count) + np.arange(offset[-1])]
+        return rows, offset
+
+    def getHistory(self, pid):
+        """ Get all events of one star sorted by time
+
+        Parameters
+        ----------
+        pid: int
+            particle id
+
+        Return
+        ----------
+        events: the same type as the table
+        """
+        rows, offset = self.getRows(pid)
+        return self.data[rows]
+
+    def getLatestRows(self, ids, time=None):
+        """ Get the row of the latest event for each id
+
+        Parameters
+        ----------
+        ids: int | 1D numpy.ndarray
+            particle ids
+        time: float (None)
+            if not None, only the events with time <= the given value are used
+
+        Return
+        ----------
+        rows: 1D numpy.ndarray
+            row index of the latest event for each id, -1 if no event is found
+        """
+        index = self.findIndex(ids)
+        found = (index>=0)
+        start = np.where(found, self.offset[index], 0)
+        end = np.where(found, self.offset[index+1], 0)
+        if (time is not None):
+            # the events of each id are sorted by time, count the events before the given time
+            n_before = np.append(0, np.cumsum(self.time<=time))
+            end = start + n_before[end] - n_before[start]
+        rows = np.full(index.size, -1)
+        found = (end>start)
+        rows[found] = self.row[end[found]-1]
+        return rows
+
+class BSEEventStore():
+    """ Id-indexed store of SSE/BSE event tables
+    Each table is indexed by BSEEventIndex, so that the history of stars can be obtained from all tables quickly,
+    and the latest events can be attached to the particles of snapshots by ids.
+
+    Members:
+        index: dict of table name and BSEEventIndex
+    """
+    def __init__(self, **tables):
+        """
+        Parameters
+        ----------
+        tables: dict
+            table name and event table (SSETypeChange, SSESNKick, BSETypeChange, BSESNKick, BSEDynamicMerge),
+            e.g. BSEEventStore(sse_type=sse_type_change, bse_type=bse_type_change)
+        """
+        self.index = dict()
+        for name, data in tables.items():
+            self.addTable(name, data)
+
+    def addTable(self, name, data, time=None):
+        """ Add and index one event table
+
+        Parameters
+        ----------
+        name: string
+            table name
+        data: event table
+            see help(BSEEventIndex.__init__)
+        time: 1D numpy.ndarray (None)
+            event time of each row, see help(BSEEventIndex.__init__)
+        """
+        self.index[name] = BSEEventIndex(data, time)
+
+    def getHistory(self, pid):
+        """ Get the events of one star from all tables
+
+        Parameters
+        ----------
+        pid: int
+            particle id
+
+        Return
+        ----------
+        history: dict
+            table name and events sorted by time, tables without the events of the star are excluded
+        """
+        history = dict()
+        for name, index in self.index.items():
+            events = index.getHistory(pid)
+            if (events.size>0): history[name] = events
+        return history
+
+    def getEvents(self, name, ids):
+        """ Get the events of multiple stars from one table
+
+        Parameters
+        ----------
+        name: string
+            table name
+        ids: 1D numpy.ndarray
+            particle ids
+
+        Return
+        ----------
+        events: the same type as the table
+            events ordered by the input ids and sorted by time for each id
+        offset: 1D numpy.ndarray
+            the events of ids[i] are events[offset[i]:offset[i+1]]
+        """
+        index = self.index[name]
+        rows, offset = index.getRows(ids)
+        return index.data[rows], offset
+
+    def joinLatest(self, name, particle, time=None):
+        """ Attach the latest event of one table to each particle of a snapshot
+
+        Parameters
+        ----------
+        name: string
+            table name
+        particle: Particle
+            particles of a snapshot with the member id
+        time: float (None)
+            if not None, only the events with time <= the given value (e.g. the snapshot time) are used
+
+        Return
+        ----------
+        sel: 1D numpy.ndarray (bool)
+            True for particles having events
+        events: the same type as the table
+            the latest events of particles selected by sel, aligned with particle[sel]
+        """
+        index = self.index[name]
+        rows = index.getLatestRows(particle.id, time)
+        sel = (rows>=0)
+        return sel, index.data[rows[sel]]
@@ -0,0 +1,211 @@
+# cache manifest of intermediate products (single, binary and core data) of petar.data.process
+import numpy as np
+import hashlib
+import json
+import os
+import time
+import threading
+from .pack import *
+
+class ProcessCache:
+    """ Manifest of the intermediate products generated by dataProcessOne: [snapshot].single, [snapshot].binary and the core data of each snapshot
+
+    Each entry is keyed by the snapshot path and records the content hash of the snapshot,
+    the parameters affecting the products (G, r_max_binary, simple_binary, interrupt_mode),
+    the sizes and modification times of the product files, the core data and the last access time.
+    An entry is valid only if all of them match the current snapshot, parameters and product files,
+    thus the products are reused only when they are generated from the same snapshot with the same parameters.
+
+    Members:
+        filename: manifest file name
+        params: parameters of the current processing
+        entries: dict of snapshot path and entry
+        updated: dict of entries added or accessed since the manifest is loaded
+    """
+    def __init__(self, filename, **kwargs):
+        """
+        Parameters
+        ----------
+        filename: string
+            manifest file name, if the file exists, the entries are loaded
+        kwargs: dict
+            keyword arguments of dataProcessList, the parameters are:
+                G: gravitational constant (1.0)
+                r_max_binary: maximum separation to detect binaries (0.1)
+                simple_binary: only calculate simple binary parameters (True)
+                interrupt_mode: PeTar interrupt mode: base, bse, none (none)
+        """
+        self.filename = filename
+        self.params = {'G':1.0, 'r_max_binary':0.1, 'simple_binary':True, 'interrupt_mode':'none'}
+        for key in self.params.keys():
+            if (key in kwargs.keys()): self.params[key] = kwargs[key]
+        self.params['G'] = float(self.params['G'])
+        self.params['r_max_binary'] = float(self.params['r_max_binary'])
+        self.params['simple_binary'] = bool(self.params['simple_binary'])
+        self.entries = dict()
+        self.updated = dict()
+        self.valid = dict()
+        self.pending = []
+        self.lock = threading.Lock()
+        if os.path.exists(filename):
+            with open(filename,'r') as f:
+                self.entries = json.load(f)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('lock')
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def fileStat(filename):
+        """ Return [size, modification time in ns] of a file, None if the file does not exist
+        """
+        if (not os.path.exists(filename)): return None
+        st = os.stat(filename)
+        return [st.st_size, st.st_mtime_ns]
+
+    def snapshotHash(self, file_path):
+        """ Calculate the content hash of a snapshot
+        The hash stored in the manifest is reused if the size and the modification time of the snapshot are unchanged
+
+        Parameters
+        ----------
+        file_path: string
+            snapshot path or packed path (see help(openPackedPath))
+
+        Return
+        ----------
+        hash: string
+            blake2b hex digest of the file content (the compressed block for a packed path)
+        stat: list
+            [size, modification time in ns] of the snapshot
+        """
+        pack, irow = openPackedPath(file_path)
+        if (pack is not None):
+            # packed snapshot, use the stat of the pack file with the block offset and hash the compressed block
+            stat = self.fileStat(pack.filename) + [int(pack.index.offset[irow])]
+        else:
+            stat = self.fileStat(file_path)
+        if (file_path in self.entries.keys()):
+            entry = self.entries[file_path]
+            if (entry['stat'] == stat): return entry['hash'], stat
+        h = hashlib.blake2b(digest_size=20)
+        if (pack is not None):
+            h.update(pack.readBlock(irow))
+        else:
+            with open(file_path,'rb') as f:
+                for chunk in iter(lambda: f.read(1<<20), b''):
+                    h.update(chunk)
+        return h.hexdigest(), stat
+
+    def check(self, file_path):
+        """ Check whether the products of a snapshot in the manifest are valid, the result is memorized
+
+        Parameters
+        ----------
+        file_path: string
+            snapshot path
+
+        Return
+        ----------
+        valid: bool
+        """
+        with self.lock:
+            if (file_path in self.valid.keys()): return self.valid[file_path]
+        valid = False
+        snap_hash, stat = self.snapshotHash(file_path)
+        if (file_path in self.entries.keys()):
+            entry = self.entries[file_path]
+            valid = (entry['hash'] == snap_hash) & (entry['params'] == self.params) & \
+                (entry['single'] == self.fileStat(file_path+'.single')) & \
+                (entry['binary'] == self.fileStat(file_path+'.binary'))
+        with self.lock:
+            self.valid[file_path] = valid
+            if (not valid): self.updated[file_path] = {'hash':snap_hash, 'stat':stat}
+        return valid
+
+    def getCore(self, file_path):
+        """ Return the core data of a valid entry [time, pos(3), vel(3), rc] and update the access time
+        """
+        entry = self.entries[file_path]
+        entry['atime'] = time.time()
+        self.updated[file_path] = entry
+        return np.array(entry['core'])
+
+    def addEntry(self, file_path, core):
+        """ Add the entry of a snapshot after its products are written, check should be called before
+
+        Parameters
+        ----------
+        file_path: string
+            snapshot path
+        core: 1D numpy.ndarray
+            core data of the snapshot [time, pos(3), vel(3), rc]
+        """
+        if (not file_path in self.updated.keys()): self.check(file_path)
+        entry = self.updated[file_path]
+        entry['params'] = self.params
+        entry['single'] = self.fileStat(file_path+'.single')
+        entry['binary'] = self.fileStat(file_path+'.binary')
+        entry['core'] = [float(x) for x in core]
+        entry['atime'] = time.time()
+        self.entries[file_path] = entry
+
+    def update(self, entries, valid=None):
+        """ Update the manifest by the entries from other processes (members updated and valid)
+        """
+        self.entries.update(entries)
+        self.updated.update(entries)
+        if (valid is not None): self.valid.update(valid)
+
+    def save(self):
+        """ Write the manifest file, only entries with all records are saved
+        """
+        entries = dict([(key, item) for key, item in self.entries.items() if 'core' in item.keys()])
+        with open(self.filename+'.tmp','w') as f:
+            json.dump(entries, f)
+        os.replace(self.filename+'.tmp', self.filename)
+
+    def totalSize(self):
+        """ Return the total size of product files in the manifest in bytes
+        """
+        nbytes = 0
+        for entry in self.entries.values():
+            for key in ['single','binary']:
+                if (key in entry.keys()):
+                    if (entry[key] is not None): nbytes += entry[key][0]
+        return nbytes
+
+    def evict(self, max_size):
+        """ Remove product files of least recently used entries until the total size is not larger than max_size
+        The manifest file is updated
+
+        Parameters
+        ----------
+        max_size: int
+            maximum total size of product files in bytes
+
+        Return
+        ----------
+        evicted: list
+            snapshot pathes of removed entries
+        """
+        evicted=[]
+        nbytes = self.totalSize()
+        order = sorted(self.entries.keys(), key=lambda x: self.entries[x].get('atime', 0.0))
+        for file_path in order:
+            if (nbytes<=max_size): break
+            entry = self.entries.pop(file_path)
+            for key in ['single','binary']:
+                if (key in entry.keys()):
+                    if (entry[key] is not None):
+                        product = file_path+'.'+key
+                        if (self.fileStat(product) == entry[key]): os.remove(product)
+                        nbytes -= entry[key][0]
+            evicted.append(file_path)
+        self.save()
+        return evicted
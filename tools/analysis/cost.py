@@ -0,0 +1,205 @@
+# cost model of PeTar components fitted from profile data
+import numpy as np
+from .base import *
+from .profile import *
+
+def robustLinearFit(x, y, n_iter=50, delta=1.345, rtol=1e-8):
+    """ Robust linear regression with the Huber loss by iteratively reweighted least squares
+
+    Parameters
+    ----------
+    x: 2D numpy.ndarray
+        features with the shape of (number of samples, number of features), a constant column is added for the intercept
+    y: 1D numpy.ndarray
+        target values
+    n_iter: int (50)
+        maximum number of iterations
+    delta: float (1.345)
+        Huber threshold in the unit of the robust residual scale (median absolute deviation)
+    rtol: float (1e-8)
+        relative tolerance of coefficients to stop iterations
+
+    Return
+    ----------
+    coef: 1D numpy.ndarray
+        coefficients of features, the last one is the intercept
+    """
+    a = np.concatenate((x, np.ones((x.shape[0],1))), axis=1)
+    # normalize columns to improve the condition
+    norm = np.abs(a).max(axis=0)
+    norm[norm==0] = 1.0
+    a = a/norm
+    weight = np.ones(y.size)
+    coef = np.zeros(a.shape[1])
+    for i in range(n_iter):
+        sw = np.sqrt(weight)
+        coef_new = np.linalg.lstsq(a*sw[:,None], y*sw, rcond=None)[0]
+        res = y - a.dot(coef_new)
+        scale = np.median(np.abs(res - np.median(res)))/0.6745
+        if (scale<=0):
+            coef = coef_new
+            break
+        r = np.abs(res)/(delta*scale)
+        weight = np.where(r<=1, 1.0, 1.0/np.maximum(r,1e-300))
+        converged = np.allclose(coef_new, coef, rtol=rtol, atol=0)
+        coef = coef_new
+        if (converged): break
+    return coef/norm
+
+class CostModel():
+    """ Linear cost models of PeTar components fitted from the profile (PeTarProfile) and the number counts (PeTarCount) of all steps and ranks
+
+    The compute time per tree step (wallclock excluding the MPI barrier waiting time) of each component is modeled as a linear function of counts:
+        tree_force: Ep_Ep_interaction, Ep_Sp_interaction
+        tree_neighbor, force_correct, kick, search_cluster, create_group, domain_decomp, exchange_ptcl: n_loc
+        hard_single: hard_single (number of particles in single clusters)
+        hard (hard_isolated + hard_connected + hard_interrupt): AR_step_sum, Hermite_step_sum
+        output, status, other: constant
+    The coefficients are obtained by the robust regression (see help(robustLinearFit)), each one means the time per count.
+
+    The prediction for new parameters scales the mean counts per rank of the reference run:
+        n_rank: all counts are proportional to 1/n_rank;
+        theta: the tree interactions (Ep_Ep_interaction and Ep_Sp_interaction) are proportional to theta^-3;
+        dt_soft: the AR and Hermite steps per tree step are proportional to dt_soft, the number of tree steps per time unit is 1/dt_soft;
+        n_omp: the compute time of components except domain_decomp, exchange_ptcl, output, status and other is proportional to 1/(n_omp*omp_efficiency).
+    The load imbalance (max/mean total compute time of ranks) of the reference run is applied.
+    These are approximations, the prediction is more reliable when the new parameters are close to the reference ones.
+
+    Members:
+        coef: dict of component name and coefficients (feature coefficients followed by the intercept)
+        feature_mean: dict of feature name and mean value per rank and step of the reference run
+        ref: dict of reference parameters: dt_soft, theta, n_rank, n_omp
+        imbalance: max/mean of total compute time of ranks of the reference run
+    """
+    component_features = {'tree_force':['Ep_Ep_interaction','Ep_Sp_interaction'],
+                          'tree_neighbor':['n_loc'],
+                          'force_correct':['n_loc'],
+                          'kick':['n_loc'],
+                          'search_cluster':['n_loc'],
+                          'create_group':['n_loc'],
+                          'domain_decomp':['n_loc'],
+                          'exchange_ptcl':['n_loc'],
+                          'hard_single':['hard_single'],
+                          'hard':['AR_step_sum','Hermite_step_sum'],
+                          'output':[],
+                          'status':[],
+                          'other':[]}
+    hard_components = ['hard_isolated','hard_connected','hard_interrupt']
+    serial_components = ['domain_decomp','exchange_ptcl','output','status','other']
+
+    def __init__(self):
+        self.coef = dict()
+        self.feature_mean = dict()
+        self.ref = dict()
+        self.imbalance = 1.0
+
+    def fit(self, profile, theta=0.3, n_omp=1, dt_soft=None, **kwargs):
+        """ Fit the cost models from profiles of all ranks
+
+        Parameters
+        ----------
+        profile: MultiRankProfile | list of Profile
+            profiles of all ranks of the reference run
+        theta: float (0.3)
+            opening angle of the reference run (petar -T)
+        n_omp: int (1)
+            number of OpenMP threads per rank of the reference run
+        dt_soft: float (None)
+            tree time step of the reference run (petar -s), if None, it is estimated by the time interval of outputs / nstep
+        kwargs: dict
+            keyword arguments of robustLinearFit
+        """
+        if (type(profile) == MultiRankProfile): prof_list = profile.profiles
+        else: prof_list = profile
+        prof = join(*prof_list)
+        # exclude rows without steps
+        prof = prof[prof.nstep>0]
+        if (prof.size==0):
+            raise ValueError('No step is found in the profile')
+
+        features = dict([(key, prof.count[key]) for key, parameter in prof.count.keys])
+        features['n_loc'] = prof.n_loc
+        for name, feature_names in self.component_features.items():
+            if (name=='hard'):
+                y = sum([prof.comp[key] - prof.comp_bar[key] for key in self.hard_components])
+            else:
+                y = prof.comp[name] - prof.comp_bar[name]
+            x = np.array([features[key] for key in feature_names]).reshape(len(feature_names), prof.size).T
+            self.coef[name] = robustLinearFit(x, y, **kwargs)
+        for key, item in features.items(): self.feature_mean[key] = item.mean()
+
+        if (dt_soft is None):
+            prof0 = prof_list[0]
+            dtime = np.diff(prof0.time)
+            nstep = prof0.nstep[1:]
+            sel = (nstep>0) & (dtime>0)
+            if (sel.sum()==0):
+                raise ValueError('dt_soft cannot be estimated from the profile, please provide it')
+            dt_soft = float(np.median(dtime[sel]/nstep[sel]))
+        self.ref = {'dt_soft':dt_soft, 'theta':theta, 'n_rank':len(prof_list), 'n_omp':n_omp}
+
+        # imbalance of the total compute time over ranks
+        n_step = min([p.size for p in prof_list])
+        total = np.array([p.comp.total[:n_step] - p.comp_bar.total[:n_step] for p in prof_list])
+        total_mean = total.mean(axis=0).sum()
+        self.imbalance = total.max(axis=0).sum()/total_mean if (total_mean>0) else 1.0
+
+    def predict(self, dt_soft=None, theta=None, n_rank=None, n_omp=None, omp_efficiency=1.0):
+        """ Predict the wallclock time per time unit of each component
+
+        Parameters
+        ----------
+        dt_soft: float (None)
+            tree time step, if None, use the reference value
+        theta: float (None)
+            opening angle, if None, use the reference value
+        n_rank: int (None)
+            number of MPI ranks, if None, use the reference value
+        n_omp: int (None)
+            number of OpenMP threads per rank, if None, use the reference value
+        omp_efficiency: float (1.0)
+            parallel efficiency of additional OpenMP threads relative to the reference run
+
+        Return
+        ----------
+        cost: dict
+            component name and predicted wallclock time per time unit, the key 'total' is the sum including the load imbalance
+        """
+        if (len(self.coef)==0):
+            raise ValueError('The cost model is not fitted')
+        if (dt_soft is None): dt_soft = self.ref['dt_soft']
+        if (theta is None): theta = self.ref['theta']
+        if (n_rank is None): n_rank = self.ref['n_rank']
+        if (n_omp is None): n_omp = self.ref['n_omp']
+
+        f_rank = self.ref['n_rank']/n_rank
+        f_theta = (self.ref['theta']/theta)**3
+        f_dt = dt_soft/self.ref['dt_soft']
+        f_omp = 1.0/(n_omp/self.ref['n_omp']*omp_efficiency)
+        scale = {'n_loc':f_rank, 'hard_single':f_rank, 'Ep_Ep_interaction':f_rank*f_theta, 'Ep_Sp_interaction':f_rank*f_theta,
+                 'AR_step_sum':f_rank*f_dt, 'Hermite_step_sum':f_rank*f_dt}
+
+        cost = dict()
+        for name, feature_names in self.component_features.items():
+            coef = self.coef[name]
+            x = np.array([self.feature_mean[key]*scale[key] for key in feature_names])
+            t_step = max(coef[:-1].dot(x) + coef[-1], 0.0)
+            if (not name in self.serial_components): t_step *= f_omp
+            cost[name] = t_step/dt_soft
+        cost['total'] = sum(cost.values())*self.imbalance
+        return cost
+
+    def printSummary(self):
+        """ Print the fitted coefficients and the predicted cost of the reference run
+        """
+        name_format='{:>16}'
+        value_format='{:>16.4g}'
+        print('Reference: ', ', '.join([key+': '+str(item) for key, item in self.ref.items()]), ', imbalance (max/mean):', self.imbalance)
+        cost = self.predict()
+        print(name_format.format('component'), name_format.format('features'), name_format.format('coefficients'), name_format.format('intercept'), name_format.format('time/time_unit'))
+        for name, feature_names in self.component_features.items():
+            coef = self.coef[name]
+            print(name_format.format(name), name_format.format(','.join(feature_names) if len(feature_names)>0 else '-'),
+                  name_format.format(','.join(['%.4g' % c for c in coef[:-1]]) if len(feature_names)>0 else '-'),
+                  value_format.format(coef[-1]), value_format.format(cost[name]))
+        print(name_format.format('total'), value_format.format(cost['total']))
@@ -0,0 +1,281 @@
+# in-situ processing of snapshots written by a running petar
+import numpy as np
+import multiprocessing as mp
+import json
+import os
+import re
+import time
+from .base import *
+from .data import *
+from .profile import *
+from .stage import *
+from .parallel_data_process import *
+
+class SnapshotWatcher():
+    """ Find completed snapshots [filename_prefix].[file id] written by a running petar
+    A snapshot is completed if its size and modification time are unchanged for at least stable_time seconds between polls,
+    and the number of lines is consistent with the number of particles in the header.
+    Each completed snapshot is returned only once, unless it is marked as failed and then modified.
+    A stable but incomplete snapshot is marked as failed, thus it is not read again until it is modified.
+
+    Members:
+        filename_prefix: snapshot filename prefix
+        stable_time: time in seconds that the size and modification time should be unchanged
+        completed: set of completed snapshot paths
+        pending: dict of snapshot paths not completed yet and their ((size, modification time), time of the first poll with this stat)
+        failed: dict of snapshot paths that are incomplete or failed to process and their (size, modification time)
+        last_change: the last time that a new or modified snapshot is found
+    """
+    def __init__(self, filename_prefix, stable_time=5.0):
+        """
+        Parameters
+        ----------
+        filename_prefix: string
+            snapshot filename prefix of petar, defined by "petar -f", can include the directory
+        stable_time: float (5.0)
+            time in seconds that the size and modification time should be unchanged
+        """
+        self.filename_prefix = filename_prefix
+        self.stable_time = stable_time
+        self.completed = set()
+        self.pending = dict()
+        self.failed = dict()
+        self.last_change = time.time()
+
+    @staticmethod
+    def isComplete(file_path):
+        """ Check whether the number of lines of a snapshot is the number of particles in the header plus one and the file ends with a new line
+        """
+        with open(file_path, 'rb') as f:
+            header = f.readline().split()
+            if (len(header)!=3): return False
+            try:
+                n = int(header[1])
+            except ValueError:
+                return False
+            n_line = 0
+            last = b'\n'
+            for chunk in iter(lambda: f.read(1<<20), b''):
+                n_line += chunk.count(b'\n')
+                last = chunk[-1:]
+        return (n_line==n) & (last==b'\n')
+
+    def setFailed(self, path_list):
+        """ Mark snapshots as failed, they are checked again after they are modified
+
+        Parameters
+        ----------
+        path_list: list
+            snapshot paths
+        """
+        for file_path in path_list:
+            self.completed.discard(file_path)
+            st = os.stat(file_path)
+            self.failed[file_path] = (st.st_size, st.st_mtime_ns)
+
+    def poll(self):
+        """ Check the snapshots in the directory
+
+        Return
+        ----------
+        path_list: list
+            paths of newly completed snapshots sorted by file id
+        """
+        path = os.path.dirname(self.filename_prefix)
+        base = os.path.basename(self.filename_prefix)
+        pattern = re.compile(re.escape(base)+r'\.([0-9]+)$')
+        now = time.time()
+        new = []
+        for fname in os.listdir(path if path!='' else '.'):
+            match = pattern.match(fname)
+            if (match is None): continue
+            file_path = self.filename_prefix + '.' + match.group(1)
+            if (file_path in self.completed): continue
+            try:
+                st = os.stat(file_path)
+            except FileNotFoundError:
+                continue
+            stat = (st.st_size, st.st_mtime_ns)
+            if (file_path in self.failed.keys()):
+                if (self.failed[file_path]==stat): continue
+                self.failed.pop(file_path)
+            if (not file_path in self.pending.keys()) or (self.pending[file_path][0]!=stat):
+                self.pending[file_path] = (stat, now)
+                self.last_change = now
+            elif (stat[0]>0) & (now-self.pending[file_path][1]>=self.stable_time):
+                self.pending.pop(file_path)
+                if (self.isComplete(file_path)):
+                    self.completed.add(file_path)
+                    new.append((int(match.group(1)), file_path))
+                else:
+                    # stable but incomplete (e.g. petar is stopped while writing), check again only after the file is modified
+                    self.failed[file_path] = stat
+        return [file_path for fid, file_path in sorted(new)]
+
+def _saveAtomic(filename, save):
+    """ Save a file through a temporary file, thus readers never see a partially written file
+    """
+    save(filename+'.tmp')
+    os.replace(filename+'.tmp', filename)
+
+class DataProcessDaemon():
+    """ Process snapshots while petar is running, used by petar.data.process --daemon
+
+    The snapshot directory is polled, the completed snapshots (see SnapshotWatcher) that are not processed yet are processed by dataProcessList on a worker pool,
+    the results are appended to the existing results (the same as the resume mode of petar.data.process) and saved to [filename_prefix].[lagr|core|esc_single|esc_binary|...].
+    The result files and the summary file are replaced atomically, thus they can be read by other programs (e.g. a dashboard) at any time.
+    The process and the workers run with a low CPU priority (os.nice) to reduce the impact on the simulation running on the same node.
+
+    Members:
+        watcher: SnapshotWatcher
+        result: dict, the results of all processed snapshots, see help(dataProcessList)
+        time_profile: ProcessProfile of the processed snapshots
+        n_processed: number of snapshots processed by the daemon
+        summary_filename: summary file name
+    """
+    def __init__(self, snapshot_prefix, n_cpu=int(0), stable_time=5.0, nice=int(10), summary_filename=None, pipeline_args=None, cache=None, **kwargs):
+        """
+        Parameters
+        ----------
+        snapshot_prefix: string
+            snapshot filename prefix of petar, defined by "petar -f", can include the directory
+        n_cpu: int (0)
+            number of worker processes, if 0, use all CPU cores
+        stable_time: float (5.0)
+            time in seconds that the size and modification time of a snapshot should be unchanged to be processed
+        nice: int (10)
+            the niceness of the daemon and workers is increased to at least this value
+        summary_filename: string (None)
+            summary file name, if None, use [filename_prefix].summary
+        pipeline_args: dict (None)
+            If not None, use pipelineDataProcessList in workers, see help(parallelDataProcessList)
+        cache: ProcessCache (None)
+            If not None, reuse the intermediate products of snapshots with valid cache entries, the manifest is saved after each processing
+        kwargs: dict
+            keyword arguments of dataProcessList, filename_prefix is the prefix of output files (data)
+        """
+        niceness = os.nice(0)
+        if (niceness<nice): os.nice(nice-niceness)
+        if (n_cpu==0): n_cpu = mp.cpu_count()
+        self.n_cpu = n_cpu
+        self.kwargs = kwargs.copy()
+        if (not 'filename_prefix' in self.kwargs.keys()): self.kwargs['filename_prefix'] = 'data'
+        self.filename_prefix = self.kwargs['filename_prefix']
+        self.summary_filename = self.filename_prefix+'.summary' if (summary_filename is None) else summary_filename
+        self.pipeline_args = pipeline_args
+        self.cache = cache
+        self.watcher = SnapshotWatcher(snapshot_prefix, stable_time)
+        self.result = loadDataProcessResult(**self.kwargs)
+        self.time_profile = ProcessProfile()
+        prof_filename = self.filename_prefix+'.process_prof'
+        if (os.path.exists(prof_filename)):
+            if (os.path.getsize(prof_filename)>0): self.time_profile.loadtxt(prof_filename)
+        self.n_processed = 0
+        self.pool = mp.Pool(n_cpu, initProcessStageWorker, getProcessStageWorkerArgs())
+
+    def process(self, path_list):
+        """ Process snapshots on the worker pool and append the results, the snapshots with processed times are skipped
+
+        Parameters
+        ----------
+        path_list: list
+            snapshot paths
+
+        Return
+        ----------
+        n_new: int
+            number of processed snapshots
+        """
+        path_list = findNewSnapshots(path_list, self.result['lagr'].time)
+        if (len(path_list)==0): return 0
+        file_part = [part.tolist() for part in np.array_split(np.array(path_list, dtype=object), min(self.n_cpu, len(path_list)))]
+        res = []
+        for part in file_part:
+            if (self.pipeline_args is None):
+                res.append(self.pool.apply_async(dataProcessList, (part, False, None, self.cache, None), self.kwargs))
+            else:
+                pkwargs = self.kwargs.copy()
+                pkwargs.update(self.pipeline_args)
+                pkwargs['cache'] = self.cache
+                res.append(self.pool.apply_async(pipelineDataProcessList, (part, False,), pkwargs))
+        result_list = []
+        for r in res:
+            resi, prof = r.get()
+            if ('cache' in resi.keys()): self.cache.update(*resi.pop('cache'))
+            result_list.append(resi)
+            self.time_profile = join(self.time_profile, prof['snapshot'])
+        self.result = joinDataProcessResult(self.result, gatherDataProcessResult(result_list))
+        if (self.cache is not None): self.cache.save()
+        self.n_processed += len(path_list)
+        self.save()
+        return len(path_list)
+
+    def save(self):
+        """ Save the results and the profile
+        """
+        for key in ['lagr','core','tidal','bse_status','esc_single','esc_binary']:
+            if key in self.result.keys():
+                _saveAtomic(self.filename_prefix+'.'+key, self.result[key].savetxt)
+        for name in process_stage_registry.keys():
+            if (name in self.result.keys()):
+                if (self.result[name] is not None):
+                    stage = createProcessStage(name)
+                    _saveAtomic(self.filename_prefix+'.'+name, lambda filename: stage.save(self.result[name], filename))
+        _saveAtomic(self.filename_prefix+'.process_prof', self.time_profile.savetxt)
+
+    def writeSummary(self, n_pending=int(0)):
+        """ Write the summary of the latest results to the summary file in the JSON format
+        keys: update_time (UNIX time), n_snapshot (processed in total), n_processed (by the daemon), n_pending, time (the last snapshot time),
+        rc (core radius), mass_fraction, rlagr (Lagrangian radii of all), n_esc_single, n_esc_binary, wall_per_snapshot (averaged wallclock time [s])
+
+        Parameters
+        ----------
+        n_pending: int (0)
+            number of snapshots found but not yet completed
+        """
+        lagr = self.result['lagr']
+        summary = {'update_time': time.time(), 'n_snapshot': int(lagr.size), 'n_processed': self.n_processed, 'n_pending': int(n_pending)}
+        if (lagr.size>0):
+            ilast = np.argmax(lagr.time)
+            summary['time'] = float(lagr.time[ilast])
+            summary['mass_fraction'] = lagr.initargs['mass_fraction'].tolist()
+            summary['rlagr'] = lagr.all.r[ilast,:len(summary['mass_fraction'])].tolist()
+        core = self.result['core']
+        if (core.size>0): summary['rc'] = float(core.rc[np.argmax(core.time)])
+        summary['n_esc_single'] = int(self.result['esc_single'].size)
+        summary['n_esc_binary'] = int(self.result['esc_binary'].size)
+        if (self.time_profile.size>0): summary['wall_per_snapshot'] = float(np.mean(self.time_profile.wall.getherDataToArray().sum(axis=1)))
+        def save(filename):
+            with open(filename, 'w') as f:
+                json.dump(summary, f, indent=2)
+        _saveAtomic(self.summary_filename, save)
+
+    def run(self, poll_interval=10.0, max_idle=None):
+        """ Poll the snapshots and process the completed ones until no new or modified snapshot is found within max_idle seconds
+
+        Parameters
+        ----------
+        poll_interval: float (10.0)
+            polling time interval in seconds
+        max_idle: float (None)
+            stop if no new or modified snapshot is found within this time in seconds, if None, run until interrupted (e.g. Ctrl+C)
+        """
+        try:
+            while True:
+                path_list = self.watcher.poll()
+                if (len(path_list)>0):
+                    try:
+                        n_new = self.process(path_list)
+                        if (n_new>0): print('Processed snapshots:',n_new,' last time:',PeTarDataHeader(path_list[-1]).time, flush=True)
+                    except Exception as err:
+                        # keep the daemon running, the snapshots are processed again if they are modified
+                        print('Fail to process snapshots',path_list,':',repr(err), flush=True)
+                        self.watcher.setFailed(path_list)
+                self.writeSummary(len(self.watcher.pending))
+                if (max_idle is not None) and (time.time()-self.watcher.last_change > max_idle): break
+                time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            print('Daemon is interrupted')
+        finally:
+            self.pool.close()
+            self.pool.join()
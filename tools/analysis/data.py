@@ -1,5 +1,6 @@
 # read snapshot and obtain multiple systems
 import collections
+import os
 from scipy import spatial as sp
 from .base import *
 from .bse import *
@@ -35,9 +36,19 @@ class PeTarDataHeader():
         Parameters:
         -----------
         _filename: string
-            PeTar snapshot file name to read the header
+            PeTar snapshot file name to read the header, or the packed path of a snapshot in a pack file (see help(openPackedPath))
         """
 
+        if (not os.path.exists(_filename)):
+            # packed snapshot, see help(openPackedPath)
+            from .pack import openPackedPath
+            pack, irow = openPackedPath(_filename)
+            if (irow>=0):
+                self.fid = int(pack.index.fid[irow])
+                self.n = int(pack.index.n[irow])
+                self.time = float(pack.index.time[irow])
+                return
+
         fp = open(_filename, 'r')
         header=fp.readline()
         file_id, n_glb, t = header.split()
@@ -534,3 +545,37 @@ def findPair(_dat, _G, _rmax, use_kdtree=False, simple_binary=True):
 
         return single, binary
 
+
+def splitBinary(single, binary, _rmax):
+    """ Select binaries with a smaller maximum separation from the results of findPair
+    The binaries with apo-center distance >= _rmax are split and their components are added to singles (the member id is used to avoid duplicates).
+    This is equivalent to call findPair with _rmax (use_kdtree=True), if the input data are from findPair with a larger maximum separation.
+
+    Parameters
+    ----------
+    single: inhermited SimpleParticle
+        single particle data set
+    binary: Binary
+        binary data set
+    _rmax: float
+        Maximum binary separation
+
+    Return
+    ----------
+    single: type of single
+        single particle data set (a copy independent of the input)
+    binary: Binary
+        binary data set (a copy independent of the input)
+    """
+    apo = binary.semi*(binary.ecc+1.0)
+    bsel = (apo<_rmax)
+    # always return copies with their own keys, thus the members added later (e.g. r2, ekin, etot by findEscaper) do not affect the input data and other splits
+    if (bsel.all()): return single[np.arange(single.size)], binary[np.arange(binary.size)]
+    nbsel = np.logical_not(bsel)
+    # a particle can be in two pairs found by findPair (the nearest neighbor of two particles), 
+    # thus the components of split binaries are added to singles only once and only if they are not in the remaining binaries
+    p_split = join(binary.p1[nbsel], binary.p2[nbsel])
+    ids, index = np.unique(p_split.id, return_index=True)
+    index = np.sort(index[np.logical_not(np.isin(ids, np.concatenate((binary.p1.id[bsel], binary.p2.id[bsel]))))])
+    single_new = join(single, p_split[index])
+    return single_new[np.arange(single_new.size)], binary[bsel]
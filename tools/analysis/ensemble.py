@@ -0,0 +1,220 @@
+# ensemble statistics of multiple runs processed by petar.data.process
+import numpy as np
+import multiprocessing as mp
+import os
+from .base import *
+from .parallel_data_process import *
+
+class EscaperCount(DictNpArrayMix):
+    """ Cumulative number and mass of escapers and escape rates on a time grid
+    Keys: (class members)
+        time (1D): time
+        n_single (1D): cumulative number of single escapers
+        n_binary (1D): cumulative number of binary escapers
+        mass_single (1D): cumulative mass of single escapers
+        mass_binary (1D): cumulative mass of binary escapers
+        rate (1D): escape rate of singles and binaries (number per unit time)
+        mass_rate (1D): mass loss rate by escapers (mass per unit time)
+    """
+    def __init__ (self, _dat=None, _offset=int(0), _append=False, **kwargs):
+        """ DictNpArrayMix type initialzation, see help(DictNpArrayMix.__init__)
+        """
+        keys = [['time',1], ['n_single',1], ['n_binary',1], ['mass_single',1], ['mass_binary',1], ['rate',1], ['mass_rate',1]]
+        DictNpArrayMix.__init__(self, keys, _dat, _offset, _append, **kwargs)
+
+    def calcCount(self, time_grid, esc_single, esc_binary):
+        """ Calculate the cumulative number and mass of escapers at each time of the grid
+
+        Parameters
+        ----------
+        time_grid: 1D numpy.ndarray
+            time grid (increasing)
+        esc_single: SingleEscaper
+            single escapers
+        esc_binary: BinaryEscaper
+            binary escapers
+        """
+        self.time = time_grid.copy()
+        for esc, key in [(esc_single, 'single'), (esc_binary, 'binary')]:
+            order = np.argsort(esc.time)
+            index = np.searchsorted(esc.time[order], time_grid, side='right')
+            mcum = np.append(0, np.cumsum(esc.mass[order]))
+            self.__dict__['n_'+key] = index.astype(float)
+            self.__dict__['mass_'+key] = mcum[index]
+        if (time_grid.size>1):
+            self.rate = np.gradient(self.n_single+self.n_binary, time_grid)
+            self.mass_rate = np.gradient(self.mass_single+self.mass_binary, time_grid)
+        else:
+            self.rate = np.zeros(time_grid.size)
+            self.mass_rate = np.zeros(time_grid.size)
+        self.size = time_grid.size
+
+def interpTimeSeries(data, time_grid):
+    """ Linearly interpolate all columns of a time series table to a time grid
+    The weights are calculated once and applied to all columns together.
+    The time grid points outside the time range of the table are set to NaN.
+
+    Parameters
+    ----------
+    data: inherited DictNpArrayMix
+        time series table with the member time as the first column, e.g. LagrangianMultiple, BSEStatus
+    time_grid: 1D numpy.ndarray
+        time grid
+
+    Return
+    ----------
+    dat_grid: 2D numpy.ndarray
+        interpolated data with the shape of (time_grid.size, data.ncols), the first column is time_grid
+    """
+    dat = data.getherDataToArray()
+    dat_grid = np.full((time_grid.size, data.ncols), np.nan)
+    if (data.size>0):
+        time, index = np.unique(data.time, return_index=True)
+        dat = dat[index]
+        sel = (time_grid>=time[0]) & (time_grid<=time[-1])
+        if (time.size==1):
+            dat_grid[sel] = dat[0]
+        else:
+            tg = time_grid[sel]
+            i = np.clip(np.searchsorted(time, tg, side='right')-1, 0, time.size-2)
+            w = ((tg - time[i])/(time[i+1]-time[i]))[:,None]
+            dat_grid[sel] = dat[i]*(1.0-w) + dat[i+1]*w
+    dat_grid[:,0] = time_grid
+    return dat_grid
+
+def loadEnsembleRun(path, **kwargs):
+    """ Load the results of petar.data.process in one run directory
+
+    Parameters
+    ----------
+    path: string
+        run directory
+    kwargs: dict
+        keyword arguments of loadDataProcessResult, filename_prefix is relative to the run directory (data)
+
+    Return
+    ----------
+    result: dict
+        see help(loadDataProcessResult)
+    """
+    run_kwargs = kwargs.copy()
+    filename_prefix = 'data'
+    if ('filename_prefix' in kwargs.keys()): filename_prefix = kwargs['filename_prefix']
+    run_kwargs['filename_prefix'] = os.path.join(path, filename_prefix)
+    return loadDataProcessResult(**run_kwargs)
+
+def calcEnsembleStatistics(cube, percentiles):
+    """ Calculate statistics over runs of a (run, time, quantity) cube, NaN values are ignored
+
+    Parameters
+    ----------
+    cube: 3D numpy.ndarray
+        data with the shape of (number of runs, number of times, number of quantities)
+    percentiles: list
+        percentiles to calculate
+
+    Return
+    ----------
+    stat: dict
+        mean, std and p[percentile] (e.g. p50 for the median), each is a 2D numpy.ndarray with the shape of (number of times, number of quantities)
+    """
+    stat = dict()
+    n_valid = np.sum(~np.isnan(cube), axis=0)
+    valid = (n_valid>0)
+    csum = np.nansum(cube, axis=0)
+    mean = np.full(csum.shape, np.nan)
+    mean[valid] = csum[valid]/n_valid[valid]
+    dev = np.where(np.isnan(cube), 0.0, cube - mean[None,:,:])
+    std = np.full(csum.shape, np.nan)
+    std[valid] = np.sqrt(np.sum(dev*dev, axis=0)[valid]/n_valid[valid])
+    stat['mean'] = mean
+    stat['std'] = std
+    if (len(percentiles)>0):
+        # sort once along runs, NaN values are placed at the end
+        csort = np.sort(cube, axis=0)
+        for q in percentiles:
+            pos = (n_valid-1)*q/100.0
+            lo = np.floor(pos).astype(int)
+            hi = np.ceil(pos).astype(int)
+            w = pos - lo
+            vlo = np.take_along_axis(csort, np.maximum(lo,0)[None,:,:], axis=0)[0]
+            vhi = np.take_along_axis(csort, np.maximum(hi,0)[None,:,:], axis=0)[0]
+            pq = vlo*(1.0-w) + vhi*w
+            pq[~valid] = np.nan
+            stat['p%g' % q] = pq
+    return stat
+
+def ensembleDataProcessResult(path_list, time_grid=None, n_cpu=int(0), percentiles=[10,50,90], **kwargs):
+    """ Calculate the ensemble statistics of Lagrangian properties, BSE status and escapers of many runs
+
+    The results of petar.data.process in each run directory are loaded in parallel,
+    then each time series is interpolated to the common time grid,
+    the statistics over runs are calculated for each time and quantity of the (run, time, quantity) cube.
+    The times outside the range of a run are excluded from the statistics.
+
+    Parameters
+    ----------
+    path_list: list
+        run directories
+    time_grid: 1D numpy.ndarray (None)
+        common time grid, if None, use the union of the times of Lagrangian data of all runs within the common time range
+    n_cpu: int (0)
+        number of processes to load the data, if 0, use all CPU cores
+    percentiles: list ([10,50,90])
+        percentiles to calculate
+    kwargs: dict
+        keyword arguments of loadDataProcessResult, e.g. filename_prefix, mass_fraction, interrupt_mode
+
+    Return
+    ----------
+    result: dict
+        keys: lagr, esc_count, [bse_status], each item is a dict of statistics (mean, std, p[percentile]) with the same table type
+        (LagrangianMultiple, EscaperCount, BSEStatus);
+        time_grid: the time grid;
+        n_run: 1D numpy.ndarray, number of runs covering each time of the grid
+    """
+    if (n_cpu==0): n_cpu = mp.cpu_count()
+    n_cpu = max(1, min(n_cpu, len(path_list)))
+    if (n_cpu>1):
+        pool = mp.Pool(n_cpu)
+        run_async = [pool.apply_async(loadEnsembleRun, (path,), kwargs) for path in path_list]
+        pool.close()
+        pool.join()
+        run_list = [res.get() for res in run_async]
+    else:
+        run_list = [loadEnsembleRun(path, **kwargs) for path in path_list]
+
+    if (time_grid is None):
+        t_min = max([run['lagr'].time.min() for run in run_list if run['lagr'].size>0])
+        t_max = min([run['lagr'].time.max() for run in run_list if run['lagr'].size>0])
+        time_grid = np.unique(np.concatenate([run['lagr'].time for run in run_list]))
+        time_grid = time_grid[(time_grid>=t_min) & (time_grid<=t_max)]
+
+    result = dict()
+    result['time_grid'] = time_grid
+    tables = ['lagr','bse_status']
+    for key in tables:
+        if (key in run_list[0].keys()):
+            ncols = run_list[0][key].ncols
+            for path, run in zip(path_list, run_list):
+                if (run[key].ncols != ncols):
+                    raise ValueError('The number of columns of ',key,' in ',path,' is ',run[key].ncols,', different from ',ncols)
+            cube = np.array([interpTimeSeries(run[key], time_grid) for run in run_list])
+            if (key=='lagr'): result['n_run'] = np.sum(~np.isnan(cube[:,:,1]), axis=0)
+            stat = calcEnsembleStatistics(cube, percentiles)
+            template = run_list[0][key]
+            result[key] = dict([(name, type(template)(dat, **template.initargs)) for name, dat in stat.items()])
+
+    cube = []
+    for run in run_list:
+        esc_count = EscaperCount()
+        esc_count.calcCount(time_grid, run['esc_single'], run['esc_binary'])
+        dat = esc_count.getherDataToArray()
+        # exclude the times after the end of the run
+        if (run['lagr'].size>0):
+            dat[(time_grid<run['lagr'].time.min()) | (time_grid>run['lagr'].time.max()), 1:] = np.nan
+        cube.append(dat)
+    stat = calcEnsembleStatistics(np.array(cube), percentiles)
+    result['esc_count'] = dict([(name, EscaperCount(dat)) for name, dat in stat.items()])
+
+    return result
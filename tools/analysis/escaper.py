@@ -26,6 +26,7 @@ class SingleEscaper(Particle):
         """ Find escaper from a snapshot
         Functions, calcR2, calcEkin and calcEtot, are used first for input single data set,
         then distance <rcut and etot>0 will be selected as escapers.
+        Only the escapers whose ids are not yet recorded are appended, see help(findNewEscaper).
         The escapers will be removed from the input single
         
         Parameters
@@ -43,21 +44,76 @@ class SingleEscaper(Particle):
         
         rcut2 = rcut*rcut
         ssel = ((single.r2>rcut2) & (single.etot>0.0))
+        #idsinx = self.single.time.argsort()
+        #self.single=self.single[idsinx]
+        return self.addEscaper(time, single, ssel)
+
+    def addEscaper(self, time, single, ssel):
+        """ Add selected escapers from a snapshot, used by findEscaper and other escaper criteria (e.g. TidalRadius.calcOneSnapshot)
+        Members r2, ekin and etot are calculated for the input single if they do not exist.
+        Only the escapers whose ids are not yet recorded are appended, see help(findNewEscaper).
+
+        Parameters
+        ----------
+        time: float
+            evolved time of snapshot
+        single: inherited SingleParticle
+            single particle data set
+        ssel: 1D numpy.ndarray (bool)
+            True for escapers
+
+        Return
+        ----------
+        single_remain: inherited SingleParticle
+            the input single without escapers
+        """
+        if (not 'r2' in single.__dict__.keys()): single.calcR2()
+        if (not 'etot' in single.__dict__.keys()):
+            single.calcEkin()
+            single.calcEtot()
         single_esc = single[ssel]
-        nssel = ssel.sum()
+        single_esc = single_esc[self.findNewEscaper(single_esc.id)]
+        nssel = single_esc.size
         single_esc.addNewMember('time',np.ones(nssel)*time)
         self.append(single_esc)
-        #idsinx = self.single.time.argsort()
-        #self.single=self.single[idsinx]
-        if (self.size>0): self.removeDuplicate()
+        self.id_tracker = (self.size, self.id_tracker[1])
         return single[np.logical_not(ssel)]
 
+    def findNewEscaper(self, ids):
+        """ Select the ids that are not recorded in the escaper list and add them to the hashed set of escaped ids
+        The set is rebuilt from the member id if the data size is changed by other functions (e.g. join, loadtxt)
+
+        Parameters
+        ----------
+        ids: 1D numpy.ndarray
+            ids of escaper candidates
+
+        Return
+        ----------
+        new_sel: 1D numpy.ndarray (bool)
+            True for ids that escape first time
+        """
+        if ('id_tracker' in self.__dict__.keys()):
+            if (self.id_tracker[0] != self.size): self.id_tracker = None
+        else:
+            self.id_tracker = None
+        if (self.id_tracker is None):
+            # use tuple to avoid being treated as a data member in join and append
+            self.id_tracker = (self.size, set(self.id.tolist()))
+        id_set = self.id_tracker[1]
+        new_sel = np.array([not i in id_set for i in ids.tolist()], dtype=bool)
+        id_set.update(ids[new_sel].tolist())
+        return new_sel
+
     def removeDuplicate(self):
-        """ removed duplicated escapers, keep the first appearing one
+        """ removed duplicated escapers, keep the one with the earliest escaping time
+        Used to merge escaper lists of different processes, the output is sorted by id
         """
-        unid, index= np.unique(self.id, return_index=True)
-        newdata=self[index]
+        index_sort = np.lexsort((self.time, self.id))
+        unid, index= np.unique(self.id[index_sort], return_index=True)
+        newdata=self[index_sort[index]]
         self.__init__(newdata,**self.initargs)
+        self.id_tracker = (self.size, set(self.id.tolist()))
 
 class BinaryEscaper(Binary):
     """ Binary escaper information
@@ -88,6 +144,7 @@ class BinaryEscaper(Binary):
         """ Find escaper from a binary snapshot
         Functions, calcR2, calcEkin, calcPot and calcEtot, are used first for input binary data set,
         then c.m. distance <rcut and etot>0 will be selected as escapers.
+        Only the escapers whose first component ids are not yet recorded are appended, see help(findNewEscaper).
         The escapers will be removed from the input binary
         
         Parameters
@@ -106,22 +163,78 @@ class BinaryEscaper(Binary):
 
         rcut2 = rcut*rcut
         bsel = (binary.r2>rcut2) & (binary.etot>0.0)
+        #idsinx = self.binary.time.argsort()
+        #self.binary=self.binary[idsinx]
+        return self.addEscaper(time, binary, bsel)
+
+    def addEscaper(self, time, binary, bsel):
+        """ Add selected escapers from a binary snapshot, used by findEscaper and other escaper criteria (e.g. TidalRadius.calcOneSnapshot)
+        Members r2, pot, ekin and etot are calculated for the input binary if they do not exist.
+        Only the escapers whose first component ids are not yet recorded are appended, see help(findNewEscaper).
+
+        Parameters
+        ----------
+        time: float
+            evolved time of snapshot
+        binary: Binary
+            binary particle data set
+        bsel: 1D numpy.ndarray (bool)
+            True for escapers
+
+        Return
+        ----------
+        binary_remain: Binary
+            the input binary without escapers
+        """
+        if (not 'r2' in binary.__dict__.keys()): binary.calcR2()
+        if (not 'etot' in binary.__dict__.keys()):
+            if (not 'pot' in binary.__dict__.keys()): binary.calcPot()
+            binary.calcEkin()
+            binary.calcEtot()
         binary_esc = binary[bsel]
-        nbsel = bsel.sum()
+        binary_esc = binary_esc[self.findNewEscaper(binary_esc.p1.id)]
+        nbsel = binary_esc.size
         binary_esc.addNewMember('time',np.ones(nbsel)*time)
         self.append(binary_esc)
-        #idsinx = self.binary.time.argsort()
-        #self.binary=self.binary[idsinx]
-        if (self.size>0): self.removeDuplicate()
+        self.id_tracker = (self.size, self.id_tracker[1])
         return binary[np.logical_not(bsel)]
 
+    def findNewEscaper(self, ids):
+        """ Select the first component ids that are not recorded in the escaper list and add them to the hashed set of escaped ids
+        The set is rebuilt from the member p1.id if the data size is changed by other functions (e.g. join, loadtxt)
+
+        Parameters
+        ----------
+        ids: 1D numpy.ndarray
+            first component ids of escaper candidates
+
+        Return
+        ----------
+        new_sel: 1D numpy.ndarray (bool)
+            True for ids that escape first time
+        """
+        if ('id_tracker' in self.__dict__.keys()):
+            if (self.id_tracker[0] != self.size): self.id_tracker = None
+        else:
+            self.id_tracker = None
+        if (self.id_tracker is None):
+            # use tuple to avoid being treated as a data member in join and append
+            self.id_tracker = (self.size, set(self.p1.id.tolist()))
+        id_set = self.id_tracker[1]
+        new_sel = np.array([not i in id_set for i in ids.tolist()], dtype=bool)
+        id_set.update(ids[new_sel].tolist())
+        return new_sel
+
     def removeDuplicate(self):
-        """ removed duplicated escapers, keep the first appearing one
+        """ removed duplicated escapers, keep the one with the earliest escaping time
         Use the first component id to check duplicate. 
+        Used to merge escaper lists of different processes, the output is sorted by id
         """
-        unid, index= np.unique(self.p1.id, return_index=True)
-        newdata=self[index]
+        index_sort = np.lexsort((self.time, self.p1.id))
+        unid, index= np.unique(self.p1.id[index_sort], return_index=True)
+        newdata=self[index_sort[index]]
         self.__init__(newdata,**self.initargs)
+        self.id_tracker = (self.size, set(self.p1.id.tolist()))
 
 def calcRCutIsolate(rh):
     """ For isolated star clusters, set rcut to 20 * half-mass radius
@@ -0,0 +1,415 @@
+# find the tree time step and the opening angle for the best performance of PeTar
+import numpy as np
+import os
+import re
+import time
+import shlex
+import signal
+import subprocess
+import multiprocessing as mp
+from .base import *
+from .profile import *
+from .status import *
+
+class TreeStepResult(DictNpArrayMix):
+    """ Performance and energy error of test runs with different tree time steps and opening angles
+    Keys: (class members)
+        dt_soft (1D): tree time step
+        theta (1D): opening angle
+        cost (1D): wallclock time per time unit (median of steps, maximum of MPI ranks)
+        hard (1D): wallclock time per time unit of short-range integration (hard_single, hard_isolated, hard_connected, hard_interrupt)
+        tree (1D): wallclock time per time unit of particle-tree (tree_neighbor, tree_force, force_correct, kick)
+        cluster (1D): wallclock time per time unit of cluster and group finding (search_cluster, create_group)
+        domain (1D): wallclock time per time unit of domain decomposition and particle exchange (domain_decomp, exchange_ptcl)
+        n_step (1D): number of tree steps per time unit
+        error (1D): relative cumulative energy error at the end of the run
+        error_sd (1D): relative cumulative slowdown energy error at the end of the run
+        wallclock (1D): total wallclock time of the run including the initialization
+        flag (1D): 0: finished; 1: terminated because it is too slow; 2: failed (no profile output)
+    """
+    def __init__ (self, _dat=None, _offset=int(0), _append=False, **kwargs):
+        """ DictNpArrayMix type initialzation, see help(DictNpArrayMix.__init__)
+        """
+        keys = [['dt_soft',1], ['theta',1], ['cost',1], ['hard',1], ['tree',1], ['cluster',1], ['domain',1], ['n_step',1], ['error',1], ['error_sd',1], ['wallclock',1], ['flag',1]]
+        DictNpArrayMix.__init__(self, keys, _dat, _offset, _append, **kwargs)
+
+    def findParetoFront(self):
+        """ Find finished runs on the Pareto front of the cost and the energy error
+        A run is on the front if no other run is both faster and more accurate.
+
+        Return
+        ----------
+        sel: 1D numpy.ndarray (bool)
+            True for runs on the Pareto front
+        """
+        sel = np.zeros(self.size, dtype=bool)
+        valid = (self.flag==0)
+        if (valid.sum()==0): return sel
+        index = np.where(valid)[0]
+        error = np.abs(self.error_sd[index])
+        error[np.isnan(error)] = np.inf
+        # sort by cost, then a run is on the front if its error is smaller than all faster runs
+        order = np.lexsort((error, self.cost[index]))
+        error_min = np.inf
+        for i in order:
+            if (error[i] < error_min):
+                sel[index[i]] = True
+                error_min = error[i]
+        return sel
+
+    def printSummary(self):
+        """ Print the results sorted by opening angle and tree time step, * indicates the run on the Pareto front of the cost and the energy error
+        """
+        name_format='{:>14}'
+        value_format='{:>14.6g}'
+        flag_names = ['', 'slow', 'failed']
+        front = self.findParetoFront()
+        keys = ['theta','dt_soft','cost','hard','tree','cluster','domain','n_step','error','error_sd','wallclock']
+        print(''.join([name_format.format(key) for key in keys]), name_format.format('status'))
+        for i in np.lexsort((self.dt_soft, self.theta)):
+            status = flag_names[int(self.flag[i])]
+            if (front[i]): status = '*'
+            print(''.join([value_format.format(self[key][i]) for key in keys]), name_format.format(status))
+
+def regularTimeStep(dt):
+    """ Regularize the time step to 0.5^[integer] (as PeTar does)
+
+    Parameters
+    ----------
+    dt: float
+        time step
+
+    Return
+    ----------
+    dt_reg: float
+        regularized time step (not larger than dt)
+    """
+    return 0.5**np.ceil(-np.log2(dt))
+
+class TreeStepTrial():
+    """ One test run of petar with a given tree time step and opening angle
+    The run is performed in an individual directory with the write style 3 (only status and profile are written).
+    The output interval is the tree time step, thus the profile of each tree step is recorded.
+
+    Members:
+        dt_soft: tree time step
+        theta: opening angle
+        path: working directory
+        span: evolved time of the run
+        proc: subprocess.Popen of the run
+        t_start: start wallclock time
+        wallclock: total wallclock time after the run finishes
+        killed: whether the run is terminated by the optimizer
+    """
+    def __init__(self, dt_soft, theta, path):
+        self.dt_soft = dt_soft
+        self.theta = theta
+        self.path = path
+        self.span = 0.0
+        self.proc = None
+        self.t_start = 0.0
+        self.wallclock = 0.0
+        self.killed = False
+
+    def start(self, command, time_zero, n_step, env=None):
+        """ Start the run
+
+        Parameters
+        ----------
+        command: list
+            petar command (prefix, executable and options) without the data filename
+        time_zero: float
+            initial time of the data
+        n_step: int
+            number of tree steps to evolve
+        env: dict (None)
+            environment variables of the run
+        """
+        os.makedirs(self.path, exist_ok=True)
+        self.span = self.dt_soft*(n_step + 0.01)
+        time_end = time_zero + self.span
+        args = command[:-1] + ['-w', '3', '-t', repr(time_end), '-s', repr(self.dt_soft), '-o', repr(self.dt_soft), '-T', repr(self.theta), command[-1]]
+        self.log = open(os.path.join(self.path, 'log'), 'w')
+        self.log.write(' '.join(args)+'\n')
+        self.log.flush()
+        self.t_start = time.time()
+        # use a new session to terminate all processes (e.g. mpiexec) together
+        self.proc = subprocess.Popen(args, cwd=self.path, stdout=self.log, stderr=subprocess.STDOUT, env=env, start_new_session=True)
+
+    def elapsed(self):
+        """ Wallclock time since the start
+        """
+        return time.time() - self.t_start
+
+    def poll(self):
+        """ Check whether the run is finished
+
+        Return
+        ----------
+        finished: bool
+        """
+        if (self.proc.poll() is None): return False
+        self.wallclock = self.elapsed()
+        self.log.close()
+        return True
+
+    def kill(self):
+        """ Terminate the run
+        """
+        try:
+            os.killpg(self.proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        self.proc.wait()
+        self.wallclock = self.elapsed()
+        self.log.close()
+        self.killed = True
+
+    def getResult(self, **kwargs):
+        """ Collect the performance and the energy error from the profile and status files
+
+        Parameters
+        ----------
+        kwargs: dict
+            keyword arguments of Profile, e.g. use_gpu
+
+        Return
+        ----------
+        result: TreeStepResult
+            one row result
+        step_time: float
+            total wallclock time of all tree steps
+        """
+        result = TreeStepResult(np.full((1, TreeStepResult().ncols), np.nan))
+        result.dt_soft[0] = self.dt_soft
+        result.theta[0] = self.theta
+        result.wallclock[0] = self.wallclock
+        result.flag[0] = 1 if self.killed else 2
+        step_time = 0.0
+        if (self.killed): return result, step_time
+
+        # PeTar may modify the tree time step
+        dt_soft = self.dt_soft
+        log_text = open(os.path.join(self.path, 'log'), 'r').read()
+        match = re.search(r'dt_soft\s*=\s*(\S+)', log_text)
+        if (match is not None):
+            dt_soft = float(match.group(1))
+            result.dt_soft[0] = dt_soft
+
+        prefix = os.path.join(self.path, 'data')
+        try:
+            prof = MultiRankProfile(prefix, n_cpu=1, **kwargs)
+        except (ValueError, OSError):
+            return result, step_time
+        sel = (prof.profiles[0].nstep>0)
+        if (sel.sum()==0): return result, step_time
+        comp = prof.comp[:,sel,:]
+        index = dict([(key, i) for i, key in enumerate(prof.comp_names)])
+        # the slowest rank determines the wallclock time of a step
+        total = comp[:,:,index['total']].max(axis=0)
+        imed = np.argsort(total)[(total.size-1)//2]
+        n_step = 1.0/dt_soft
+        groups = {'hard':MultiRankProfile.hard_components,
+                  'tree':['tree_neighbor','tree_force','force_correct','kick'],
+                  'cluster':['search_cluster','create_group'],
+                  'domain':['domain_decomp','exchange_ptcl']}
+        result.cost[0] = total[imed]*n_step
+        for key, names in groups.items():
+            result[key][0] = comp[:,imed,[index[name] for name in names]].sum(axis=1).max()*n_step
+        result.n_step[0] = n_step
+        step_time = np.sum(total*prof.profiles[0].nstep[sel])
+
+        status_file = prefix+'.status'
+        if (os.path.exists(status_file)):
+            try:
+                status = Status()
+                status.loadtxt(status_file, skiprows=1)
+                if (status.size>0):
+                    result.error[0] = status.energy.error_cum[-1]/status.energy.etot[-1]
+                    result.error_sd[0] = status.energy_sd.error_cum[-1]/status.energy_sd.etot[-1]
+            except ValueError:
+                pass
+        result.flag[0] = 0
+        return result, step_time
+
+class TreeStepOptimizer():
+    """ Find the tree time step (and the opening angle) for the best performance by short test runs of petar
+
+    For each opening angle, the golden-section search is applied to the tree time step of 0.5^k with integer k.
+    The wallclock time per time unit is assumed to be unimodal as a function of k:
+    when the step is too large, the short-range integration dominates; when it is too small, the tree force calculation dominates.
+    The searches of all opening angles are performed together and the test runs are launched concurrently within the core budget.
+    A run is terminated if its wallclock time exceeds the initialization time + kill_factor * (best cost) * (evolved time),
+    the terminated runs are treated as infinitely slow.
+
+    Members:
+        results: TreeStepResult of all finished runs
+    """
+    def __init__(self, filename, command='petar', options='', prefix=None, n_mpi=1, n_omp=None, n_core=int(0), work_dir='.find_dt', **kwargs):
+        """
+        Parameters
+        ----------
+        filename: string
+            petar input data filename
+        command: string ('petar')
+            petar executable
+        options: string ('')
+            other petar options, -w, -t, -s, -o and -T should not be included
+        prefix: string (None)
+            prefix before the petar executable, e.g. 'mpiexec -n 2'; if None, use 'mpiexec -n [n_mpi]' when n_mpi>1
+        n_mpi: int (1)
+            number of MPI processes per run
+        n_omp: int (None)
+            number of OpenMP threads per MPI process, set by OMP_NUM_THREADS;
+            if None, OMP_NUM_THREADS is not changed and one core per MPI process is assumed to determine the number of concurrent runs
+        n_core: int (0)
+            number of CPU cores to use, if 0, use all cores
+        work_dir: string ('.find_dt')
+            directory to store the test runs
+        kwargs: dict
+            n_step: number of tree steps of each run (6)
+            kill_factor: terminate the run slower than this factor times the best one (3.0)
+            timeout: maximum wallclock time (seconds) of each run before any run finishes (10000)
+            poll_interval: time interval (seconds) to check runs (0.1)
+            use_gpu: whether the profile contains GPU columns (False)
+        """
+        self.filename = os.path.abspath(filename)
+        self.n_mpi = n_mpi
+        self.n_omp = n_omp
+        if (prefix is None):
+            prefix = 'mpiexec -n '+str(n_mpi) if (n_mpi>1) else ''
+        self.command = shlex.split(prefix) + [command] + shlex.split(options) + [self.filename]
+        if (n_core==0): n_core = mp.cpu_count()
+        self.n_parallel = max(1, n_core//(n_mpi*(1 if n_omp is None else n_omp)))
+        self.work_dir = work_dir
+        self.env = os.environ.copy()
+        if (n_omp is not None): self.env['OMP_NUM_THREADS'] = str(n_omp)
+
+        self.n_step = 6
+        self.kill_factor = 3.0
+        self.timeout = 10000.0
+        self.poll_interval = 0.1
+        self.use_gpu = False
+        if ('n_step' in kwargs.keys()): self.n_step = kwargs['n_step']
+        if ('kill_factor' in kwargs.keys()): self.kill_factor = kwargs['kill_factor']
+        if ('timeout' in kwargs.keys()): self.timeout = kwargs['timeout']
+        if ('poll_interval' in kwargs.keys()): self.poll_interval = kwargs['poll_interval']
+        if ('use_gpu' in kwargs.keys()): self.use_gpu = kwargs['use_gpu']
+
+        with open(self.filename, 'r') as f:
+            self.time_zero = float(f.readline().split()[2])
+        self.results = TreeStepResult()
+        self.cache = dict()
+        self.best_cost = np.inf
+        self.t_init = 0.0
+
+    def findDefaultTimeStep(self):
+        """ Get the tree time step determined by petar (0.1*r_out/sigma_1D) from a run with zero evolved time
+
+        Return
+        ----------
+        dt_soft: float
+        """
+        os.makedirs(self.work_dir, exist_ok=True)
+        args = self.command[:-1] + ['-w', '0', '-t', '0.0', self.command[-1]]
+        out = subprocess.run(args, cwd=self.work_dir, env=self.env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True).stdout
+        match = re.search(r'dt_soft\s*=\s*(\S+)', out)
+        if (match is None):
+            raise ValueError('Cannot find dt_soft in the output of ', ' '.join(args))
+        return float(match.group(1))
+
+    def _timeLimit(self, trial):
+        if (np.isinf(self.best_cost)): return self.timeout
+        return self.t_init + 1.0 + self.kill_factor*self.best_cost*trial.span
+
+    def evaluate(self, candidates):
+        """ Run candidates concurrently and collect results, the finished candidates are skipped
+
+        Parameters
+        ----------
+        candidates: list
+            list of (k, theta), the tree time step is 0.5^k
+        """
+        queue = [c for c in dict.fromkeys(candidates) if not c in self.cache.keys()]
+        running = []
+        while (len(queue)>0) | (len(running)>0):
+            while (len(queue)>0) & (len(running)<self.n_parallel):
+                k, theta = queue.pop(0)
+                dt = 0.5**k
+                trial = TreeStepTrial(dt, theta, os.path.join(self.work_dir, 'dt_%.8g_theta_%g' % (dt, theta)))
+                trial.start(self.command, self.time_zero, self.n_step, self.env)
+                running.append(((k, theta), trial))
+            time.sleep(self.poll_interval)
+            for item in running[:]:
+                key, trial = item
+                finished = trial.poll()
+                if (not finished) & (trial.elapsed() > self._timeLimit(trial)):
+                    trial.kill()
+                    finished = True
+                if (finished):
+                    running.remove(item)
+                    res, step_time = trial.getResult(use_gpu=self.use_gpu)
+                    if (res.flag[0]==0):
+                        self.best_cost = min(self.best_cost, res.cost[0])
+                        self.t_init = max(self.t_init, trial.wallclock - step_time)
+                    self.cache[key] = res
+                    self.results.append(res)
+                    print('dt_soft: %-12.8g theta: %-6g wallclock/time_unit: %-12.6g error_sd: %-12.6g wallclock: %-10.4g %s' %
+                          (res.dt_soft[0], res.theta[0], res.cost[0], res.error_sd[0], res.wallclock[0], ['finished','terminated','failed'][int(res.flag[0])]), flush=True)
+
+    def _cost(self, key):
+        res = self.cache[key]
+        if (res.flag[0]==0): return res.cost[0]
+        return np.inf
+
+    def search(self, dt_soft=None, theta_list=[0.3], k_range=3):
+        """ Golden-section search of the best tree time step for each opening angle
+
+        Parameters
+        ----------
+        dt_soft: float (None)
+            center of the search range of the tree time step, if None, use the default value of petar (see findDefaultTimeStep)
+        theta_list: list ([0.3])
+            opening angles to test
+        k_range: int (3)
+            the search range of the tree time step is from dt_soft*2^k_range to dt_soft*0.5^k_range
+
+        Return
+        ----------
+        best: dict
+            for each opening angle, the TreeStepResult of the best tree time step
+        """
+        if (dt_soft is None):
+            dt_soft = self.findDefaultTimeStep()
+            print('Default dt_soft:', dt_soft)
+        k0 = int(np.round(-np.log2(regularTimeStep(dt_soft))))
+        inv_phi = (np.sqrt(5.0)-1.0)*0.5
+        # search intervals [a,b] of k for each theta
+        bracket = dict([(theta, [k0-k_range, k0+k_range]) for theta in theta_list])
+        while True:
+            candidates = []
+            for theta, (a, b) in bracket.items():
+                if (b-a<=2):
+                    candidates += [(k, theta) for k in range(a, b+1)]
+                else:
+                    c = b - int(np.round((b-a)*inv_phi))
+                    d = a + int(np.round((b-a)*inv_phi))
+                    if (c==d): d = c+1
+                    candidates += [(c, theta), (d, theta)]
+            self.evaluate(candidates)
+            finished = True
+            for theta, (a, b) in bracket.items():
+                if (b-a<=2): continue
+                finished = False
+                c = b - int(np.round((b-a)*inv_phi))
+                d = a + int(np.round((b-a)*inv_phi))
+                if (c==d): d = c+1
+                if (self._cost((c, theta)) <= self._cost((d, theta))): bracket[theta] = [a, d]
+                else: bracket[theta] = [c, b]
+            if (finished): break
+
+        best = dict()
+        for theta, (a, b) in bracket.items():
+            kbest = min(range(a, b+1), key=lambda k: self._cost((k, theta)))
+            best[theta] = self.cache[(kbest, theta)]
+        return best
@@ -0,0 +1,194 @@
+# gether output files of MPI ranks from petar
+import heapq
+import os
+import re
+import multiprocessing as mp
+
+# record types of SSE/BSE logs: (first column, output suffix, function of the time column index from the number of columns after removing the first column)
+# an empty first column matches any line, for BSE type change, the first column is the binary type name
+# the time of type change is the time of the final status, the time of SN kick is the time of the kicked star, the time of dynamical merger is the time of the final status of the first component
+SSE_RECORDS = [('Type_change', 'type_change', lambda n: 19),
+               ('SN_kick', 'sn_kick', lambda n: 10)]
+BSE_RECORDS = [('Dynamic_merge:', 'dynamic_merge', lambda n: n-12),
+               ('SN_kick', 'sn_kick', lambda n: 12),
+               ('', 'type_change', lambda n: 11)]
+
+def findRankFiles(filename_prefix, suffix, n_rank=None):
+    """ Find the files of MPI ranks: [filename_prefix].[suffix].[rank]
+
+    Parameters
+    ----------
+    filename_prefix: string
+        data filename prefix of petar
+    suffix: string
+        file suffix, e.g. esc, group, sse, bse
+    n_rank: int (None)
+        number of MPI ranks, if None, find all existing files
+
+    Return
+    ----------
+    file_list: list
+        file names sorted by rank
+    """
+    name = filename_prefix + '.' + suffix
+    if (n_rank is not None):
+        return [name+'.'+str(i) for i in range(n_rank) if os.path.exists(name+'.'+str(i))]
+    path = os.path.dirname(name)
+    base = os.path.basename(name)
+    pattern = re.compile(re.escape(base)+r'\.([0-9]+)$')
+    ranks = []
+    for fname in os.listdir(path if path!='' else '.'):
+        match = pattern.match(fname)
+        if (match is not None): ranks.append(int(match.group(1)))
+    return [name+'.'+str(i) for i in sorted(ranks)]
+
+def _readRankRecords(filename, rank, records, time_column):
+    """ Generator of records of one rank file: (time, rank, line index, record index, line, words)
+    words are the columns after removing the record prefix, the header line is indicated by the record index -1.
+    The lines with the wrong format keep the time of the previous line to keep the order in the rank.
+    """
+    time = -float('inf')
+    with open(filename, 'r') as f:
+        for i, line in enumerate(f):
+            words = line.split()
+            if (len(words)==0): continue
+            if (not line.endswith('\n')): line += '\n'
+            irec = 0
+            itime = time_column
+            if (records is not None):
+                for irec, (prefix, suffix, index) in enumerate(records):
+                    if (prefix=='') | (words[0]==prefix): break
+                words = words[1:]
+                itime = index(len(words))
+            try:
+                time = float(words[itime])
+            except (ValueError, IndexError):
+                if (i==0) & (records is None):
+                    yield (time, rank, i, -1, line, words)
+                    continue
+            yield (time, rank, i, irec, line, words)
+
+def getherOneSuffix(filename_prefix, suffix, output_prefix, n_rank=None):
+    """ Gether the files of all MPI ranks with one suffix in one pass
+
+    Each rank file is read once, the records of ranks are merged in the time order by a k-way merge,
+    assuming that the records in each rank file are in the time order.
+    The merged records are written to [output_prefix].[suffix], and at the same time:
+        group: split into [output_prefix].group.n[number of members] by the number of members (second column);
+        sse: split into [output_prefix].sse.[type_change|sn_kick] with the record prefix removed;
+        bse: split into [output_prefix].bse.[type_change|sn_kick|dynamic_merge] with the record prefix (for type change, the binary type name) removed.
+    For esc, the column title line of the first rank is kept at the beginning.
+
+    Parameters
+    ----------
+    filename_prefix: string
+        data filename prefix of petar
+    suffix: string
+        esc, group, sse or bse
+    output_prefix: string
+        output filename prefix
+    n_rank: int (None)
+        number of MPI ranks, if None, find all existing files
+
+    Return
+    ----------
+    output_list: list
+        output file names
+    """
+    file_list = findRankFiles(filename_prefix, suffix, n_rank)
+    if (len(file_list)==0): return []
+
+    records = None
+    time_column = 0
+    if (suffix=='group'): time_column = 2
+    elif (suffix=='sse'): records = SSE_RECORDS
+    elif (suffix=='bse'): records = BSE_RECORDS
+
+    out_name = output_prefix + '.' + suffix
+    fout = open(out_name, 'w')
+    outputs = {}
+    if (records is not None):
+        for prefix, rec_suffix, index in records:
+            outputs[rec_suffix] = open(out_name+'.'+rec_suffix, 'w')
+
+    gens = [_readRankRecords(fname, rank, records, time_column) for rank, fname in enumerate(file_list)]
+    header_written = False
+    for time, rank, i, irec, line, words in heapq.merge(*gens):
+        if (irec==-1):
+            if (not header_written): fout.write(line)
+            header_written = True
+            continue
+        fout.write(line)
+        if (suffix=='group'):
+            n = words[1]
+            if (not n in outputs.keys()): outputs[n] = open(out_name+'.n'+n, 'w')
+            outputs[n].write(line)
+        elif (records is not None):
+            outputs[records[irec][1]].write(' '.join(words)+'\n')
+    fout.close()
+    for f in outputs.values(): f.close()
+    return [out_name] + [f.name for f in outputs.values()]
+
+def getherSnapshotList(filename_prefix, output_filename):
+    """ Write the list of snapshot files [filename_prefix].[file id] sorted by file id
+
+    Parameters
+    ----------
+    filename_prefix: string
+        data filename prefix of petar
+    output_filename: string
+        output file name of the list
+
+    Return
+    ----------
+    path_list: list
+        snapshot file names
+    """
+    path = os.path.dirname(filename_prefix)
+    base = os.path.basename(filename_prefix)
+    pattern = re.compile(re.escape(base)+r'\.([0-9]+)$')
+    fids = []
+    for fname in os.listdir(path if path!='' else '.'):
+        match = pattern.match(fname)
+        if (match is not None): fids.append(int(match.group(1)))
+    path_list = [filename_prefix+'.'+str(i) for i in sorted(fids)]
+    with open(output_filename, 'w') as f:
+        for name in path_list: f.write(name+'\n')
+    return path_list
+
+def getherData(filename_prefix, output_prefix=None, suffixes=['esc','group','sse','bse'], n_rank=None, n_cpu=int(0)):
+    """ Gether the output files of all MPI ranks, the suffixes are processed in parallel, see help(getherOneSuffix)
+    The list of snapshot files is written to [output_prefix].snap.lst
+
+    Parameters
+    ----------
+    filename_prefix: string
+        data filename prefix of petar
+    output_prefix: string (None)
+        output filename prefix, if None, use filename_prefix
+    suffixes: list (['esc','group','sse','bse'])
+        file suffixes to gether
+    n_rank: int (None)
+        number of MPI ranks, if None, find all existing files
+    n_cpu: int (0)
+        number of processes, if 0, use all CPU cores
+
+    Return
+    ----------
+    output_list: list
+        output file names
+    """
+    if (output_prefix is None): output_prefix = filename_prefix
+    if (n_cpu==0): n_cpu = mp.cpu_count()
+    n_cpu = max(1, min(n_cpu, len(suffixes)))
+    if (n_cpu>1):
+        pool = mp.Pool(n_cpu)
+        out_async = [pool.apply_async(getherOneSuffix, (filename_prefix, suffix, output_prefix, n_rank)) for suffix in suffixes]
+        pool.close()
+        pool.join()
+        output_list = sum([res.get() for res in out_async], [])
+    else:
+        output_list = sum([getherOneSuffix(filename_prefix, suffix, output_prefix, n_rank) for suffix in suffixes], [])
+    getherSnapshotList(filename_prefix, output_prefix+'.snap.lst')
+    output_list.append(output_prefix+'.snap.lst')
+    return output_list
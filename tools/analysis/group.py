@@ -64,4 +64,356 @@ class GroupInfo(DictNpArrayMix):
 
         keys_bin = [['bin'+str(i),BinaryTree] for i in range(n-1)]
         DictNpArrayMix.__init__(self, keys_bin, _dat, _offset+self.ncols, True, **kwargs)
+
+    def getLevelNumber(self):
+        """ Number of binary tree levels (number of members - 1)
+        """
+        return len([key for key, parameter in self.keys if key[:3]=='bin'])
+
+    def findParentLevel(self, rtol=1e-6):
+        """ Find the parent level of each binary tree level for all groups at once
+        The levels are stored in the pre-order of the binary tree, bin0 is the root (the outermost orbit).
+        Thus the parent of level j is the member slot visited most recently that is still open: the slots of the later levels first, and p1 before p2 in the same level.
+        The parent slot should have the mass equal to the total mass m1+m2 of level j, the open slots visited after the parent slot are leaves (single stars) and are closed.
+        Each slot is assigned to at most one level, thus equal-mass members (e.g. in equal-mass triples) do not confuse the levels.
+
+        Parameters
+        ----------
+        rtol: float (1e-6)
+            relative tolerance of mass matching, the levels without a match have the parent -1
+
+        Return
+        ----------
+        parent: 2D numpy.ndarray (int)
+            parent level index with the shape of (size, number of levels), -1 for the root
+        member: 2D numpy.ndarray (int)
+            member index (0: p1; 1: p2) in the parent level, -1 for the root
+        """
+        n_level = self.getLevelNumber()
+        parent = np.full((self.size, n_level), -1, dtype=int)
+        member = np.full((self.size, n_level), -1, dtype=int)
+        # slot q = 2*i+1-k is the member k of level i, a larger q is visited later in the pre-order
+        mass = np.zeros((self.size, 2*n_level))
+        is_open = np.zeros((self.size, 2*n_level), dtype=bool)
+        for j in range(n_level):
+            bj = self['bin'+str(j)]
+            if (j>0):
+                mj = bj.m1 + bj.m2
+                match = is_open[:,:2*j] & (np.abs(mass[:,:2*j] - mj[:,None]) <= rtol*np.abs(mj)[:,None])
+                found = match.any(axis=1)
+                # the matched slot visited most recently
+                q = 2*j - 1 - np.argmax(match[:,::-1], axis=1)
+                parent[found, j] = q[found]//2
+                member[found, j] = 1 - q[found]%2
+                # the parent slot is used and the open slots visited after it are leaves
+                is_open[found, :2*j] &= (np.arange(2*j)[None,:] < q[found][:,None])
+            mass[:,2*j+1] = bj.m1
+            mass[:,2*j] = bj.m2
+            is_open[:, 2*j:2*j+2] = True
+        return parent, member
+
+    def getHierarchyPairs(self, rtol=1e-6):
+        """ Get all inner and outer orbit pairs of the groups at once, see HierarchyPair
+
+        Parameters
+        ----------
+        rtol: float (1e-6)
+            relative tolerance of mass matching to find the parent level, see findParentLevel
+
+        Return
+        ----------
+        pairs: HierarchyPair
+            rows are sorted by the group row index and then the inner level index
+        """
+        n_level = self.getLevelNumber()
+        if (n_level<2): return HierarchyPair()
+        parent, member = self.findParentLevel(rtol)
+        row_list = []
+        for j in range(1, n_level):
+            found = parent[:,j]>=0
+            if (found.sum()==0): continue
+            rows = np.where(found)[0]
+            inner = self['bin'+str(j)]
+            pair = HierarchyPair(np.zeros((rows.size, HierarchyPair().ncols)))
+            pair.row = rows.astype(float)
+            pair.type = self.type[rows]
+            pair.time = self.time[rows]
+            pair.n = self.n[rows]
+            pair.inner[:] = j
+            pair.outer = parent[rows,j].astype(float)
+            # gether the outer level of each row from all levels
+            outer_index = parent[rows,j]
+            def outerValue(key):
+                value = np.array([self['bin'+str(i)][key][rows] for i in range(j)])
+                return value[outer_index, np.arange(rows.size)]
+            pair.semi_in = inner.semi[rows]
+            pair.semi_out = outerValue('semi')
+            pair.ecc_in = inner.ecc[rows]
+            pair.ecc_out = outerValue('ecc')
+            am_in = inner.am[rows]
+            am_out = np.array([self['bin'+str(i)].am[rows] for i in range(j)])[outer_index, np.arange(rows.size)]
+            cos_inc = vecDot(am_in, am_out)/np.maximum(np.sqrt(vecDot(am_in,am_in)*vecDot(am_out,am_out)),1e-300)
+            pair.incline_rel = np.arccos(np.clip(cos_inc, -1.0, 1.0))
+            pair.period_ratio = outerValue('period')/inner.period[rows]
+            pair.stab = outerValue('stab')
+            pair.sd_in = inner.sd[rows]
+            pair.sd_out = outerValue('sd')
+            row_list.append(pair)
+        if (len(row_list)==0): return HierarchyPair()
+        pairs = join(*row_list)
+        return pairs[np.lexsort((pairs.inner, pairs.row))]
             
+
+class HierarchyPair(DictNpArrayMix):
+    """ Inner and outer orbit pairs of hierarchical groups (triples, quadruples ...) extracted from GroupInfo
+    Each row is one pair of an inner binary tree level and its parent level (the outer orbit) in one group record.
+    Keys: (class members)
+        row (1D): row index of the group in GroupInfo
+        type (1D): group record type (0: new group; 1: end of group)
+        time (1D): time of the group record
+        n (1D): number of members of the group
+        inner (1D): binary tree level index of the inner orbit (binX)
+        outer (1D): binary tree level index of the outer orbit
+        semi_in (1D): semi-major axis of the inner orbit
+        semi_out (1D): semi-major axis of the outer orbit
+        ecc_in (1D): eccentricity of the inner orbit
+        ecc_out (1D): eccentricity of the outer orbit
+        incline_rel (1D): relative inclination between the inner and outer orbits (radian)
+        period_ratio (1D): period of the outer orbit / period of the inner orbit
+        stab (1D): stability factor of the outer level (>1: unstable)
+        sd_in (1D): slowdown factor of the inner orbit
+        sd_out (1D): slowdown factor of the outer orbit
+    """
+    def __init__(self, _dat=None, _offset=int(0), _append=False, **kwargs):
+        """ DictNpArrayMix type initialzation, see help(DictNpArrayMix.__init__)
+        """
+        keys = [['row',1], ['type',1], ['time',1], ['n',1], ['inner',1], ['outer',1], ['semi_in',1], ['semi_out',1], ['ecc_in',1], ['ecc_out',1],
+                ['incline_rel',1], ['period_ratio',1], ['stab',1], ['sd_in',1], ['sd_out',1]]
+        DictNpArrayMix.__init__(self, keys, _dat, _offset, _append, **kwargs)
+
+    def calcWindowStatistics(self, time_edges):
+        """ Calculate statistics of stability factors and period ratios of pairs in time windows
+
+        Parameters
+        ----------
+        time_edges: 1D numpy.ndarray
+            edges of time windows (increasing), window i is [time_edges[i], time_edges[i+1])
+
+        Return
+        ----------
+        stat: HierarchyStatistics
+            one row per window
+        """
+        n_window = time_edges.size - 1
+        iwin = np.searchsorted(time_edges, self.time, side='right') - 1
+        sel = (iwin>=0) & (iwin<n_window)
+        iwin = iwin[sel]
+        stab = self.stab[sel]
+        ratio = self.period_ratio[sel]
+        count = np.bincount(iwin, minlength=n_window)
+        nonzero = (count>0)
+        def meanWindow(value):
+            mean = np.full(n_window, np.nan)
+            mean[nonzero] = np.bincount(iwin, weights=value, minlength=n_window)[nonzero]/count[nonzero]
+            return mean
+        def medianWindow(value):
+            # sort by window then value, the median of each window is in the middle of its segment
+            order = np.lexsort((value, iwin))
+            v = value[order]
+            start = np.append(0, np.cumsum(count)[:-1])
+            median = np.full(n_window, np.nan)
+            lo = start[nonzero] + (count[nonzero]-1)//2
+            hi = start[nonzero] + count[nonzero]//2
+            median[nonzero] = 0.5*(v[lo] + v[hi])
+            return median
+
+        stat = HierarchyStatistics()
+        stat.time_start = time_edges[:-1].astype(float)
+        stat.time_end = time_edges[1:].astype(float)
+        stat.n = count.astype(float)
+        stat.n_unstable = np.bincount(iwin, weights=(stab>1).astype(float), minlength=n_window)
+        stat.stab_mean = meanWindow(stab)
+        stat.stab_median = medianWindow(stab)
+        stat.period_ratio_mean = meanWindow(ratio)
+        stat.period_ratio_median = medianWindow(ratio)
+        stat.size = n_window
+        return stat
+
+class HierarchyStatistics(DictNpArrayMix):
+    """ Statistics of hierarchical pairs in time windows, generated by HierarchyPair.calcWindowStatistics
+    Keys: (class members)
+        time_start (1D): start time of the window
+        time_end (1D): end time of the window
+        n (1D): number of pairs
+        n_unstable (1D): number of pairs with stab > 1
+        stab_mean (1D): mean stability factor
+        stab_median (1D): median stability factor
+        period_ratio_mean (1D): mean period ratio (outer/inner)
+        period_ratio_median (1D): median period ratio
+    """
+    def __init__(self, _dat=None, _offset=int(0), _append=False, **kwargs):
+        """ DictNpArrayMix type initialzation, see help(DictNpArrayMix.__init__)
+        """
+        keys = [['time_start',1], ['time_end',1], ['n',1], ['n_unstable',1], ['stab_mean',1], ['stab_median',1], ['period_ratio_mean',1], ['period_ratio_median',1]]
+        DictNpArrayMix.__init__(self, keys, _dat, _offset, _append, **kwargs)
+
+class GroupLog():
+    """ Raw group log output from PeTar ([data filename prefix].group or [data filename prefix].group.[MPI rank]) with different numbers of members
+    The rows are bucketed by the number of members (the column n), each bucket is a GroupInfo with the keyword argument N=n.
+    A global index sorted by time (stable for the same time) refers to the rows in buckets, thus groups of all multiplicities can be analyzed together.
+
+    Members:
+        groups: dict of the number of members and GroupInfo
+        time: 1D numpy.ndarray, time of all rows in the time order
+        n: 1D numpy.ndarray, number of members (bucket key) of all rows in the time order
+        index: 1D numpy.ndarray, row index in the bucket of all rows in the time order
+        initargs: keyword arguments of GroupInfo
+    """
+    def __init__(self, filename=None, **kwargs):
+        """
+        Parameters
+        ----------
+        filename: string | list (None)
+            raw group log file name or a list of file names (e.g. files of all MPI ranks), if None, initialize empty data
+        kwargs: dict
+            keyword arguments of GroupInfo except N, e.g. interrupt_mode
+        """
+        self.initargs = kwargs.copy()
+        self.groups = dict()
+        self.time = np.zeros(0)
+        self.n = np.zeros(0, dtype=int)
+        self.index = np.zeros(0, dtype=int)
+        if (filename is not None): self.loadtxt(filename)
+
+    def loadtxt(self, filename):
+        """ Read raw group logs in one pass, the existing data are replaced
+        The lines are bucketed by the second column (the number of members), then each bucket is converted to a 2D array at once.
+        The lines with a wrong number of columns (e.g. the last incomplete line of a running simulation) are skipped.
+
+        Parameters
+        ----------
+        filename: string | list
+            raw group log file name or a list of file names
+        """
+        file_list = [filename] if (type(filename)==str) else filename
+        lines = collections.defaultdict(list)
+        line_index = collections.defaultdict(list)
+        iline = 0
+        for fname in file_list:
+            with open(fname, 'r') as f:
+                for line in f:
+                    words = line.split(None, 2)
+                    if (len(words)<3): continue
+                    try:
+                        n = int(float(words[1]))
+                    except ValueError:
+                        continue
+                    lines[n].append(line)
+                    line_index[n].append(iline)
+                    iline += 1
+
+        self.groups = dict()
+        time = []
+        n_all = []
+        index = []
+        order = []
+        for n in sorted(lines.keys()):
+            ncols = GroupInfo(N=n, **self.initargs).ncols
+            words = [line.split() for line in lines[n]]
+            sel = [i for i, w in enumerate(words) if len(w)==ncols]
+            dat = np.empty((len(sel), ncols))
+            for k, i in enumerate(sel): dat[k] = words[i]
+            self.groups[n] = GroupInfo(dat, N=n, **self.initargs)
+            time.append(self.groups[n].time)
+            n_all.append(np.full(len(sel), n, dtype=int))
+            index.append(np.arange(len(sel)))
+            order.append(np.array(line_index[n], dtype=int)[sel])
+        if (len(self.groups)==0):
+            self.time = np.zeros(0)
+            self.n = np.zeros(0, dtype=int)
+            self.index = np.zeros(0, dtype=int)
+            return
+        # sort by time, rows with the same time keep the order in files
+        time = np.concatenate(time)
+        isort = np.lexsort((np.concatenate(order), time))
+        self.time = time[isort]
+        self.n = np.concatenate(n_all)[isort]
+        self.index = np.concatenate(index)[isort]
+
+    def __getitem__(self, n):
+        """ Get the GroupInfo of groups with n members
+        """
+        return self.groups[n]
+
+    def keys(self):
+        """ Numbers of members existing in the log
+        """
+        return self.groups.keys()
+
+    @property
+    def size(self):
+        """ Total number of rows
+        """
+        return self.time.size
+
+    def selectTime(self, t_min=None, t_max=None):
+        """ Select rows in a time range [t_min, t_max]
+
+        Parameters
+        ----------
+        t_min: float (None)
+            minimum time, if None, no lower limit
+        t_max: float (None)
+            maximum time, if None, no upper limit
+
+        Return
+        ----------
+        log: GroupLog
+            selected rows
+        """
+        lo = 0 if (t_min is None) else np.searchsorted(self.time, t_min, side='left')
+        hi = self.time.size if (t_max is None) else np.searchsorted(self.time, t_max, side='right')
+        log = GroupLog(**self.initargs)
+        n = self.n[lo:hi]
+        index = self.index[lo:hi].copy()
+        for key, group in self.groups.items():
+            sel_key = (n==key)
+            if (sel_key.sum()==0): continue
+            sel = np.zeros(group.size, dtype=bool)
+            sel[index[sel_key]] = True
+            log.groups[key] = group[sel]
+            # new row index in the selected bucket
+            index[sel_key] = (np.cumsum(sel)-1)[index[sel_key]]
+        log.time = self.time[lo:hi].copy()
+        log.n = n.copy()
+        log.index = index
+        return log
+
+    def getHierarchyPairs(self, rtol=1e-6):
+        """ Get the inner and outer orbit pairs of groups with at least three members, see help(GroupInfo.getHierarchyPairs)
+
+        Parameters
+        ----------
+        rtol: float (1e-6)
+            relative tolerance of mass matching to find the parent level
+
+        Return
+        ----------
+        pairs: HierarchyPair
+            pairs of all numbers of members, sorted by time, the member row is the row index in the bucket of the number of members (member n)
+        """
+        pair_list = [group.getHierarchyPairs(rtol) for key, group in self.groups.items() if key>2]
+        pair_list = [pairs for pairs in pair_list if pairs.size>0]
+        if (len(pair_list)==0): return HierarchyPair()
+        pairs = join(*pair_list)
+        return pairs[np.argsort(pairs.time, kind='stable')]
+
+    def countGroups(self):
+        """ Count the new (type 0) and end (type 1) records of groups with each number of members
+
+        Return
+        ----------
+        count: dict
+            number of members and [number of new records, number of end records]
+        """
+        return dict([(key, [int((group.type==0).sum()), int((group.type==1).sum())]) for key, group in self.groups.items()])
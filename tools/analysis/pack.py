@@ -0,0 +1,366 @@
+# indexed archive of snapshots packed in one file with compressed column blocks
+import numpy as np
+import multiprocessing as mp
+import struct
+import zlib
+import os
+from .base import *
+from .data import *
+
+PACK_MAGIC = b'PETARPK1'
+# companion files of snapshots, the position is the companion code in the index
+PACK_COMPANIONS = ['', '.single', '.binary']
+
+class PackIndex(DictNpArrayMix):
+    """ Index of blocks in SnapshotPack, one row per snapshot or companion file
+    Keys: (class members)
+        fid (1D): file id of the snapshot
+        time (1D): time of the snapshot
+        n (1D): number of rows (particles of snapshot, singles or binaries of companions)
+        offset (1D): byte offset of the block in the pack file
+        nbytes (1D): byte size of the block
+        n_col (1D): number of columns
+        companion (1D): companion code, index of PACK_COMPANIONS (0: snapshot, 1: .single, 2: .binary)
+    """
+    def __init__ (self, _dat=None, _offset=int(0), _append=False, **kwargs):
+        """ DictNpArrayMix type initialzation, see help(DictNpArrayMix.__init__)
+        """
+        keys = [['fid',1], ['time',1], ['n',1], ['offset',1], ['nbytes',1], ['n_col',1], ['companion',1]]
+        DictNpArrayMix.__init__(self, keys, _dat, _offset, _append, **kwargs)
+
+def _compressColumns(dat, level):
+    """ Compress a 2D array column by column
+    The bytes of each float64 column are shuffled (all first bytes, then all second bytes, ...) before zlib compression,
+    which groups the sign/exponent bytes together and improves the compression ratio significantly.
+    The block starts with the compressed byte sizes of columns (uint64).
+    """
+    n = dat.shape[0]
+    blocks = []
+    for k in range(dat.shape[1]):
+        col = np.ascontiguousarray(dat[:,k], dtype=np.float64)
+        blocks.append(zlib.compress(col.view(np.uint8).reshape(n,8).T.tobytes(), level))
+    sizes = np.array([len(b) for b in blocks], dtype=np.uint64)
+    return sizes.tobytes() + b''.join(blocks)
+
+def _decompressColumn(raw, n):
+    return np.frombuffer(zlib.decompress(raw), dtype=np.uint8).reshape(8,n).T.copy().view(np.float64).ravel()
+
+def _packSnapshotWorker(args):
+    """ Read one snapshot and its companion files, return the index rows (without offset) and compressed blocks
+    """
+    file_path, companions, level = args
+    header = PeTarDataHeader(file_path)
+    rows = []
+    blocks = []
+    for code, suffix in enumerate(PACK_COMPANIONS):
+        if (code>0) & (not companions): break
+        filename = file_path + suffix
+        if (code>0) & (not os.path.exists(filename)): continue
+        if (os.path.getsize(filename)==0):
+            dat = np.zeros((0,0))
+        elif (code==0):
+            dat = np.loadtxt(filename, skiprows=1, ndmin=2)
+        else:
+            dat = np.loadtxt(filename, ndmin=2)
+        block = _compressColumns(dat, level)
+        rows.append([header.fid, header.time, dat.shape[0], 0, len(block), dat.shape[1], code])
+        blocks.append(block)
+    return rows, blocks
+
+def packSnapshots(path_list, pack_filename, n_cpu=int(0), companions=True, level=int(6)):
+    """ Pack snapshots and their companion files ([snapshot].single, [snapshot].binary) into one file
+
+    The snapshots are read and compressed in parallel, and the blocks are written sequentially in the order of path_list.
+    Each block stores the columns of one file separately compressed, thus a subset of columns can be read without decompressing the others.
+    The header of snapshot (file id, number of particles, time) is obtained by PeTarDataHeader and stored in the index (see PackIndex).
+    File layout: magic (8 bytes), blocks, index (PackIndex array in the numpy .npy format), byte offset of index (uint64) and magic.
+
+    Parameters
+    ----------
+    path_list: list
+        snapshot file paths
+    pack_filename: string
+        output pack file name
+    n_cpu: int (0)
+        number of processes to read and compress snapshots, if 0, use all CPU cores
+    companions: bool (True)
+        if True, also pack the existing companion files of snapshots generated by petar.data.process
+    level: int (6)
+        zlib compression level (0-9)
+
+    Return
+    ----------
+    pack: SnapshotPack
+    """
+    if (n_cpu==0): n_cpu = mp.cpu_count()
+    n_cpu = max(1, min(n_cpu, len(path_list)))
+    args = [(path, companions, level) for path in path_list]
+
+    index = []
+    with open(pack_filename+'.tmp', 'wb') as f:
+        f.write(PACK_MAGIC)
+        def writeBlocks(rows, blocks):
+            for row, block in zip(rows, blocks):
+                row[3] = f.tell()
+                f.write(block)
+                index.append(row)
+        if (n_cpu>1):
+            pool = mp.Pool(n_cpu)
+            for rows, blocks in pool.imap(_packSnapshotWorker, args):
+                writeBlocks(rows, blocks)
+            pool.close()
+            pool.join()
+        else:
+            for arg in args:
+                writeBlocks(*_packSnapshotWorker(arg))
+        index_offset = f.tell()
+        np.save(f, np.array(index, dtype=np.float64).reshape(-1,PackIndex().ncols))
+        f.write(struct.pack('<Q', index_offset) + PACK_MAGIC)
+    os.replace(pack_filename+'.tmp', pack_filename)
+    return SnapshotPack(pack_filename)
+
+class SnapshotPack():
+    """ Reader of the pack file generated by packSnapshots
+    Only the index is loaded at initialization, the blocks are read on demand by seeking the byte offset, thus snapshots can be accessed randomly by time or file id.
+
+    Example:
+        pack = SnapshotPack('data.pack')
+        particles = pack.load(time=10.0, interrupt_mode='bse')
+        mass = pack.readData(pack.findTimeIndex(10.0), columns=[0])
+
+    Members:
+        filename: pack file name
+        index: PackIndex of all blocks
+        snapshot_index: 1D numpy.ndarray (int), rows of snapshots (companion code 0) in index, sorted by time
+        time: 1D numpy.ndarray, sorted times of snapshots
+    """
+    def __init__(self, filename):
+        """
+        Parameters
+        ----------
+        filename: string
+            pack file name
+        """
+        self.filename = filename
+        with open(filename, 'rb') as f:
+            if (f.read(len(PACK_MAGIC))!=PACK_MAGIC):
+                raise ValueError('File ',filename,' is not a snapshot pack')
+            f.seek(-8-len(PACK_MAGIC), os.SEEK_END)
+            tail = f.read()
+            if (tail[8:]!=PACK_MAGIC):
+                raise ValueError('File ',filename,' is incomplete')
+            f.seek(struct.unpack('<Q', tail[:8])[0])
+            self.index = PackIndex(np.load(f))
+        sel = np.where(self.index.companion==0)[0]
+        self.snapshot_index = sel[np.argsort(self.index.time[sel], kind='stable')]
+        self.time = self.index.time[self.snapshot_index]
+
+    def findTimeIndex(self, time, rtol=1e-10):
+        """ Find the index rows of snapshots by time
+
+        Parameters
+        ----------
+        time: float | 1D numpy.ndarray
+            snapshot times
+        rtol: float (1e-10)
+            relative tolerance to match times, see help(searchTimeIndex)
+
+        Return
+        ----------
+        irow: int | 1D numpy.ndarray
+            rows in the member index, -1 if the time is not found
+        """
+        return searchTimeIndex(self.time, time, rtol, self.snapshot_index)
+
+    def findFileIndex(self, fid, companion=''):
+        """ Find the index row of a snapshot or its companion by file id
+
+        Parameters
+        ----------
+        fid: int
+            file id
+        companion: string ('')
+            '' for the snapshot, '.single' or '.binary' for the companion files
+
+        Return
+        ----------
+        irow: int
+            row in the member index, -1 if not found
+        """
+        code = PACK_COMPANIONS.index(companion)
+        sel = np.where((self.index.fid==fid) & (self.index.companion==code))[0]
+        if (sel.size==0): return -1
+        return sel[-1]
+
+    def selectTime(self, t_min=None, t_max=None):
+        """ Select the index rows of snapshots in a time range
+
+        Parameters
+        ----------
+        t_min: float (None)
+            minimum time, if None, no lower limit
+        t_max: float (None)
+            maximum time, if None, no upper limit
+
+        Return
+        ----------
+        irow: 1D numpy.ndarray (int)
+            rows in the member index sorted by time
+        """
+        sel = np.ones(self.time.size, dtype=bool)
+        if (t_min is not None): sel &= (self.time>=t_min)
+        if (t_max is not None): sel &= (self.time<=t_max)
+        return self.snapshot_index[sel]
+
+    def readBlock(self, irow):
+        """ Read the raw compressed block of an index row
+
+        Parameters
+        ----------
+        irow: int
+            row in the member index
+
+        Return
+        ----------
+        block: bytes
+        """
+        with open(self.filename, 'rb') as f:
+            f.seek(int(self.index.offset[irow]))
+            return f.read(int(self.index.nbytes[irow]))
+
+    def readData(self, irow, columns=None):
+        """ Read the data of an index row, only the selected columns are read and decompressed
+
+        Parameters
+        ----------
+        irow: int
+            row in the member index
+        columns: list (None)
+            column indices to read, if None, read all columns
+
+        Return
+        ----------
+        dat: 2D numpy.ndarray
+            the same as the data read by numpy.loadtxt from the original file (without the header of the snapshot)
+        """
+        if (irow<0): raise ValueError('Index row ',irow,' is invalid')
+        n = int(self.index.n[irow])
+        ncols = int(self.index.n_col[irow])
+        if (columns is None): columns = range(ncols)
+        columns = list(columns)
+        dat = np.zeros((n, len(columns)))
+        if (ncols==0): return dat
+        with open(self.filename, 'rb') as f:
+            offset = int(self.index.offset[irow])
+            f.seek(offset)
+            sizes = np.frombuffer(f.read(8*ncols), dtype=np.uint64).astype(np.int64)
+            starts = offset + 8*ncols + np.append(0, np.cumsum(sizes)[:-1])
+            for i, k in enumerate(columns):
+                f.seek(int(starts[k]))
+                dat[:,i] = _decompressColumn(f.read(int(sizes[k])), n)
+        return dat
+
+    def getHeader(self, irow):
+        """ Get the snapshot header of an index row
+
+        Parameters
+        ----------
+        irow: int
+            row in the member index
+
+        Return
+        ----------
+        header: PeTarDataHeader
+        """
+        header = PeTarDataHeader()
+        header.fid = int(self.index.fid[irow])
+        header.n = int(self.index.n[irow])
+        header.time = float(self.index.time[irow])
+        return header
+
+    def load(self, time=None, fid=None, companion='', rtol=1e-10, **kwargs):
+        """ Load a snapshot or its companion file by time or file id
+
+        Parameters
+        ----------
+        time: float (None)
+            snapshot time
+        fid: int (None)
+            file id, used if time is None
+        companion: string ('')
+            '' for the snapshot, '.single' or '.binary' for the companion files
+        rtol: float (1e-10)
+            relative tolerance to match time
+        kwargs: dict
+            keyword arguments of Particle and Binary, e.g. interrupt_mode, G, simple_mode
+
+        Return
+        ----------
+        data: Particle | Binary (companion = '.binary')
+        """
+        if (time is not None):
+            irow = self.findTimeIndex(time, rtol)
+            if (irow<0): raise ValueError('Snapshot at time ',time,' is not found in ',self.filename)
+            fid = self.index.fid[irow]
+        irow = self.findFileIndex(fid, companion)
+        if (irow<0): raise ValueError('File id ',fid,' with companion ',companion,' is not found in ',self.filename)
+        if (companion=='.binary'):
+            data = Binary(Particle(**kwargs), Particle(**kwargs), **kwargs)
+        else:
+            data = Particle(**kwargs)
+        if (self.index.n[irow]>0): data.readArray(self.readData(irow))
+        return data
+
+    def getPathList(self):
+        """ Get the packed paths of all snapshots sorted by time, which can be used as the snapshot paths of petar.data.process, see help(openPackedPath)
+
+        Return
+        ----------
+        path_list: list
+        """
+        return [getPackedPath(self.filename, fid) for fid in self.index.fid[self.snapshot_index].astype(int)]
+
+_pack_list = dict()
+
+def getPackedPath(pack_filename, fid):
+    """ Get the packed path of a snapshot: [pack_filename].[file id]
+    """
+    return pack_filename + '.' + str(int(fid))
+
+def openPackedPath(path):
+    """ Resolve a packed path [pack file name].[file id][companion suffix]
+    The path is packed if the file does not exist and the prefix is a pack file.
+    The opened packs are kept for reuse and reloaded if the pack file is modified.
+
+    Parameters
+    ----------
+    path: string
+        snapshot path or companion file path
+
+    Return
+    ----------
+    pack: SnapshotPack
+        None if the path is not packed or not found in the pack
+    irow: int
+        row in the index of the pack, -1 if the path is not packed or not found in the pack
+    """
+    if (os.path.exists(path)): return None, -1
+    companion = ''
+    for suffix in PACK_COMPANIONS[1:]:
+        if (path.endswith(suffix)):
+            companion = suffix
+            path = path[:-len(suffix)]
+    prefix, dot, fid = path.rpartition('.')
+    if (dot=='') | (not fid.isdigit()) | (not os.path.isfile(prefix)): return None, -1
+    stat = os.stat(prefix)
+    stat = (stat.st_size, stat.st_mtime_ns)
+    if (prefix in _pack_list.keys()) and (_pack_list[prefix][0]==stat):
+        pack = _pack_list[prefix][1]
+    else:
+        with open(prefix, 'rb') as f:
+            if (f.read(len(PACK_MAGIC))!=PACK_MAGIC): return None, -1
+        pack = SnapshotPack(prefix)
+        _pack_list[prefix] = (stat, pack)
+    irow = pack.findFileIndex(int(fid), companion)
+    if (irow<0): return None, -1
+    return pack, irow
@@ -4,12 +4,52 @@ from .base import *
 from .data import *
 from .lagrangian import *
 from .escaper import *
+from .tidal import *
 from .bse import *
+from .profile import *
+from .stage import *
+from .cache import *
+from .pack import *
+from .shared_data import *
 import time
 import os
+import threading
+import queue
 
 
-def dataProcessOne(file_path, result, time_profile, read_flag, **kwargs): 
+def readSnapshotData(file_path, read_flag):
+    """ Read the raw data of one snapshot for dataProcessOne
+
+    Parameters
+    ----------
+    file_path: string
+        The path of snapshot, or the packed path of a snapshot in a pack file (see help(openPackedPath)),
+        for a packed path, the existing single and binary files on the disk are read first, then the packed ones
+    read_flag: bool
+        If true, read single, binary snapshots ([file_path].single, [file_path].binary) instead of the original snapshot
+
+    Return
+    ----------
+    snap: 2D numpy.ndarray | list of two 2D numpy.ndarray or None
+        If read_flag is False, the particle data of snapshot (without header)
+        If read_flag is True, [single data, binary data], the item is None if the file is empty
+    """
+    if (not read_flag):
+        pack, irow = openPackedPath(file_path)
+        if (pack is not None): return pack.readData(irow)
+        return np.loadtxt(file_path, skiprows=1, ndmin=2)
+    else:
+        snap=[None, None]
+        for i, suffix in enumerate(['.single','.binary']):
+            pack, irow = openPackedPath(file_path+suffix)
+            if (pack is not None):
+                if (pack.index.n[irow]>0):
+                    snap[i] = pack.readData(irow)
+            elif os.path.getsize(file_path+suffix)>0:
+                snap[i] = np.loadtxt(file_path+suffix, ndmin=2)
+        return snap
+
+def dataProcessOne(file_path, result, time_profile, read_flag, snap=None, writer=None, read_time=None, **kwargs): 
     """Process one snapshot.
 
     Find binaries of one snapshot, calculate Lagrangian radii, find the system core and find escapers.
@@ -19,13 +59,25 @@ def dataProcessOne(file_path, result, time_profile, read_flag, **kwargs):
     file_path: list
         The pathes of snapshots
     result: dict
-        The results, keys: lagr, core|core_read, esc_single, esc_binary, [bse]
+        The results, keys: lagr, core|core_read, esc_single, esc_binary, [bse_status], [stages]
         If read_flag = True, core_read is needed, else core is needed
-        If interrupt_mode = bse, bse is needed
-    time_profile: dict
-        The CPU (wallclock) time for each parts of calculations
+        If interrupt_mode = bse, bse_status is needed
+        If analysis stages are registered, stages (dict of stage name and instance) is needed
+        If cache (ProcessCache) exists and read_flag is False, the single, binary and core data are read if the cache entry of the snapshot is valid, 
+        otherwise they are calculated and the cache entry is added
+        If configs exists, it is a list of [keyword arguments, results] of additional configurations, 
+        the analysis (escapers, Lagrangian radii, BSE status and analysis stages) of each configuration is done with the same snapshot data, 
+        see help(initDataProcessResult)
+    time_profile: ProcessProfile
+        The wallclock and CPU time of each stage, one row is appended for this snapshot
     read_flag: bool
         If true, read single, binary snapshots and core data instead of calculating them
+    snap: 2D numpy.ndarray | list | None (None)
+        Prefetched snapshot data from readSnapshotData, if None, read the data from file_path
+    writer: function | None (None)
+        Function to save single and binary data with arguments (filename, data), if None, use savetxt of data directly
+    read_time: dict | None (None)
+        The wallclock ('wall') and CPU ('cpu') time of reading the prefetched snapshot and the waiting time ('wait'), added to the profile
     kwargs: dict ()
         Keywords arguments:
             G: gravitational constant (1.0)
@@ -35,42 +87,61 @@ def dataProcessOne(file_path, result, time_profile, read_flag, **kwargs):
                                Default is np.array([0.1, 0.3, 0.5, 0.7, 0.9])
             interrupt_mode: PeTar interrupt mode: base, bse, none. If not provided, type is none 
     """
-    lagr = result['lagr']
-    esc_single  = result['esc_single']
-    esc_binary  = result['esc_binary']
-
-    m_frac = lagr.initargs['mass_fraction']
     G=1.0
     r_bin=0.1
-    average_mode='sphere'
     simple_binary=True
 
     if ('G' in kwargs.keys()): G=kwargs['G']
     if ('r_max_binary' in kwargs.keys()): r_bin=kwargs['r_max_binary']
-    if ('average_mode' in kwargs.keys()): average_mode=kwargs['average_mode']
     if ('simple_binary' in kwargs.keys()): simple_binary=kwargs['simple_binary']
 
+    # the maximum separation to find binaries for all configurations
+    r_bin_all = r_bin
+    if ('configs' in result.keys()):
+        r_bin_all = max([r_bin]+[config_result['r_max_binary'] for config_kwargs, config_result in result['configs']])
+
+    wall=dict()
+    cpu=dict()
+    wait=0.0
+    if (read_time is not None):
+        wall['read'] = read_time['wall']
+        cpu['read'] = read_time['cpu']
+        wait = read_time['wait']
+    tick=[time.time(), time.thread_time()]
+    def record(stage):
+        """ add the wallclock and CPU time from the last record to the stage """
+        wall_now = time.time()
+        cpu_now = time.thread_time()
+        wall[stage] = wall.get(stage, 0.0) + wall_now - tick[0]
+        cpu[stage] = cpu.get(stage, 0.0) + cpu_now - tick[1]
+        tick[0] = wall_now
+        tick[1] = cpu_now
+
     header = PeTarDataHeader(file_path)
-    
-    if (not read_flag):
-        start_time = time.time()
 
+    cache = None
+    use_cache = False
+    if ('cache' in result.keys()) & (not read_flag):
+        cache = result['cache']
+        use_cache = cache.check(file_path)
+    
+    if (not read_flag) & (not use_cache):
         core = result['core']
         #print('Loadfile')
-        snap=np.loadtxt(file_path, skiprows=1)
+        if (snap is None): snap=readSnapshotData(file_path, read_flag)
         particle=Particle(snap, **kwargs)
-        read_time = time.time()
+        record('read')
 
         # find binary
         #print('Find pair')
-        kdtree,single,binary=findPair(particle,G,r_bin,True,simple_binary)
-        find_pair_time = time.time()
+        kdtree,single,binary=findPair(particle,G,r_bin_all,True,simple_binary)
+        record('find_pair')
     
         # get cm, density
         #print('Get density')
         cm_pos, cm_vel=core.calcDensityAndCenter(particle,kdtree)
         #print('cm pos:',cm_pos,' vel:',cm_vel)
-        get_density_time = time.time()
+        record('density')
 
         #print('Correct center')
         particle.correctCenter(cm_pos, cm_vel)
@@ -86,71 +157,134 @@ def dataProcessOne(file_path, result, time_profile, read_flag, **kwargs):
         core.addTime(header.time)
         core.size+=1
 
-        n_frac=m_frac.size+1
         cm_vel=np.array([0,0,0]) # avoid kinetic energy jump 
         single.correctCenter(cm_pos, cm_vel)
         binary.correctCenter(cm_pos, cm_vel)
-        center_and_r2_time = time.time()
-
-        single.savetxt(file_path+'.single')
-        binary.savetxt(file_path+'.binary')
+        single_all, binary_all = single, binary
+        if (r_bin_all>r_bin): single, binary = splitBinary(single_all, binary_all, r_bin)
+        record('center_core')
+
+        if (writer is None):
+            single.savetxt(file_path+'.single')
+            binary.savetxt(file_path+'.binary')
+        else:
+            writer(file_path+'.single', single)
+            writer(file_path+'.binary', binary)
+        record('write')
     else:
-        start_time = time.time()
-        
-        core = result['core_read']
+        if (use_cache): core = result['core']
+        else: core = result['core_read']
 
         single = Particle(**kwargs)
         p1 = Particle(**kwargs)
         p2 = Particle(**kwargs)
-        binary = Binary(p1,p2)
-
-        if os.path.getsize(file_path+'.single')>0:
-            single.loadtxt(file_path+'.single')
-        if os.path.getsize(file_path+'.binary')>0:
-            binary.loadtxt(file_path+'.binary')
+        binary = Binary(p1, p2, G=G, simple_mode=simple_binary)
+
+        if (snap is None): snap=readSnapshotData(file_path, True)
+        if (snap[0] is not None):
+            single.readArray(snap[0])
+        # the members of Binary created from empty components are not shaped (e.g. pos), thus read an empty array if no binary exists
+        binary.readArray(snap[1] if (snap[1] is not None) else np.zeros((0, binary.ncols)))
+
+        if (use_cache):
+            core.append(Core(np.array([cache.getCore(file_path)])))
+            rc = core.rc[-1]
+        else:
+            # read from core data
+            index = core.findTimeIndex(header.time)
+            if (index<0): raise ValueError('Core data at time ',header.time,' is not found in ',file_path)
+            rc = core.rc[index]
+
+        single_all, binary_all = single, binary
+        particle = None
+        record('read')
+
+    n_particle = single.size + 2*binary.size
+
+    # split binaries for all configurations before the analysis adds new members
+    analysis_list = [[single, binary, result, kwargs]]
+    if ('configs' in result.keys()):
+        for config_kwargs, config_result in result['configs']:
+            single_c, binary_c = splitBinary(single_all, binary_all, config_result['r_max_binary'])
+            analysis_list.append([single_c, binary_c, config_result, config_kwargs])
+    for single_c, binary_c, result_c, kwargs_c in analysis_list:
+        dataAnalysisOne(header.time, particle, single_c, binary_c, core, rc, result_c, record, **kwargs_c)
+
+    time_profile.addOneSnapshot(header.time, n_particle, wall, cpu, wait)
+
+    if (cache is not None) & (not use_cache):
+        if (writer is not None): 
+            # the products are saved later by writer threads, the entry is added after the writing is done
+            cache.pending.append((file_path, np.concatenate(([header.time], core.pos[-1], core.vel[-1], [core.rc[-1]]))))
+        else:
+            cache.addEntry(file_path, np.concatenate(([header.time], core.pos[-1], core.vel[-1], [core.rc[-1]])))
+
+def dataAnalysisOne(time, particle, single, binary, core, rc, result, record, **kwargs):
+    """ Find escapers, calculate Lagrangian radii, BSE status and run analysis stages of one snapshot, used by dataProcessOne
 
-        # read from core data
-        rc = core.rc[core.time==header.time]
-
-        read_time = time.time()
+    Parameters
+    ----------
+    time: float
+        time of the snapshot
+    particle: Particle | None
+        all particles after the center correction, None if single and binary data are read
+    single: Particle
+        single stars after the center correction
+    binary: Binary
+        binaries after the center correction
+    core: Core
+        core data including the snapshot
+    rc: float
+        core radius
+    result: dict
+        The results, keys: lagr, esc_single, esc_binary, [tidal, galpy_potential], [bse_status], [stages]
+    record: function
+        Function with the argument of stage name to record the time of stage
+    kwargs: dict ()
+        Keywords arguments, see help(dataProcessOne)
+    """
+    lagr = result['lagr']
+    esc_single  = result['esc_single']
+    esc_binary  = result['esc_binary']
 
-        find_pair_time = read_time
-        get_density_time = read_time
-        center_and_r2_time = read_time
-    
+    m_frac = lagr.initargs['mass_fraction']
+    average_mode='sphere'
+    if ('average_mode' in kwargs.keys()): average_mode=kwargs['average_mode']
 
-    if ('r_escape' in kwargs.keys()) : 
+    if ('tidal' in result.keys()):
+        core_now = core.atTimes([time])
+        ssel, bsel = result['tidal'].calcOneSnapshot(time, single, binary, core_now.pos[0], core_now.vel[0], result['galpy_potential'])
+        single = esc_single.addEscaper(time, single, ssel)
+        binary = esc_binary.addEscaper(time, binary, bsel)
+    elif ('r_escape' in kwargs.keys()) : 
         #print('b',single.size,binary.size)    
         rcut = kwargs['r_escape']
-        single = esc_single.findEscaper(header.time, single, rcut)
-        binary = esc_binary.findEscaper(header.time, binary, rcut)
+        single = esc_single.findEscaper(time, single, rcut)
+        binary = esc_binary.findEscaper(time, binary, rcut)
         #print('a',single.size,binary.size,esc_single.size,esc_binary.size)
     
     #print('Lagrangian radius')
-    lagr.calcOneSnapshot(header.time, single, binary, rc, average_mode)
+    lagr.calcOneSnapshot(time, single, binary, rc, average_mode)
 
-    if (not 'r_escape' in kwargs.keys()):
+    if (not 'r_escape' in kwargs.keys()) & (not 'tidal' in result.keys()):
         rhindex=np.where(m_frac==0.5)[0]
         rcut = calcRCutIsolate(lagr.all.r[-1,rhindex])
-        esc_single.findEscaper(header.time, single, rcut)
-        esc_binary.findEscaper(header.time, binary, rcut)
-    lagr_time = time.time()
-
-    time_profile['read'] += read_time-start_time
-    time_profile['find_pair'] += find_pair_time-read_time
-    time_profile['density'] += get_density_time-find_pair_time
-    time_profile['center_core'] += center_and_r2_time-get_density_time
-    time_profile['lagr'] += lagr_time-center_and_r2_time
+        esc_single.findEscaper(time, single, rcut)
+        esc_binary.findEscaper(time, binary, rcut)
+    record('lagr')
 
     if ('bse_status' in result.keys()):
         bse = result['bse_status']
-        bse.findEvents(header.time,single,binary)
-        bse_time = time.time()
-        time_profile['bse'] += bse_time - lagr_time
+        bse.findEvents(time,single,binary)
+        record('bse')
 
-#    return time_profile
+    if ('stages' in result.keys()):
+        core_now = core.atTimes([time])
+        for name, stage in result['stages'].items():
+            stage.process(time, particle, single, binary, core_now)
+        record('user')
 
-def dataProcessList(file_list, read_flag, **kwargs):
+def dataProcessList(file_list, read_flag, core_read=None, cache=None, configs=None, **kwargs):
     """ process lagragian calculation for a list of file snapshots
 
     Parameters
@@ -159,6 +293,13 @@ def dataProcessList(file_list, read_flag, **kwargs):
         file path list
     read_flag: bool
         indicate whether to read single, binary and core data instead of calculating 
+    core_read: Core (None)
+        core data used when read_flag is True, if None, read from the file [filename_prefix].core
+    cache: ProcessCache (None)
+        If not None and read_flag is False, reuse the single, binary and core data of snapshots with valid cache entries, 
+        the cache entries of other snapshots are added after processing
+    configs: list (None)
+        additional configurations, see help(initDataProcessResult)
     kwargs: dict
         keyword arguments:
             filename_prefix: filename prefix for output data (data)
@@ -168,43 +309,343 @@ def dataProcessList(file_list, read_flag, **kwargs):
             mass_fraction: an 1D numpy.ndarray to indicate the mass fractions to calculate lagrangian radii.
                                Default is np.array([0.1, 0.3, 0.5, 0.7, 0.9])
             interrupt_mode: PeTar interrupt mode: base, bse, none. If not provided, type is none 
+            r_escape: a constant escape distance criterion, if not provided, 20 times half-mass radius is used
+            galpy_potential: a dict of keyword arguments of GalpyPotential for the galactic potential, see help(GalpyPotential).
+                             If provided, the tidal radius is calculated and the escapers are found by the Jacobi energy in the tidal field, 
+                             see help(TidalRadius.calcOneSnapshot); r_escape is not used
+            rtid_factor: escapers should have distances larger than rtid_factor * tidal radius (1.0)
+
+    Return
+    ----------
+    result: dict
+        The results, keys: lagr, core|core_read, esc_single, esc_binary, [tidal], [bse_status], [names of registered analysis stages], 
+        [cache: (dict of cache entries added or accessed, dict of the validity of snapshot cache entries)], 
+        [configs: list of [keyword arguments, results] of additional configurations]
+    time_profile: dict
+        The profile, keys:
+            snapshot: ProcessProfile, the time of each stage for each snapshot
+    """
+    result, time_profile = initDataProcessResult(read_flag, core_read, cache, configs, **kwargs)
+
+    for path in file_list:
+        #print(' data:',path)
+        dataProcessOne(path, result, time_profile['snapshot'], read_flag, **kwargs)
+
+    finalizeDataProcessResult(result)
+
+    return result, time_profile
+
+def initAnalysisResult(**kwargs):
+    """ Create the empty results for dataAnalysisOne
+
+    Parameters
+    ----------
+    kwargs: dict
+        keyword arguments, see help(dataProcessList)
+
+    Return
+    ----------
+    result: dict
+        The results, keys: lagr, esc_single, esc_binary, [tidal, galpy_potential], [bse_status], [stages]
     """
     result = dict()
     result['lagr']=LagrangianMultiple(**kwargs)
     result['esc_single']=SingleEscaper(**kwargs)
     result['esc_binary']=BinaryEscaper(**kwargs)
 
+    if ('galpy_potential' in kwargs.keys()):
+        result['galpy_potential'] = GalpyPotential(**kwargs['galpy_potential'])
+        result['tidal'] = TidalRadius(**kwargs)
+
+    if ('interrupt_mode' in kwargs.keys()): 
+        interrupt_mode=kwargs['interrupt_mode']
+        if (interrupt_mode=='bse'):
+            result['bse_status'] = BSEStatus()
+
+    if (len(process_stage_registry)>0):
+        result['stages'] = initProcessStages(**kwargs)
+
+    return result
+
+config_keys=['filename_prefix','mass_fraction','r_max_binary','average_mode','r_escape']
+
+def initDataProcessResult(read_flag, core_read=None, cache=None, configs=None, **kwargs):
+    """ Create the empty results and profile for dataProcessOne
+
+    Parameters
+    ----------
+    read_flag: bool
+        indicate whether to read single, binary and core data instead of calculating 
+    core_read: Core (None)
+        core data used when read_flag is True, see help(dataProcessList)
+    cache: ProcessCache (None)
+        cache manifest, see help(dataProcessList)
+    configs: list (None)
+        additional configurations, each item is a dict of keyword arguments that replace those in kwargs, 
+        the allowed keys are filename_prefix, mass_fraction, r_max_binary, average_mode and r_escape.
+        The snapshot is read and the binaries, density center and core are calculated once for all configurations.
+        If r_max_binary of a configuration is larger than that of kwargs, read_flag cannot be used and cache is ignored,
+        since the saved single and binary data only contain binaries for r_max_binary of kwargs.
+    kwargs: dict
+        keyword arguments, see help(dataProcessList)
+
+    Return
+    ----------
+    result: dict
+        The results, keys: lagr, core|core_read, esc_single, esc_binary, [bse_status], [stages], [cache], [configs]
+        stages is a dict of registered analysis stage names and initialized instances
+        configs is a list of [keyword arguments, results (see help(initAnalysisResult))] of additional configurations,
+        the maximum separation of binaries is saved in results with the key r_max_binary
+    time_profile: dict
+        The profile, keys: snapshot
+    """
+    result = initAnalysisResult(**kwargs)
+
     time_profile=dict()
-    time_profile['read'] = 0.0
-    time_profile['find_pair'] = 0.0
-    time_profile['density'] = 0.0   
-    time_profile['center_core'] = 0.0   
-    time_profile['lagr'] = 0.0
+    time_profile['snapshot'] = ProcessProfile()
 
     if (read_flag):
-        core_filename=kwargs['filename_prefix']+'.core'
-        result['core_read']=Core()
-        result['core_read'].loadtxt(core_filename)
+        if (core_read is None):
+            core_filename=kwargs['filename_prefix']+'.core'
+            result['core_read']=Core()
+            result['core_read'].loadtxt(core_filename)
+        else:
+            result['core_read']=core_read
     else:
         result['core'] = Core()
 
-    if ('interrupt_mode' in kwargs.keys()): 
-        interrupt_mode=kwargs['interrupt_mode']
-        if (interrupt_mode=='bse'):
-            result['bse_status'] = BSEStatus()
-            time_profile['bse'] = 0.0
+    r_bin = 0.1
+    if ('r_max_binary' in kwargs.keys()): r_bin=kwargs['r_max_binary']
+    r_bin_all = r_bin
+    if (configs is not None):
+        result['configs']=[]
+        for config in configs:
+            for key in config.keys():
+                if (not key in config_keys):
+                    raise ValueError('Configuration key ',key,' is not supported, available keys: ',config_keys)
+            config_kwargs = kwargs.copy()
+            config_kwargs.update(config)
+            config_result = initAnalysisResult(**config_kwargs)
+            config_result['r_max_binary'] = r_bin
+            if ('r_max_binary' in config.keys()): config_result['r_max_binary'] = config['r_max_binary']
+            r_bin_all = max(r_bin_all, config_result['r_max_binary'])
+            result['configs'].append([config_kwargs, config_result])
+        if (read_flag) & (r_bin_all>r_bin):
+            raise ValueError('The read mode cannot be used for configurations with r_max_binary larger than ',r_bin)
+
+    if (cache is not None) & (not read_flag) & (r_bin_all<=r_bin):
+        cache.pending = []
+        result['cache'] = cache
 
-    for path in file_list:
-        #print(' data:',path)
-        dataProcessOne(path, result, time_profile, read_flag, **kwargs)
+    return result, time_profile
+
+def finalizeDataProcessResult(result):
+    """ Finalize the results after processing snapshots
+    The analysis stage instances are replaced by their finalized results, the galactic potential (galpy_potential) is removed,
+    and the cache (ProcessCache) is replaced by (entries added or accessed, validity of snapshots) during processing.
+
+    Parameters
+    ----------
+    result: dict
+        The results from initDataProcessResult after processing snapshots, the item stages is removed and
+        the result of each stage is added with the stage name as the key
+    """
+    if ('cache' in result.keys()):
+        cache = result['cache']
+        for file_path, core in cache.pending: cache.addEntry(file_path, core)
+        cache.pending = []
+        result['cache'] = (cache.updated, cache.valid)
+    if ('stages' in result.keys()):
+        for name, stage in result.pop('stages').items():
+            result[name] = stage.finalize()
+    if ('galpy_potential' in result.keys()):
+        result.pop('galpy_potential')
+    if ('configs' in result.keys()):
+        for config_kwargs, config_result in result['configs']:
+            config_result.pop('r_max_binary')
+            finalizeDataProcessResult(config_result)
+
+
+def pipelineDataProcessList(file_list, read_flag, n_reader=1, n_writer=1, read_queue_size=2, write_queue_size=4, core_read=None, cache=None, configs=None, **kwargs):
+    """ process lagragian calculation for a list of file snapshots with overlapped I/O and computation
+
+    Reader threads prefetch the upcoming snapshots (at most read_queue_size snapshots are read ahead),
+    the calling process computes the snapshots in the order of file_list,
+    and writer threads save the single and binary data from a bounded queue.
+
+    Parameters
+    ----------
+    file_list: list
+        file path list
+    read_flag: bool
+        indicate whether to read single, binary and core data instead of calculating 
+    n_reader: int (1)
+        number of reader threads
+    n_writer: int (1)
+        number of writer threads
+    read_queue_size: int (2)
+        maximum number of snapshots in flight (being read, waiting for or under computation)
+    write_queue_size: int (4)
+        maximum number of data waiting for writing
+    core_read: Core (None)
+        core data used when read_flag is True, see help(dataProcessList)
+    cache: ProcessCache (None)
+        cache manifest, see help(dataProcessList)
+    configs: list (None)
+        additional configurations, see help(initDataProcessResult)
+    kwargs: dict
+        keyword arguments, see help(dataProcessList)
+
+    Return
+    ----------
+    result: dict
+        The results, see help(dataProcessList)
+    time_profile: dict
+        The profile, keys:
+            snapshot: ProcessProfile, the time of each stage for each snapshot. 
+                      The read and write stages include the busy time of reader and writer threads. 
+                      The time of computation waiting for input snapshots and output queue is recorded in the member wait.
+            pipeline: PipelineProfile, the busy time of each stage of the pipeline
+    """
+    result, time_profile = initDataProcessResult(read_flag, core_read, cache, configs, **kwargs)
+    snap_prof = time_profile['snapshot']
+
+    n_files = len(file_list)
+    read_slots = threading.Semaphore(max(read_queue_size,1))
+    read_queue = queue.Queue()
+    write_queue = queue.Queue(maxsize=max(write_queue_size,1))
+    read_next = [0]
+    read_lock = threading.Lock()
+    # wallclock and CPU time of writer threads for each snapshot
+    write_wall = np.zeros(n_files)
+    write_cpu = np.zeros(n_files)
+    # waiting time to put data in the write queue for each snapshot
+    write_wait = np.zeros(n_files)
+    busy = {'read':[0.0]*n_reader, 'write':[0.0]*n_writer}
+
+    def reader(ith):
+        while True:
+            read_slots.acquire()
+            with read_lock:
+                index = read_next[0]
+                read_next[0] += 1
+            if (index>=n_files): 
+                read_slots.release()
+                break
+            t0 = time.time()
+            c0 = time.thread_time()
+            try:
+                read_product = read_flag
+                if ('cache' in result.keys()) & (not read_flag):
+                    read_product = result['cache'].check(file_list[index])
+                snap = readSnapshotData(file_list[index], read_product)
+            except Exception as err:
+                snap = err
+            dt = time.time()-t0
+            busy['read'][ith] += dt
+            read_queue.put((index, snap, dt, time.thread_time()-c0))
+
+    def writer(ith):
+        while True:
+            item = write_queue.get()
+            if (item is None): break
+            t0 = time.time()
+            c0 = time.thread_time()
+            np.savetxt(item[1], item[2])
+            dt = time.time()-t0
+            busy['write'][ith] += dt
+            write_wall[item[0]] += dt
+            write_cpu[item[0]] += time.thread_time()-c0
+
+    current = [0]
+    def putWriteQueue(filename, data):
+        # gether data in the computing thread since data members can be added later
+        dat_out = data.getherDataToArray()
+        t0 = time.time()
+        write_queue.put((current[0], filename, dat_out))
+        write_wait[current[0]] += time.time()-t0
+
+    start_time = time.time()
+    reader_threads = [threading.Thread(target=reader, args=(i,), daemon=True) for i in range(n_reader)]
+    writer_threads = [threading.Thread(target=writer, args=(i,), daemon=True) for i in range(n_writer)]
+    for th in reader_threads + writer_threads: th.start()
+
+    prefetch=dict()
+    compute_time = 0.0
+    try:
+        for index in range(n_files):
+            t0 = time.time()
+            while (not index in prefetch.keys()):
+                item = read_queue.get()
+                prefetch[item[0]] = item[1:]
+            snap, read_wall, read_cpu = prefetch.pop(index)
+            read_wait = time.time()-t0
+            if (isinstance(snap, Exception)): raise snap
+
+            t0 = time.time()
+            current[0] = index
+            read_time = {'wall': read_wall, 'cpu': read_cpu, 'wait': read_wait}
+            dataProcessOne(file_list[index], result, snap_prof, read_flag, snap, putWriteQueue, read_time, **kwargs)
+            read_slots.release()
+            compute_time += time.time()-t0 - write_wait[index]
+    finally:
+        for th in writer_threads: write_queue.put(None)
+        for th in writer_threads: th.join()
+    for th in reader_threads: th.join()
+    wall_time = time.time() - start_time
+
+    # move the waiting time of the write queue from the write stage to wait, add the time of writer threads
+    if (n_files>0):
+        snap_prof.wall.write[-n_files:] += write_wall - write_wait
+        snap_prof.cpu.write[-n_files:] += write_cpu
+        snap_prof.wait[-n_files:] += write_wait
+
+    time_profile['pipeline'] = PipelineProfile(np.array([[wall_time, np.sum(busy['read']), compute_time, np.sum(busy['write']), n_reader, n_writer]]))
+
+    finalizeDataProcessResult(result)
 
-    if (len(file_list)>0):
-        for key, item in time_profile.items():
-            item /= len(file_list)
     return result, time_profile
 
+def dataProcessListShared(file_list, read_flag, pipeline_args=None, core_read_desc=None, cache=None, configs=None, **kwargs):
+    """ process lagragian calculation for a list of file snapshots and put the results in shared memory
+    Used by parallelDataProcessList in worker processes to avoid pickling the large results.
+
+    Parameters
+    ----------
+    file_list: list
+        file path list
+    read_flag: bool
+        indicate whether to read single, binary and core data instead of calculating 
+    pipeline_args: dict | None (None)
+        If not None, use pipelineDataProcessList with the given arguments
+    core_read_desc: dict | None (None)
+        shared memory descriptor of core data (shareDictNpArrayMix) used when read_flag is True, 
+        if None, read from the file [filename_prefix].core
+    cache: ProcessCache (None)
+        cache manifest, see help(dataProcessList)
+    configs: list (None)
+        additional configurations, see help(initDataProcessResult)
+    kwargs: dict
+        keyword arguments, see help(dataProcessList)
+
+    Return
+    ----------
+    result_desc: dict
+        shared memory descriptors of the results (shareDict)
+    time_profile: dict
+        The profile, see help(dataProcessList)
+    """
+    core_read = None
+    if (core_read_desc is not None): 
+        core_read = loadSharedDictNpArrayMix(core_read_desc, copy=False)
+    if (pipeline_args is None):
+        result, time_profile = dataProcessList(file_list, read_flag, core_read, cache, configs, **kwargs)
+    else:
+        result, time_profile = pipelineDataProcessList(file_list, read_flag, core_read=core_read, cache=cache, configs=configs, **pipeline_args, **kwargs)
+    if ('core_read' in result.keys()): result.pop('core_read')
+    return shareDict(result), time_profile
 
-def parallelDataProcessList(file_list, n_cpu=int(0), read_flag=False, **kwargs):
+def parallelDataProcessList(file_list, n_cpu=int(0), read_flag=False, pipeline_args=None, shared_memory=False, cache=None, configs=None, **kwargs):
     """ parellel process lagragian calculation for a list of file snapshots
 
     Parameters
@@ -215,6 +656,17 @@ def parallelDataProcessList(file_list, n_cpu=int(0), read_flag=False, **kwargs):
         number of CPU cores to run parallelly
     read_flag: bool
         indicate whether to read single, binary and core instead of calculating 
+    pipeline_args: dict | None (None)
+        If not None, use pipelineDataProcessList in each process with the given arguments (n_reader, n_writer, read_queue_size, write_queue_size)
+    shared_memory: bool (False)
+        If True, transfer the results from worker processes through shared memory instead of pickling,
+        and in the read mode, the core data is read once and shared by all processes.
+    cache: ProcessCache (None)
+        If not None and read_flag is False, reuse the intermediate products of snapshots with valid cache entries, see help(dataProcessList).
+        The cache entries are updated after processing, use cache.save to write the manifest file.
+    configs: list (None)
+        additional configurations evaluated in the same pass, each item is a dict of keyword arguments replacing those in kwargs, 
+        see help(initDataProcessResult)
     kwargs: dict
         keyword arguments:
             filename_prefix: filename prefix for output data (data)
@@ -224,11 +676,29 @@ def parallelDataProcessList(file_list, n_cpu=int(0), read_flag=False, **kwargs):
             mass_fraction: an 1D numpy.ndarray to indicate the mass fractions to calculate lagrangian radii.
                                Default is np.array([0.1, 0.3, 0.5, 0.7, 0.9])
             interrupt_mode: PeTar interrupt mode: base, bse, none. If not provided, type is none 
+
+    Return
+    ----------
+    result: dict
+        The results gethered from all processes, keys: lagr, core, esc_single, esc_binary, [bse_status], [names of registered analysis stages], [configs]
+        The results of analysis stages are combined by their merge functions
+        configs is a list of [keyword arguments, results] of additional configurations
+    time_profile: dict
+        The profile gethered from all processes, keys: snapshot (ProcessProfile), [pipeline (PipelineProfile)]
     """
     if (n_cpu==int(0)):
         n_cpu = mp.cpu_count()
         #print('n_cpu:',n_cpu)
-    pool = mp.Pool(n_cpu)
+
+    core_read_desc = None
+    if (shared_memory):
+        initialSharedMemory()
+        if (read_flag):
+            core_read=Core()
+            core_read.loadtxt(kwargs['filename_prefix']+'.core')
+            core_read_desc = shareDictNpArrayMix(core_read)
+
+    pool = mp.Pool(n_cpu, initProcessStageWorker, getProcessStageWorkerArgs())
 
     n_files=len(file_list)
     n_pieces = np.ones(n_cpu)*int(n_files/n_cpu)
@@ -241,36 +711,181 @@ def parallelDataProcessList(file_list, n_cpu=int(0), read_flag=False, **kwargs):
 
     result=[None]*n_cpu
     for rank in range(n_cpu):
-        result[rank] = pool.apply_async(dataProcessList, (file_part[rank], read_flag,), kwargs)
+        if (shared_memory):
+            result[rank] = pool.apply_async(dataProcessListShared, (file_part[rank], read_flag, pipeline_args, core_read_desc, cache, configs), kwargs)
+        elif (pipeline_args is None):
+            result[rank] = pool.apply_async(dataProcessList, (file_part[rank], read_flag, None, cache, configs), kwargs)
+        else:
+            pkwargs = kwargs.copy()
+            pkwargs.update(pipeline_args)
+            pkwargs['cache'] = cache
+            pkwargs['configs'] = configs
+            result[rank] = pool.apply_async(pipelineDataProcessList, (file_part[rank], read_flag,), pkwargs)
 
     # Step 3: Don't forget to close
     pool.close()
     pool.join()
 
     time_profile_all=[]
-    result_all=dict()
+    result_list=[]
+    if (core_read_desc is not None): unlinkSharedDictNpArrayMix(core_read_desc)
+
     for i in range(n_cpu):
         resi = result[i].get()[0]
-        for key in ['lagr','core','esc_single','esc_binary','bse_status']:
+        if (shared_memory): resi = loadSharedDict(resi, copy=True, unlink=True)
+        if ('cache' in resi.keys()): cache.update(*resi['cache'])
+        result_list.append(resi)
+        time_profile_all.append(result[i].get()[1])
+
+    result_gether = gatherDataProcessResult(result_list)
+    if (configs is not None):
+        result_gether['configs']=[]
+        for k in range(len(configs)):
+            config_kwargs = result_list[0]['configs'][k][0]
+            config_result = gatherDataProcessResult([resi['configs'][k][1] for resi in result_list])
+            result_gether['configs'].append([config_kwargs, config_result])
+
+    time_profile=dict()
+    for key in time_profile_all[0].keys():
+        time_profile[key] = join(*[prof[key] for prof in time_profile_all])
+
+    return result_gether, time_profile
+
+
+def gatherDataProcessResult(result_list):
+    """ Gether the results of multiple processes in the order of snapshots
+    The results of analysis stages are combined by their merge functions and duplicated escapers are removed
+
+    Parameters
+    ----------
+    result_list: list
+        results from processes, see help(dataProcessList)
+
+    Return
+    ----------
+    result: dict
+        The gethered results, keys: lagr, [core], esc_single, esc_binary, [tidal], [bse_status], [names of registered analysis stages]
+    """
+    stage_names = list(process_stage_registry.keys())
+    result_all=dict()
+    for resi in result_list:
+        for key in ['lagr','core','esc_single','esc_binary','tidal','bse_status'] + stage_names:
             if (key in resi.keys()):
                 if (not key in result_all.keys()):
                     result_all[key]=[]
                 result_all[key].append(resi[key])
-        time_profile_all.append(result[i].get()[1])
 
     result_gether=dict()
     for key in result_all.keys():
-        result_gether[key] = join(*result_all[key])
+        if (key in stage_names):
+            result_gether[key] = createProcessStage(key).merge(result_all[key])
+        else:
+            result_gether[key] = join(*result_all[key])
 
     for key in ['esc_single','esc_binary']:
         result_gether[key].removeDuplicate()
 
-    time_profile=dict()
+    return result_gether
 
-    for key in time_profile_all[0].keys():
-        time_profile[key] = 0.0
-        for i in range(n_cpu):
-            time_profile[key] += time_profile_all[i][key]/n_cpu
+def loadDataProcessResult(**kwargs):
+    """ Load the existing results of petar.data.process for resuming the processing
 
-    return result_gether, time_profile
+    The files [prefix].lagr, [prefix].core, [prefix].esc_single, [prefix].esc_binary, [prefix].tidal (if galpy_potential exists) and [prefix].bse_status (if interrupt_mode=bse) are read if they exist.
+    The results of registered analysis stages, [prefix].[stage name], are read by the load functions of stages if they exist.
 
+    Parameters
+    ----------
+    kwargs: dict
+        keyword arguments, should be the same as those used to generate the existing data:
+            filename_prefix: filename prefix of the existing output data (data)
+            G: gravitational constant (1.0)
+            mass_fraction: an 1D numpy.ndarray to indicate the mass fractions to calculate lagrangian radii.
+                               Default is np.array([0.1, 0.3, 0.5, 0.7, 0.9])
+            interrupt_mode: PeTar interrupt mode: base, bse, none. If not provided, type is none 
+
+    Return
+    ----------
+    result: dict
+        The results, keys: lagr, core, esc_single, esc_binary, [tidal], [bse_status]
+    """
+    filename_prefix='data'
+    if ('filename_prefix' in kwargs.keys()): filename_prefix=kwargs['filename_prefix']
+
+    result = dict()
+    result['lagr']=LagrangianMultiple(**kwargs)
+    result['core']=Core()
+    result['esc_single']=SingleEscaper(**kwargs)
+    result['esc_binary']=BinaryEscaper(**kwargs)
+    if ('interrupt_mode' in kwargs.keys()):
+        if (kwargs['interrupt_mode']=='bse'):
+            result['bse_status'] = BSEStatus()
+    if ('galpy_potential' in kwargs.keys()):
+        result['tidal'] = TidalRadius(**kwargs)
+
+    for key, item in result.items():
+        key_filename = filename_prefix + '.' + key
+        if os.path.exists(key_filename):
+            if os.path.getsize(key_filename)>0:
+                item.loadtxt(key_filename)
+
+    for name in process_stage_registry.keys():
+        key_filename = filename_prefix + '.' + name
+        if os.path.exists(key_filename):
+            if os.path.getsize(key_filename)>0:
+                result[name] = createProcessStage(name).load(key_filename)
+
+    return result
+
+def findNewSnapshots(path_list, time_processed, rtol=1e-10):
+    """ Select the snapshots whose times are not yet processed 
+
+    Parameters
+    ----------
+    path_list: list
+        snapshot file path list
+    time_processed: 1D numpy.ndarray
+        times of processed snapshots, e.g. LagrangianMultiple.time of existing data
+    rtol: float (1e-10)
+        relative tolerance to compare snapshot times
+
+    Return
+    ----------
+    new_path_list: list
+        snapshot file pathes that are not yet processed
+    """
+    time_sort = np.sort(time_processed)
+    times = np.array([PeTarDataHeader(path).time for path in path_list])
+    index = searchTimeIndex(time_sort, times, rtol)
+    new_path_list = [path for path, i in zip(path_list, index) if i<0]
+    return new_path_list
+
+def joinDataProcessResult(result_pre, result_new):
+    """ Join the results of resumed processing to the previous results
+
+    The escaper lists are joined and duplicated escapers are removed, the escapers found in the previous results are kept.
+
+    Parameters
+    ----------
+    result_pre: dict
+        previous results, e.g. from loadDataProcessResult
+    result_new: dict
+        results of new snapshots, e.g. from parallelDataProcessList
+
+    Return
+    ----------
+    result: dict
+        joined results
+    """
+    result=dict()
+    for key, item in result_new.items():
+        if (key in result_pre.keys()):
+            if (key in process_stage_registry.keys()):
+                result[key] = createProcessStage(key).merge([result_pre[key], item])
+            else:
+                result[key] = join(result_pre[key], item)
+        else:
+            result[key] = item
+    for key in ['esc_single','esc_binary']:
+        if (key in result.keys()):
+            if (result[key].size>0): result[key].removeDuplicate()
+    return result
@@ -1,5 +1,8 @@
 # analysis profile data
 
+import resource
+import os
+import multiprocessing as mp
 from .base import *
 
 class FDPSProfile(DictNpArrayMix):
@@ -103,3 +106,279 @@ class Profile(DictNpArrayMix):
         else:
             keys = [['rank',1], ['time',1], ['nstep',1], ['n_loc',1], ['comp',PeTarProfile], ['comp_bar', PeTarProfile], ['tree_soft', FDPSProfile], ['tree_nb', FDPSProfile], ['count',PeTarCount]]
             DictNpArrayMix.__init__(self, keys, _dat, _offset, _append, **kwargs)
+
+def loadProfileRank(filename, **kwargs):
+    """ Load one profile file of a MPI rank ([data filename prefix].prof.rank.[rank index])
+    The header line of column names is skipped if it exists.
+    If the run is restarted with the append mode, the rows of repeated times are replaced by the later ones.
+
+    Parameters
+    ----------
+    filename: string
+        profile file name
+    kwargs: dict
+        keyword arguments of Profile, e.g. use_gpu
+
+    Return
+    ----------
+    prof: Profile
+        profile data sorted by time
+    """
+    with open(filename, 'r') as f:
+        first = f.readline().split()
+    skiprows = 0
+    if (len(first)>0):
+        try:
+            float(first[0])
+        except ValueError:
+            skiprows = 1
+    prof = Profile(**kwargs)
+    if (os.path.getsize(filename)>0):
+        prof.loadtxt(filename, skiprows=skiprows)
+    # keep the last row of each time
+    index = prof.size - 1 - np.unique(prof.time[::-1], return_index=True)[1]
+    return prof[index]
+
+class ProfileImbalance(DictNpArrayMix):
+    """ Load imbalance of MPI ranks for each output step, generated by MultiRankProfile.calcImbalance
+    The compute time of a component is the wallclock time excluding the MPI barrier waiting time (comp - comp_bar).
+    Keys: (class members)
+        time (1D): evolved time
+        n_loc_max (1D): maximum number of local particles of ranks
+        n_loc_min (1D): minimum number of local particles of ranks
+        n_loc_mean (1D): mean number of local particles of ranks
+        rank_critical (1D): the rank with the maximum total compute time (critical path)
+        comp_max (PeTarProfile): maximum compute time of ranks for each component
+        comp_mean (PeTarProfile): mean compute time of ranks for each component
+        bar_frac (PeTarProfile): MPI barrier waiting time fraction of each component (sum of comp_bar / sum of comp over ranks)
+    """
+    def __init__ (self, _dat=None, _offset=int(0), _append=False, **kwargs):
+        """ DictNpArrayMix type initialzation, see help(DictNpArrayMix.__init__)
+        """
+        keys = [['time',1], ['n_loc_max',1], ['n_loc_min',1], ['n_loc_mean',1], ['rank_critical',1], ['comp_max',PeTarProfile], ['comp_mean',PeTarProfile], ['bar_frac',PeTarProfile]]
+        DictNpArrayMix.__init__(self, keys, _dat, _offset, _append, **kwargs)
+
+class MultiRankProfile():
+    """ Profiles of all MPI ranks aligned by output steps
+    Members:
+        profiles: list of Profile of ranks, only the common times of all ranks are included
+        time: 1D numpy.ndarray, common times
+        comp_names: list of PeTarProfile component names
+        comp: 3D numpy.ndarray, (rank, step, component) wallclock time of PeTarProfile components
+        comp_bar: 3D numpy.ndarray, (rank, step, component) MPI barrier waiting time of components
+        n_loc: 2D numpy.ndarray, (rank, step) number of local particles
+    """
+    # components of short-range (hard) integration, others are related to the domain decomposition and the particle-tree
+    hard_components = ['hard_single','hard_isolated','hard_connected','hard_interrupt']
+    domain_components = ['tree_neighbor','tree_force','force_correct','kick','search_cluster','create_group','domain_decomp','exchange_ptcl']
+
+    def __init__(self, filename_prefix, n_rank=None, n_cpu=int(0), **kwargs):
+        """ Load all rank files [filename_prefix].prof.rank.[0...n_rank-1] in parallel
+
+        Parameters
+        ----------
+        filename_prefix: string
+            data filename prefix of petar
+        n_rank: int (None)
+            number of MPI ranks, if None, count the existing files
+        n_cpu: int (0)
+            number of processes to load files, if 0, use all CPU cores
+        kwargs: dict
+            keyword arguments of Profile, e.g. use_gpu
+        """
+        if (n_rank is None):
+            n_rank = 0
+            while (os.path.exists(filename_prefix+'.prof.rank.'+str(n_rank))): n_rank += 1
+        if (n_rank==0):
+            raise ValueError('No profile file is found with the prefix ',filename_prefix)
+        file_list = [filename_prefix+'.prof.rank.'+str(i) for i in range(n_rank)]
+
+        if (n_cpu==0): n_cpu = mp.cpu_count()
+        n_cpu = max(1, min(n_cpu, n_rank))
+        if (n_cpu>1):
+            pool = mp.Pool(n_cpu)
+            prof_async = [pool.apply_async(loadProfileRank, (filename,), kwargs) for filename in file_list]
+            pool.close()
+            pool.join()
+            profiles = [res.get() for res in prof_async]
+        else:
+            profiles = [loadProfileRank(filename, **kwargs) for filename in file_list]
+
+        # common times of all ranks
+        time = profiles[0].time
+        for prof in profiles[1:]:
+            time = time[prof.findTimeIndex(time)>=0]
+        self.profiles = [prof.atTimes(time) for prof in profiles]
+        self.time = time
+        self.comp_names = [key for key, parameter in PeTarProfile().keys]
+        self.comp = np.array([prof.comp.getherDataToArray() for prof in self.profiles])
+        self.comp_bar = np.array([prof.comp_bar.getherDataToArray() for prof in self.profiles])
+        self.n_loc = np.array([prof.n_loc for prof in self.profiles])
+
+    def calcImbalance(self):
+        """ Calculate the load imbalance of ranks for each step
+
+        Return
+        ----------
+        imbalance: ProfileImbalance
+        """
+        comp_exc = self.comp - self.comp_bar
+        n_step = self.time.size
+        comp_sum = self.comp.sum(axis=0)
+        bar_frac = np.zeros(comp_sum.shape)
+        np.divide(self.comp_bar.sum(axis=0), comp_sum, out=bar_frac, where=(comp_sum>0))
+        itotal = self.comp_names.index('total')
+        dat = np.concatenate((self.time[:,None], self.n_loc.max(axis=0)[:,None], self.n_loc.min(axis=0)[:,None], self.n_loc.mean(axis=0)[:,None],
+                              np.argmax(comp_exc[:,:,itotal], axis=0)[:,None], comp_exc.max(axis=0), comp_exc.mean(axis=0), bar_frac), axis=1)
+        return ProfileImbalance(dat.reshape(n_step, -1))
+
+    def printSummary(self):
+        """ Print the summary of load imbalance of all steps and the limiting part
+        For each component: the sum of mean compute time of ranks, the max/mean imbalance (sum of maximum / sum of mean over steps),
+        the barrier time fraction and the lost time (sum of maximum - mean), which is the waiting time caused by the imbalance.
+        The lost time of short-range (hard) integration and domain decomposition / particle-tree parts are compared to show which part limits the throughput.
+        """
+        imb = self.calcImbalance()
+        if (imb.size==0):
+            print('No common steps of ranks are found')
+            return
+        name_format='{:>16}'
+        value_format='{:>16.4g}'
+        print('Ranks:',len(self.profiles),' steps:',imb.size)
+        print('Local particle number: mean:',imb.n_loc_mean.mean(),' max/mean:',imb.n_loc_max.sum()/imb.n_loc_mean.sum(),' min/mean:',imb.n_loc_min.sum()/imb.n_loc_mean.sum())
+        print(name_format.format('component'), name_format.format('mean_time'), name_format.format('max/mean'), name_format.format('barrier_frac'), name_format.format('lost_time'))
+        lost = dict()
+        comp_sum = self.comp.sum(axis=(0,1))
+        bar_sum = self.comp_bar.sum(axis=(0,1))
+        for i, key in enumerate(self.comp_names):
+            cmax = imb.comp_max[key].sum()
+            cmean = imb.comp_mean[key].sum()
+            lost[key] = cmax - cmean
+            print(name_format.format(key), value_format.format(cmean), value_format.format(cmax/cmean if cmean>0 else 1.0),
+                  value_format.format(bar_sum[i]/comp_sum[i] if comp_sum[i]>0 else 0.0), value_format.format(lost[key]))
+        rank, count = np.unique(imb.rank_critical.astype(int), return_counts=True)
+        order = np.argsort(-count)[:5]
+        print('Critical path ranks (rank: number of steps):', ', '.join(['%d: %d' % (r, c) for r, c in zip(rank[order], count[order])]))
+        hard_lost = sum([lost[key] for key in self.hard_components])
+        domain_lost = sum([lost[key] for key in self.domain_components])
+        hard_time = sum([imb.comp_mean[key].sum() for key in self.hard_components])
+        domain_time = sum([imb.comp_mean[key].sum() for key in self.domain_components])
+        print('Hard part: mean time:',hard_time,' lost time by imbalance:',hard_lost)
+        print('Domain decomposition and tree part: mean time:',domain_time,' lost time by imbalance:',domain_lost)
+        if (hard_lost+hard_time > domain_lost+domain_time):
+            print('The throughput is limited by the hard part (short-range integration)')
+        else:
+            print('The throughput is limited by the domain decomposition and tree part')
+
+class ProcessStageTime(DictNpArrayMix):
+    """ Time of each stage to process one snapshot in petar.data.process
+    Keys: (class members)
+        read (1D): read snapshot data
+        find_pair (1D): find binaries (KDTree construction)
+        density (1D): calculate density and density center
+        center_core (1D): correct center and calculate core radius
+        lagr (1D): find escapers and calculate Lagrangian radii and properties
+        bse (1D): count stellar types (interrupt_mode=bse)
+        user (1D): registered analysis stages
+        write (1D): write single and binary data
+    """
+    def __init__ (self, _dat=None, _offset=int(0), _append=False, **kwargs):
+        """ DictNpArrayMix type initialzation, see help(DictNpArrayMix.__init__)
+        """
+        keys = [["read",1], ["find_pair",1], ["density",1], ["center_core",1], ["lagr",1], ["bse",1], ["user",1], ["write",1]]
+        DictNpArrayMix.__init__(self, keys, _dat, _offset, _append, **kwargs)
+
+class ProcessProfile(DictNpArrayMix):
+    """ Profile of petar.data.process, one row per snapshot
+    Keys: (class members)
+        time (1D): time of snapshot
+        n (1D): number of particles (single + binary members)
+        wall (ProcessStageTime): wallclock time of each stage [s]
+        cpu  (ProcessStageTime): CPU time of each stage (of the processing thread) [s]
+        wait (1D): wallclock time waiting for input or output queues in the pipeline mode [s]
+        rss_max (1D): peak resident set size of the process after processing the snapshot [MB]
+    """
+    def __init__ (self, _dat=None, _offset=int(0), _append=False, **kwargs):
+        """ DictNpArrayMix type initialzation, see help(DictNpArrayMix.__init__)
+        """
+        keys = [["time",1], ["n",1], ["wall",ProcessStageTime], ["cpu",ProcessStageTime], ["wait",1], ["rss_max",1]]
+        DictNpArrayMix.__init__(self, keys, _dat, _offset, _append, **kwargs)
+
+    def addOneSnapshot(self, time, n, wall, cpu, wait=0.0):
+        """ Append the profile of one snapshot
+
+        Parameters
+        ----------
+        time: float
+            time of snapshot
+        n: int
+            number of particles
+        wall: dict
+            wallclock time of stages, keys are the members of ProcessStageTime, missing stages are zero
+        cpu: dict
+            CPU time of stages
+        wait: float (0.0)
+            wallclock time waiting for input or output queues
+        """
+        row = [time, n]
+        for stage in [wall, cpu]:
+            for key, parameter in self.wall.keys:
+                row.append(stage[key] if key in stage.keys() else 0.0)
+        row.append(wait)
+        # ru_maxrss is in kilobytes on Linux
+        row.append(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024.0)
+        self.append(ProcessProfile(np.array([row])))
+
+    def printSummary(self, wall_time=None, percentiles=[50,90,99]):
+        """ Print the summary of the profile: percentiles of stage wallclock and CPU time per snapshot and throughput
+
+        Parameters
+        ----------
+        wall_time: float (None)
+            total wallclock time of processing, used to calculate the throughput; if None, use the sum of stage wallclock times
+        percentiles: list ([50,90,99])
+            percentiles of time per snapshot to print
+        """
+        if (self.size==0):
+            print('No snapshot is processed')
+            return
+        name_format='{:>12}'
+        value_format='{:>12.4g}'
+        print(name_format.format('stage'), ''.join([name_format.format('wall_p'+str(p)) for p in percentiles]), name_format.format('wall_sum'), name_format.format('cpu_sum'))
+        wall_tot = np.zeros(self.size)
+        for key, parameter in self.wall.keys:
+            wall = self.wall[key]
+            wall_tot += wall
+            print(name_format.format(key), ''.join([value_format.format(x) for x in np.percentile(wall, percentiles)]), value_format.format(wall.sum()), value_format.format(self.cpu[key].sum()))
+        print(name_format.format('wait'), ''.join([value_format.format(x) for x in np.percentile(self.wait, percentiles)]), value_format.format(self.wait.sum()))
+        print(name_format.format('total'), ''.join([value_format.format(x) for x in np.percentile(wall_tot, percentiles)]), value_format.format(wall_tot.sum()))
+        if (wall_time is None): wall_time = wall_tot.sum()
+        if (wall_time>0):
+            print('Snapshots:',self.size,' particles:',int(self.n.sum()),' wallclock time [s]:',wall_time)
+            print('Throughput: snapshots/s:',self.size/wall_time,' particles/s:',self.n.sum()/wall_time)
+        print('Peak RSS per process [MB]:',self.rss_max.max())
+
+class PipelineProfile(DictNpArrayMix):
+    """ Profile of the pipeline mode of petar.data.process, one row per process
+    Keys: (class members)
+        wall (1D): total wallclock time of the process [s]
+        read (1D): busy time of reader threads [s]
+        compute (1D): busy time of computation [s]
+        write (1D): busy time of writer threads [s]
+        n_reader (1D): number of reader threads
+        n_writer (1D): number of writer threads
+    """
+    def __init__ (self, _dat=None, _offset=int(0), _append=False, **kwargs):
+        """ DictNpArrayMix type initialzation, see help(DictNpArrayMix.__init__)
+        """
+        keys = [["wall",1], ["read",1], ["compute",1], ["write",1], ["n_reader",1], ["n_writer",1]]
+        DictNpArrayMix.__init__(self, keys, _dat, _offset, _append, **kwargs)
+
+    def printSummary(self):
+        """ Print the utilization of each stage: busy time / (wallclock time * number of threads)
+        """
+        wall = self.wall.sum()
+        if (wall>0):
+            print('Pipeline utilization: read:', self.read.sum()/(self.wall*self.n_reader).sum(),
+                  ' compute:', self.compute.sum()/wall,
+                  ' write:', self.write.sum()/(self.wall*self.n_writer).sum())
@@ -0,0 +1,215 @@
+# catalog of the output files of one simulation run
+import numpy as np
+import collections
+import os
+import re
+from .base import *
+from .data import *
+from .status import *
+from .lagrangian import *
+from .escaper import *
+from .bse import *
+from .tail import *
+from .pack import *
+from .parallel_data_process import *
+
+class Run():
+    """ Catalog of the output files of one simulation run in a directory
+    The directory is scanned once to find snapshots [filename_prefix].[file id] and read their headers (file id, number of particles, time).
+    If the pack file [filename_prefix].pack exists (see packSnapshots), the snapshots in the pack are also included (the files on the disk are preferred).
+    The other data are lazily loaded at the first access of the members:
+        status: Status ([filename_prefix].status)
+        esc: SingleEscaper, escapers output by petar ([filename_prefix].esc, generated by petar.data.gether)
+        lagr: LagrangianMultiple ([process_prefix].lagr)
+        core: Core ([process_prefix].core)
+        esc_single: SingleEscaper ([process_prefix].esc_single)
+        esc_binary: BinaryEscaper ([process_prefix].esc_binary)
+        bse_status: BSEStatus ([process_prefix].bse_status)
+    The status and escaper files of petar can be read during the simulation, the column title lines and incomplete lines are skipped (see TailReader).
+    The parsed snapshots are kept in a least-recently-used cache with a maximum total size.
+
+    Example:
+        run = petar.Run('.', interrupt_mode='bse')
+        particles = run.snapshot(10.0)
+        plt.plot(run.lagr.time, run.lagr.all.r[:,-2])
+
+    Members:
+        path: directory of the run
+        filename_prefix: filename prefix of petar outputs
+        process_prefix: filename prefix of outputs of petar.data.process
+        initargs: keyword arguments of data types
+        path_list: snapshot paths sorted by time
+        fid: 1D numpy.ndarray (int), file ids of snapshots
+        n: 1D numpy.ndarray (int), numbers of particles of snapshots
+        time: 1D numpy.ndarray, times of snapshots
+        max_cache_size: maximum total size of cached snapshots in bytes
+        cache_size: current total size of cached snapshots in bytes
+    """
+    def __init__(self, path='.', filename_prefix='data', process_prefix=None, max_cache_size=512, **kwargs):
+        """
+        Parameters
+        ----------
+        path: string ('.')
+            directory of the run
+        filename_prefix: string ('data')
+            filename prefix of petar outputs, defined by "petar -f"
+        process_prefix: string (None)
+            filename prefix of outputs of petar.data.process (option -p) in the directory, if None, use filename_prefix
+        max_cache_size: float (512)
+            maximum total size of cached snapshots in MB, at least the last accessed snapshot is kept
+        kwargs: dict
+            keyword arguments of data types, should be the same as those used by petar.data.process, e.g. interrupt_mode, mass_fraction, G
+        """
+        self.path = path
+        self.filename_prefix = filename_prefix
+        self.process_prefix = filename_prefix if (process_prefix is None) else process_prefix
+        self.max_cache_size = max_cache_size*1024*1024
+        self.cache_size = 0
+        self.initargs = kwargs.copy()
+        self._headers = dict()
+        self._data = dict()
+        self._cache = collections.OrderedDict()
+        self.scan()
+
+    def scan(self):
+        """ Scan the directory to find new snapshots, the headers of known snapshots are not read again
+        The snapshots whose headers cannot be read (e.g. being written) are skipped and checked again in the next scan.
+        """
+        pattern = re.compile(re.escape(self.filename_prefix)+r'\.([0-9]+)$')
+        fids = set([header[0] for header in self._headers.values()])
+        for fname in os.listdir(self.path):
+            file_path = os.path.join(self.path, fname)
+            if (pattern.match(fname) is None) or (file_path in self._headers.keys()): continue
+            try:
+                header = PeTarDataHeader(file_path)
+            except ValueError:
+                continue
+            self._headers[file_path] = (header.fid, header.n, header.time)
+            fids.add(header.fid)
+
+        pack_filename = os.path.join(self.path, self.filename_prefix+'.pack')
+        if (os.path.isfile(pack_filename)):
+            pack = SnapshotPack(pack_filename)
+            for irow in pack.snapshot_index:
+                fid = int(pack.index.fid[irow])
+                if (fid in fids): continue
+                self._headers[getPackedPath(pack_filename, fid)] = (fid, int(pack.index.n[irow]), pack.index.time[irow])
+                fids.add(fid)
+
+        path_list = list(self._headers.keys())
+        headers = np.array([self._headers[path] for path in path_list]).reshape(-1,3)
+        isort = np.argsort(headers[:,2], kind='stable')
+        self.path_list = [path_list[i] for i in isort]
+        self.fid = headers[isort,0].astype(int)
+        self.n = headers[isort,1].astype(int)
+        self.time = headers[isort,2]
+
+    def findSnapshot(self, time):
+        """ Find the snapshot with the nearest time
+
+        Parameters
+        ----------
+        time: float
+            snapshot time
+
+        Return
+        ----------
+        index: int
+            index of the snapshot in the members path_list, fid, n and time
+        """
+        if (self.time.size==0): raise ValueError('No snapshot is found in ',self.path)
+        return int(np.argmin(np.abs(self.time-time)))
+
+    def snapshot(self, time):
+        """ Get the particles of the snapshot with the nearest time
+        The snapshot is read from the cache if it is accessed before, otherwise it is read and added to the cache,
+        then the least recently used snapshots are removed until the total size is below max_cache_size.
+        Notice that the returned instance is shared with the cache, copy it (e.g. Particle(particles)) before modifying the data (e.g. correctCenter).
+
+        Parameters
+        ----------
+        time: float
+            snapshot time
+
+        Return
+        ----------
+        particles: Particle
+        """
+        file_path = self.path_list[self.findSnapshot(time)]
+        if (file_path in self._cache.keys()):
+            self._cache.move_to_end(file_path)
+            return self._cache[file_path][0]
+        snap = readSnapshotData(file_path, False)
+        particles = Particle(**self.initargs)
+        particles.readArray(snap)
+        self._cache[file_path] = (particles, snap.nbytes)
+        self.cache_size += snap.nbytes
+        while (self.cache_size > self.max_cache_size) & (len(self._cache)>1):
+            path, (p, nbytes) = self._cache.popitem(last=False)
+            self.cache_size -= nbytes
+        return particles
+
+    def clearCache(self):
+        """ Remove all cached snapshots and lazily loaded data, the data are loaded again at the next access
+        """
+        self._cache.clear()
+        self.cache_size = 0
+        self._data.clear()
+
+    def _loadText(self, key, data_type, filename, tail=False, **kwargs):
+        """ Load a data file once and keep it in the member _data
+        """
+        if (not key in self._data.keys()):
+            filename = os.path.join(self.path, filename)
+            if (tail):
+                if (not os.path.exists(filename)): raise FileNotFoundError(filename+' not found.')
+                reader = TailReader(data_type, filename, **kwargs)
+                reader.update()
+                self._data[key] = reader.data
+            else:
+                data = data_type(**kwargs)
+                if (os.path.getsize(filename)>0): data.loadtxt(filename)
+                self._data[key] = data
+        return self._data[key]
+
+    @property
+    def status(self):
+        """ Status of the run ([filename_prefix].status)
+        """
+        return self._loadText('status', Status, self.filename_prefix+'.status', True)
+
+    @property
+    def esc(self):
+        """ Single escapers output by petar ([filename_prefix].esc)
+        """
+        return self._loadText('esc', SingleEscaper, self.filename_prefix+'.esc', True, **self.initargs)
+
+    @property
+    def lagr(self):
+        """ Lagrangian properties generated by petar.data.process ([process_prefix].lagr)
+        """
+        return self._loadText('lagr', LagrangianMultiple, self.process_prefix+'.lagr', **self.initargs)
+
+    @property
+    def core(self):
+        """ Core data generated by petar.data.process ([process_prefix].core)
+        """
+        return self._loadText('core', Core, self.process_prefix+'.core')
+
+    @property
+    def esc_single(self):
+        """ Single escapers generated by petar.data.process ([process_prefix].esc_single)
+        """
+        return self._loadText('esc_single', SingleEscaper, self.process_prefix+'.esc_single', **self.initargs)
+
+    @property
+    def esc_binary(self):
+        """ Binary escapers generated by petar.data.process ([process_prefix].esc_binary)
+        """
+        return self._loadText('esc_binary', BinaryEscaper, self.process_prefix+'.esc_binary', **self.initargs)
+
+    @property
+    def bse_status(self):
+        """ Statistics of stellar types generated by petar.data.process with interrupt_mode=bse ([process_prefix].bse_status)
+        """
+        return self._loadText('bse_status', BSEStatus, self.process_prefix+'.bse_status')
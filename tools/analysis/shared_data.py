@@ -0,0 +1,177 @@
+# transfer DictNpArrayMix data between processes through shared memory
+import numpy as np
+from multiprocessing import shared_memory, resource_tracker
+from .base import *
+
+def initialSharedMemory():
+    """ Start the shared memory resource tracker in the current process
+    Should be called before creating the multiprocessing.Pool, 
+    so that all forked processes share the same tracker and shared memory blocks created in workers are not released when workers exit.
+    """
+    resource_tracker.ensure_running()
+
+def shareDictNpArrayMix(_dat):
+    """ Copy the members of a DictNpArrayMix data to shared memory blocks and return a lightweight descriptor
+    The descriptor can be pickled and sent to other processes cheaply, use loadSharedDictNpArrayMix to obtain the data.
+    The shared memory blocks are not released until unlinkSharedDictNpArrayMix is called.
+
+    Parameters
+    ----------
+    _dat: inherited DictNpArrayMix
+        data to share
+
+    Return
+    ----------
+    desc: dict
+        descriptor of data, keys:
+            type: class type of data
+            initargs: keyword arguments of the initial function
+            keys: class member list
+            size: data size
+            ncols: number of columns
+            members: dict of member descriptors, each is either ('shm', shared memory name, shape, dtype), ('array', numpy.ndarray) for empty arrays or ('sub', descriptor) for DictNpArrayMix members
+    """
+    if (not issubclass(type(_dat), DictNpArrayMix)):
+        raise ValueError('Data type should be inherited DictNpArrayMix, given ',type(_dat))
+
+    desc=dict()
+    desc['type'] = type(_dat)
+    desc['initargs'] = _dat.initargs
+    desc['keys'] = _dat.keys
+    desc['size'] = _dat.size
+    desc['ncols'] = _dat.ncols
+    members=dict()
+    for key_type in _dat.keys:
+        key = key_type[0]
+        item = _dat.__dict__[key]
+        if (type(item) == np.ndarray):
+            if (item.nbytes>0) & (item.dtype != object):
+                shm = shared_memory.SharedMemory(create=True, size=item.nbytes)
+                shm_array = np.ndarray(item.shape, dtype=item.dtype, buffer=shm.buf)
+                shm_array[...] = item
+                members[key] = ('shm', shm.name, item.shape, item.dtype.str)
+                # close the local mapping, the block is kept until unlinked
+                del shm_array
+                shm.close()
+            else:
+                members[key] = ('array', item)
+        elif (issubclass(type(item), DictNpArrayMix)):
+            members[key] = ('sub', shareDictNpArrayMix(item))
+        else:
+            raise ValueError('Member ',key,' type should be np.ndarray or DictNpArrayMix, given ',type(item))
+    desc['members'] = members
+    return desc
+
+def loadSharedDictNpArrayMix(_desc, copy=True, _shm_list=None):
+    """ Obtain DictNpArrayMix data from a descriptor generated by shareDictNpArrayMix
+
+    Parameters
+    ----------
+    _desc: dict
+        descriptor of data
+    copy: bool (True)
+        If True, copy the data from shared memory to local memory;
+        otherwise, members are numpy.ndarray views of shared memory (read-only usage is recommended),
+        the shared_memory.SharedMemory instances are saved in the member 'shm_list' of the returned data to keep them attached.
+    _shm_list: list (None)
+        list to collect attached shared_memory.SharedMemory instances (used for recursive call)
+
+    Return
+    ----------
+    dat: type of _desc['type']
+        data
+    """
+    top_level = (_shm_list is None)
+    if (top_level): _shm_list=[]
+
+    dat = _desc['type'](**_desc['initargs'])
+    dat.keys = [list(x) for x in _desc['keys']]
+    dat.size = _desc['size']
+    dat.ncols = _desc['ncols']
+    for key, member in _desc['members'].items():
+        if (member[0]=='shm'):
+            shm = shared_memory.SharedMemory(name=member[1])
+            array = np.ndarray(member[2], dtype=np.dtype(member[3]), buffer=shm.buf)
+            if (copy):
+                dat.__dict__[key] = array.copy()
+                del array
+                shm.close()
+            else:
+                dat.__dict__[key] = array
+                _shm_list.append(shm)
+        elif (member[0]=='array'):
+            dat.__dict__[key] = member[1]
+        elif (member[0]=='sub'):
+            dat.__dict__[key] = loadSharedDictNpArrayMix(member[1], copy, _shm_list)
+        else:
+            raise ValueError('Unknown member descriptor type ',member[0])
+
+    if (not copy) & top_level: dat.shm_list = _shm_list
+    return dat
+
+def unlinkSharedDictNpArrayMix(_desc):
+    """ Release the shared memory blocks of a descriptor generated by shareDictNpArrayMix
+    Should be called once after all processes finish the usage of the shared data
+
+    Parameters
+    ----------
+    _desc: dict
+        descriptor of data
+    """
+    for key, member in _desc['members'].items():
+        if (member[0]=='shm'):
+            try:
+                shm = shared_memory.SharedMemory(name=member[1])
+            except FileNotFoundError:
+                continue
+            shm.close()
+            shm.unlink()
+        elif (member[0]=='sub'):
+            unlinkSharedDictNpArrayMix(member[1])
+
+def shareDict(_dat):
+    """ Generate descriptors for a dictionary of DictNpArrayMix data, see help(shareDictNpArrayMix)
+
+    Parameters
+    ----------
+    _dat: dict
+        dictionary of data, values that are not DictNpArrayMix are kept as they are
+
+    Return
+    ----------
+    desc: dict
+        dictionary of descriptors with the same keys
+    """
+    desc=dict()
+    for key, item in _dat.items():
+        if (issubclass(type(item), DictNpArrayMix)):
+            desc[key] = ('shared', shareDictNpArrayMix(item))
+        else:
+            desc[key] = ('local', item)
+    return desc
+
+def loadSharedDict(_desc, copy=True, unlink=False):
+    """ Obtain a dictionary of data from the descriptors generated by shareDict
+
+    Parameters
+    ----------
+    _desc: dict
+        dictionary of descriptors
+    copy: bool (True)
+        copy data to local memory, see help(loadSharedDictNpArrayMix)
+    unlink: bool (False)
+        release the shared memory blocks after loading, only work when copy is True
+
+    Return
+    ----------
+    dat: dict
+        dictionary of data
+    """
+    dat=dict()
+    for key, item in _desc.items():
+        if (item[0]=='shared'):
+            dat[key] = loadSharedDictNpArrayMix(item[1], copy)
+            if (copy & unlink): unlinkSharedDictNpArrayMix(item[1])
+        else:
+            dat[key] = item[1]
+    return dat
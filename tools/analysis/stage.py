@@ -0,0 +1,246 @@
+# user-defined analysis stages executed in petar.data.process
+import numpy as np
+import copy
+import inspect
+import os
+import sys
+import importlib.util
+from .base import *
+
+class ProcessStage:
+    """ Base class of an analysis stage executed for each snapshot by dataProcessOne
+
+    In each worker process, a copy of the registered stage is created and used as follows:
+        init(**kwargs): called once before processing snapshots, kwargs are the keyword arguments of dataProcessList
+        process(time, particle, single, binary, core): called for each snapshot after the binaries, the density center and the core are found.
+        finalize(): called once after all snapshots of the worker are processed, return the result of this worker
+    Then the results of all workers are combined in the main process by merge(result_list) in the order of snapshots.
+    The combined result is saved by save(result, filename) to the file [filename_prefix].[stage name] in petar.data.process.
+
+    The default finalize, merge, save and load assume that the result is either an inherited DictNpArrayMix (combined by join like lagr and core)
+    or a 2D numpy.ndarray with one row per snapshot (combined by concatenate).
+    """
+    def init(self, **kwargs):
+        """ Initialize the stage before processing snapshots
+
+        Parameters
+        ----------
+        kwargs: dict
+            keyword arguments of dataProcessList
+        """
+        pass
+
+    def process(self, time, particle, single, binary, core):
+        """ Process one snapshot
+
+        Parameters
+        ----------
+        time: float
+            time of the snapshot
+        particle: Particle | None
+            all particles after the center correction, None if the existing single and binary data are read (read_flag=True)
+        single: Particle
+            single stars after the center correction, escapers are excluded if r_escape is given
+        binary: Binary
+            binaries after the center correction, escapers are excluded if r_escape is given
+        core: Core
+            the center and the core radius of this snapshot (one row)
+        """
+        raise NotImplementedError('process is not implemented in '+type(self).__name__)
+
+    def finalize(self):
+        """ Return the result of the processed snapshots
+        """
+        return None
+
+    def merge(self, result_list):
+        """ Combine the results of multiple workers
+
+        Parameters
+        ----------
+        result_list: list
+            results from finalize of workers in the order of snapshots, None is skipped
+
+        Return
+        ----------
+        result: combined result
+        """
+        result_list = [x for x in result_list if x is not None]
+        if (len(result_list)==0): return None
+        if (issubclass(type(result_list[0]), DictNpArrayMix)):
+            return join(*result_list)
+        elif (type(result_list[0]) == np.ndarray):
+            result_list = [x for x in result_list if x.size>0]
+            if (len(result_list)==0): return np.zeros((0,0))
+            return np.concatenate(result_list)
+        else:
+            raise ValueError('Unsupported result type ',type(result_list[0]),', merge should be implemented in ',type(self).__name__)
+
+    def save(self, result, filename):
+        """ Save the combined result to a file
+        """
+        if (issubclass(type(result), DictNpArrayMix)):
+            result.savetxt(filename)
+        elif (type(result) == np.ndarray):
+            np.savetxt(filename, result)
+        else:
+            raise ValueError('Unsupported result type ',type(result),', save should be implemented in ',type(self).__name__)
+
+    def load(self, filename):
+        """ Load a result saved by save, used in the resume mode of petar.data.process
+        The default version reads a 2D numpy.ndarray, stages with other types of results should implement this function
+        """
+        return np.loadtxt(filename, ndmin=2)
+
+class FunctionStage(ProcessStage):
+    """ Analysis stage from a function with arguments (time, particle, single, binary, core)
+    The returned value (a scalar or a 1D array with a fixed size) is collected for each snapshot,
+    the result is a 2D numpy.ndarray, each row contains the time and the returned value.
+    """
+    def __init__(self, func):
+        self.func = func
+        self.rows = []
+
+    def init(self, **kwargs):
+        self.rows = []
+
+    def process(self, time, particle, single, binary, core):
+        value = np.atleast_1d(self.func(time, particle, single, binary, core)).astype(float)
+        self.rows.append(np.append(time, value))
+
+    def finalize(self):
+        if (len(self.rows)==0): return np.zeros((0,0))
+        return np.array(self.rows)
+
+process_stage_registry=dict()
+# list of [module file path, names of stages registered by the module], see loadProcessStageModule
+process_stage_modules=[]
+reserved_stage_names=['lagr','core','core_read','esc_single','esc_binary','tidal','galpy_potential','bse_status','process_prof']
+
+def registerProcessStage(name, stage, **kwargs):
+    """ Register an analysis stage executed by dataProcessOne for each snapshot
+    The registration should be done before calling parallelDataProcessList, the registered stages are passed to the worker processes by initProcessStageWorker.
+    If the worker processes are not forked (e.g. the spawn start method of multiprocessing), the stage should be picklable (defined in an importable module or the main script),
+    or registered in a module file loaded by loadProcessStageModule.
+
+    Parameters
+    ----------
+    name: string
+        stage name, used as the key of the result in the returned dict of dataProcessList and the suffix of the output file
+    stage: class | ProcessStage | function
+        If a class, an instance is created by stage(**kwargs) in each worker;
+        if an instance with the interface of ProcessStage, a copy is used in each worker;
+        if a function, it is wrapped by FunctionStage.
+    kwargs: dict
+        keyword arguments to create the instance when stage is a class
+    """
+    if (name in reserved_stage_names):
+        raise ValueError('Stage name ',name,' is reserved, reserved names are ',reserved_stage_names)
+    if inspect.isclass(stage):
+        process_stage_registry[name] = (stage, kwargs)
+    elif hasattr(stage, 'process'):
+        process_stage_registry[name] = (stage, None)
+    elif callable(stage):
+        process_stage_registry[name] = (FunctionStage(stage), None)
+    else:
+        raise ValueError('Stage should be a class, a ProcessStage instance or a function, given ',type(stage))
+
+def loadProcessStageModule(module_path):
+    """ Import a python file that registers analysis stages by registerProcessStage, used by petar.data.process --stage-module
+    The file path is recorded, thus the file is imported again in worker processes that are not forked (see initProcessStageWorker).
+
+    Parameters
+    ----------
+    module_path: string
+        python file path
+    """
+    module_path = os.path.abspath(module_path)
+    names = list(process_stage_registry.keys())
+    spec = importlib.util.spec_from_file_location('petar_stage_module_'+str(len(process_stage_modules)), module_path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    process_stage_modules.append([module_path, [name for name in process_stage_registry.keys() if not name in names]])
+
+def getProcessStageWorkerArgs():
+    """ Get the arguments of initProcessStageWorker to pass the registered stages to worker processes, e.g. mp.Pool(n, initProcessStageWorker, getProcessStageWorkerArgs())
+
+    Return
+    ----------
+    module_paths: list
+        paths of the loaded stage module files
+    registry: dict
+        registered stages that are not from the module files
+    names: list
+        names of all registered stages
+    """
+    module_names = sum([names for module_path, names in process_stage_modules], [])
+    registry = dict([(name, item) for name, item in process_stage_registry.items() if not name in module_names])
+    return [module_path for module_path, names in process_stage_modules], registry, list(process_stage_registry.keys())
+
+def initProcessStageWorker(module_paths, registry, names):
+    """ Initializer of worker processes to set the registered stages
+    The stage module files are imported if they are not loaded yet (the worker is not forked), then the other stages are added.
+
+    Parameters
+    ----------
+    module_paths: list
+        paths of the stage module files
+    registry: dict
+        registered stages that are not from the module files
+    names: list
+        names of all registered stages, the stages not in this list (e.g. removed after the module is loaded) are removed
+    """
+    loaded = [module_path for module_path, module_names in process_stage_modules]
+    for module_path in module_paths:
+        if (not module_path in loaded): loadProcessStageModule(module_path)
+    process_stage_registry.update(registry)
+    for name in list(process_stage_registry.keys()):
+        if (not name in names): process_stage_registry.pop(name)
+
+def removeProcessStage(name=None):
+    """ Remove a registered analysis stage
+
+    Parameters
+    ----------
+    name: string | None (None)
+        stage name, if None, remove all stages
+    """
+    if (name is None): process_stage_registry.clear()
+    else: process_stage_registry.pop(name)
+
+def createProcessStage(name):
+    """ Create a new instance of a registered analysis stage
+
+    Parameters
+    ----------
+    name: string
+        stage name
+
+    Return
+    ----------
+    stage: ProcessStage
+        a new stage instance, init is not called
+    """
+    stage, kwargs = process_stage_registry[name]
+    if (kwargs is not None): return stage(**kwargs)
+    else: return copy.deepcopy(stage)
+
+def initProcessStages(**kwargs):
+    """ Create and initialize all registered analysis stages
+
+    Parameters
+    ----------
+    kwargs: dict
+        keyword arguments passed to init of stages
+
+    Return
+    ----------
+    stages: dict
+        stage name and instance
+    """
+    stages=dict()
+    for name in process_stage_registry.keys():
+        stages[name] = createProcessStage(name)
+        stages[name].init(**kwargs)
+    return stages
@@ -0,0 +1,122 @@
+# read the status file of petar with the write style 2 (status and snapshot in one line per step)
+import numpy as np
+from .base import *
+from .data import *
+from .status import *
+
+class StatusSnapshotReader():
+    """ Streaming reader of the [prefix].status file written by petar -w 2
+    Each line contains the status (see Status) followed by all particles (see Particle) at one output step.
+    The number of particles is the member n_real_loc of the status (write style 2 does not support MPI).
+    The file is read line by line, thus the whole file is not loaded in the memory.
+    The column title line and incomplete lines (e.g. the last line of a running simulation) are skipped.
+
+    Example:
+        reader = StatusSnapshotReader('data.status', interrupt_mode='bse')
+        for status, particles in reader:
+            print(status.time[0], particles.size)
+
+    Members:
+        filename: file name
+        initargs: keyword arguments of Particle
+        n_status: number of columns of Status
+        n_particle: number of columns of one particle
+    """
+    def __init__(self, filename, **kwargs):
+        """
+        Parameters
+        ----------
+        filename: string
+            status file name
+        kwargs: dict
+            keyword arguments of Particle:
+                interrupt_mode: PeTar interrupt mode: base, bse, none (none)
+                particle_type: basic particle type (soft), do not change this, if read PeTar data
+        """
+        self.filename = filename
+        self.initargs = kwargs.copy()
+        self.n_status = Status().ncols
+        self.n_particle = Particle(**kwargs).ncols
+
+    def parseLine(self, line):
+        """ Split one line into the status and particles
+
+        Parameters
+        ----------
+        line: string
+            one line of the status file
+
+        Return
+        ----------
+        status: Status
+            status with one row, None if the line is not a valid data line
+        particles: Particle
+            all particles, None if the line is not a valid data line
+        """
+        words = line.split()
+        if (len(words) < self.n_status): return None, None
+        try:
+            dat = np.array(words, dtype=float)
+        except ValueError:
+            return None, None
+        n = int(dat[1])
+        if (dat.size != self.n_status + n*self.n_particle): return None, None
+        status = Status(dat[None,:self.n_status])
+        particles = Particle(dat[self.n_status:].reshape(n, self.n_particle), **self.initargs)
+        return status, particles
+
+    def __iter__(self):
+        """ Iterate over steps, yield (status, particles), see parseLine
+        """
+        with open(self.filename, 'r') as f:
+            for line in f:
+                status, particles = self.parseLine(line)
+                if (status is not None): yield status, particles
+
+    def loadStatus(self):
+        """ Load the status of all steps without keeping particles
+
+        Return
+        ----------
+        status: Status
+        """
+        status_list = [status.getherDataToArray() for status, particles in self]
+        if (len(status_list)==0): return Status()
+        return Status(np.concatenate(status_list))
+
+    def convert(self, filename_prefix, fid_start=int(0), path_list_filename=None):
+        """ Convert to the regular output format of the write style 1: snapshot files [filename_prefix].[file id] and the status file [filename_prefix].status
+        The snapshot files have the PeTar header line (file id, number of particles, time), see PeTarDataHeader.
+        The status file has no column title line.
+
+        Parameters
+        ----------
+        filename_prefix: string
+            output filename prefix, should be different from the one of the input file
+        fid_start: int (0)
+            file id of the first snapshot
+        path_list_filename: string (None)
+            if not None, write the list of snapshot file names to this file, which can be used by petar.data.process
+
+        Return
+        ----------
+        path_list: list
+            snapshot file names
+        """
+        status_filename = filename_prefix + '.status'
+        if (status_filename == self.filename):
+            raise ValueError('The output status file ',status_filename,' is the same as the input file')
+        path_list = []
+        fid = fid_start
+        with open(status_filename, 'w') as fstatus:
+            for status, particles in self:
+                np.savetxt(fstatus, status.getherDataToArray())
+                path = filename_prefix + '.' + str(fid)
+                header = '%d %d %.17e' % (fid, particles.size, status.time[0])
+                np.savetxt(path, particles.getherDataToArray(), header=header, comments='')
+                path_list.append(path)
+                fid += 1
+        if (path_list_filename is not None):
+            with open(path_list_filename, 'w') as f:
+                for path in path_list: f.write(path+'\n')
+        return path_list
@@ -0,0 +1,117 @@
+# follow data files of a running simulation
+import numpy as np
+import os
+import time
+from .base import *
+
+class TailReader():
+    """ Read a growing data file of a running simulation (similar to tail -f), e.g. [prefix].status, [prefix].prof.rank.[rank], [prefix].esc.[rank], [prefix].group.[rank]
+    The byte offset of the last read position is recorded, each update only parses the newly appended complete lines.
+    The rows are stored in a buffer with a doubling capacity, thus appending is amortized O(1) per row.
+    The lines that do not start with a number (e.g. column headers) or have a different number of columns from the data type are skipped.
+    For the raw group files ([prefix].group.[rank]), this selects the groups with the number of members given by the keyword argument N of GroupInfo.
+    If the file becomes shorter than the recorded offset (e.g. the simulation is restarted without the append mode), the data are read again from the beginning.
+
+    Example:
+        reader = TailReader(Status, 'data.status')
+        for new in reader.follow(interval=10):
+            if (np.abs(new.energy.error/new.energy.etot)>1e-4).any(): print('Large energy error at time', new.time[-1])
+
+    Members:
+        data: the instance of the data type containing all rows read so far (the members are views of the buffer)
+        filename: file name
+        offset: byte offset of the next read
+    """
+    def __init__(self, data_type, filename, **kwargs):
+        """
+        Parameters
+        ----------
+        data_type: inherited DictNpArrayMix type
+            data type of rows, e.g. Status, Profile, SingleEscaper, GroupInfo
+        filename: string
+            file name
+        kwargs: dict
+            keyword arguments of the data type, e.g. use_gpu for Profile, N for GroupInfo, interrupt_mode for SingleEscaper
+        """
+        self.data_type = data_type
+        self.filename = filename
+        self.initargs = kwargs.copy()
+        self.data = data_type(**kwargs)
+        self.ncols = self.data.ncols
+        self.offset = 0
+        self._buffer = np.zeros((0, self.ncols))
+        self._n = 0
+
+    def _reset(self):
+        self.offset = 0
+        self._n = 0
+        self.data = self.data_type(**self.initargs)
+
+    def _parse(self, text):
+        rows = []
+        for line in text.splitlines():
+            words = line.split()
+            if (len(words)!=self.ncols): continue
+            try:
+                rows.append([float(x) for x in words])
+            except ValueError:
+                continue
+        return np.array(rows).reshape(len(rows), self.ncols)
+
+    def update(self):
+        """ Read the newly appended complete lines and append them to the member data
+
+        Return
+        ----------
+        new: the instance of the data type
+            new rows, empty if no new line exists
+        """
+        if (not os.path.exists(self.filename)): return self.data_type(**self.initargs)
+        if (os.path.getsize(self.filename) < self.offset): self._reset()
+        with open(self.filename, 'rb') as f:
+            f.seek(self.offset)
+            chunk = f.read()
+        # only parse complete lines, the last incomplete line is read in the next update
+        end = chunk.rfind(b'\n') + 1
+        if (end==0): return self.data_type(**self.initargs)
+        self.offset += end
+        dat = self._parse(chunk[:end].decode())
+        n_new = dat.shape[0]
+        if (n_new==0): return self.data_type(**self.initargs)
+
+        n_total = self._n + n_new
+        if (n_total > self._buffer.shape[0]):
+            buffer = np.zeros((max(n_total, 2*self._buffer.shape[0], 16), self.ncols))
+            buffer[:self._n] = self._buffer[:self._n]
+            self._buffer = buffer
+        self._buffer[self._n:n_total] = dat
+        self._n = n_total
+        self.data.readArray(self._buffer[:self._n])
+        new = self.data_type(**self.initargs)
+        new.readArray(dat)
+        return new
+
+    def follow(self, interval=1.0, timeout=None):
+        """ Polling iterator yielding new rows when the file grows
+
+        Parameters
+        ----------
+        interval: float (1.0)
+            polling time interval in seconds
+        timeout: float (None)
+            stop if no new row appears within this time in seconds, if None, never stop
+
+        Return
+        ----------
+        generator of new rows (the instance of the data type, non-empty)
+        """
+        t_last = time.time()
+        while True:
+            new = self.update()
+            if (new.size>0):
+                t_last = time.time()
+                yield new
+            elif (timeout is not None) and (time.time()-t_last > timeout):
+                return
+            else:
+                time.sleep(interval)
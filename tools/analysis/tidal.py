@@ -0,0 +1,339 @@
+# tidal radius and escapers of star clusters in the galactic potential of galpy
+import numpy as np
+import warnings
+from .base import *
+
+class GalpyPotential:
+    """ Galactic potential from the galpy type-argument description used by the petar options --galpy-type-arg, --galpy-set and --galpy-conf-file
+
+    The galpy Potential instances are rebuilt from the type indices and arguments in the same way as the galpy C interface of PeTar.
+    The potential, acceleration and tidal tensor are evaluated by galpy and converted to the unit of PeTar data by the scale factors
+    (same as the petar options --galpy-rscale, --galpy-tscale, --galpy-vscale, --galpy-fscale, --galpy-pscale):
+        r[galpy] = r[PeTar]*rscale, t[galpy] = t[PeTar]*tscale, v[galpy] = v[PeTar]*vscale,
+        acc[galpy] = acc[PeTar]*fscale, pot[galpy] = pot[PeTar]*pscale
+
+    Members:
+        pot_type: 1D numpy.ndarray (int) of potential types
+        pot_arg: list of 1D numpy.ndarray of potential arguments of each type
+        pot: list of galpy Potential instances
+        rscale, tscale, vscale, fscale, pscale: unit scale factors
+    """
+
+    # pre-defined potential in the petar option --galpy-set
+    pre_define_type_arg = {'MWPotential2014':'15:0.0299946,1.8,0.2375|5:0.7574802,0.375,0.035|9:4.85223053,2.0'}
+
+    def __init__(self, type_arg=None, pre_define_type=None, config_filename=None, unit=None, **kwargs):
+        """
+        Parameters
+        ----------
+        type_arg: string (None)
+            potential types and arguments with the format of the petar option --galpy-type-arg:
+            type1,type2,...:arg1,arg2,... or type1:arg1-1,arg1-2,...|type2:arg2-1,arg2-2,...
+        pre_define_type: string (None)
+            pre-defined potential of the petar option --galpy-set, options: MWPotential2014
+        config_filename: string (None)
+            configure file of the petar option --galpy-conf-file (generated by petar.galpy.help -o)
+        unit: string (None)
+            if 'std', the scale factors are set for the PeTar data unit of [Msun, pc, Myr] (same as petar -u 1);
+            otherwise, the scale factors are given by keyword arguments
+        kwargs: dict
+            rscale, tscale, vscale, fscale, pscale: unit scale factors (1.0)
+        """
+        try:
+            import galpy.potential
+            from galpy.orbit.integrateFullOrbit import _parse_pot
+        except ImportError:
+            raise ImportError('galpy is required for GalpyPotential, please install it by "pip install galpy"')
+        self.potential = galpy.potential
+        self.parse_pot = _parse_pot
+
+        self.rscale = 1.0
+        self.tscale = 1.0
+        self.vscale = 1.0
+        self.fscale = 1.0
+        self.pscale = 1.0
+        if (unit == 'std'):
+            self.rscale = 0.001/8.0 # pc to solar position in Milkyway
+            self.vscale = 1.0/(220.0*1.022712165045695) # pc/Myr to solar velocity in Milkyway
+            self.tscale = self.rscale/self.vscale
+            self.fscale = self.vscale*self.vscale/self.rscale
+            self.pscale = self.vscale*self.vscale
+        elif (unit is not None):
+            raise ValueError('Unknown unit ',unit,', options are: std')
+        for key in ['rscale','tscale','vscale','fscale','pscale']:
+            if (key in kwargs.keys()): self.__dict__[key] = float(kwargs[key])
+
+        self.pot_type = []
+        self.pot_arg = []
+        if (pre_define_type is not None):
+            if (not pre_define_type in self.pre_define_type_arg.keys()):
+                raise ValueError('Unknown pre-defined potential ',pre_define_type,', options are: ',list(self.pre_define_type_arg.keys()))
+            if (type_arg is None): type_arg = self.pre_define_type_arg[pre_define_type]
+            else: type_arg += '|' + self.pre_define_type_arg[pre_define_type]
+        if (type_arg is not None):
+            for group in type_arg.split('|'):
+                if (not ':' in group):
+                    raise ValueError('Potential type index delimiter ":" is not found in ',group)
+                type_str, arg_str = group.split(':')
+                types = [int(x) for x in type_str.split(',')]
+                args = np.array([float(x) for x in arg_str.split(',')])
+                self.addTypeArg(types, args, len(types)==1)
+        if (config_filename is not None):
+            data = open(config_filename,'r').read().split()
+            n_add = int(data[0])
+            types = [int(x) for x in data[1:n_add+1]]
+            args = np.array([float(x) for x in data[n_add+1:]])
+            self.addTypeArg(types, args, n_add==1)
+        if (len(self.pot_type)==0):
+            raise ValueError('No potential is given, type_arg, pre_define_type or config_filename is required')
+        self.pot_type = np.array(self.pot_type, dtype=int)
+
+        self.pot = [self.createPotential(ptype, parg) for ptype, parg in zip(self.pot_type, self.pot_arg)]
+
+    def getTypeArgNumber(self, pot_type):
+        """ Get the number of arguments of a potential type used by the installed galpy
+
+        Parameters
+        ----------
+        pot_type: int
+            potential type index
+
+        Return
+        ----------
+        n_arg: int
+            number of arguments
+        """
+        pot_class = {0:'LogarithmicHaloPotential', 5:'MiyamotoNagaiPotential', 7:'PowerSphericalPotential', 8:'HernquistPotential', 9:'NFWPotential',
+                     10:'JaffePotential', 12:'FlattenedPowerPotential', 14:'IsochronePotential', 15:'PowerSphericalPotentialwCutoff'}
+        if (not pot_type in pot_class.keys()):
+            raise ValueError('Potential type ',pot_type,' is not supported, available types: ',list(pot_class.keys()))
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            pot = self.potential.__getattribute__(pot_class[pot_type])()
+        return self.parse_pot(pot)[2].size
+
+    def addTypeArg(self, types, args, single_flag):
+        """ Split the arguments to each type and add them to the potential list
+
+        Parameters
+        ----------
+        types: list
+            potential type indices
+        args: 1D numpy.ndarray
+            arguments of all types
+        single_flag: bool
+            if True, types contain only one type and all arguments are used for it
+        """
+        if (single_flag):
+            self.pot_type.append(types[0])
+            self.pot_arg.append(args)
+            return
+        offset = 0
+        for pot_type in types:
+            n_arg = self.getTypeArgNumber(pot_type)
+            if (offset+n_arg>args.size):
+                raise ValueError('The number of arguments ',args.size,' is not enough for potential types ',types)
+            self.pot_type.append(pot_type)
+            self.pot_arg.append(args[offset:offset+n_arg])
+            offset += n_arg
+        if (offset!=args.size):
+            raise ValueError('The number of arguments ',args.size,' does not match potential types ',types,', required ',offset)
+
+    def createPotential(self, pot_type, pot_arg):
+        """ Create the galpy Potential instance of a type index and arguments
+        The arguments are the same as those generated by galpy (see petar.galpy.help), the first one is the amplitude.
+
+        Parameters
+        ----------
+        pot_type: int
+            potential type index
+        pot_arg: 1D numpy.ndarray
+            potential arguments
+
+        Return
+        ----------
+        pot: galpy Potential instance
+        """
+        gp = self.potential
+        n_arg = self.getTypeArgNumber(pot_type)
+        n_min = 3 if (pot_type==15) else n_arg
+        if (pot_arg.size<n_min):
+            raise ValueError('Potential type ',pot_type,' requires ',n_min,' arguments, given ',pot_arg)
+        a = pot_arg
+        if (pot_type==0):
+            b = None if (a[3]>=1.0) else 1.0/np.sqrt(1.0-a[3])
+            pot = gp.LogarithmicHaloPotential(q=a[1], core=np.sqrt(a[2]), b=b)
+        elif (pot_type==5):
+            pot = gp.MiyamotoNagaiPotential(a=a[1], b=a[2])
+        elif (pot_type==7):
+            pot = gp.PowerSphericalPotential(alpha=a[1])
+        elif (pot_type==8):
+            pot = gp.HernquistPotential(a=a[1])
+        elif (pot_type==9):
+            pot = gp.NFWPotential(a=a[1])
+        elif (pot_type==10):
+            pot = gp.JaffePotential(a=a[1])
+        elif (pot_type==12):
+            pot = gp.FlattenedPowerPotential(alpha=a[1], q=np.sqrt(a[2]), core=np.sqrt(a[3]))
+        elif (pot_type==14):
+            pot = gp.IsochronePotential(b=a[1])
+        elif (pot_type==15):
+            pot = gp.PowerSphericalPotentialwCutoff(alpha=a[1], rc=a[2])
+        # the amplitude used in the galpy C interface
+        pot._amp = a[0]
+        return pot
+
+    def evaluate(self, pos, time=0.0):
+        """ Evaluate the potential, acceleration and tidal tensor at one position
+
+        Parameters
+        ----------
+        pos: 1D numpy.ndarray
+            position (x, y, z) in the galactic frame
+        time: float (0.0)
+            time
+
+        Return
+        ----------
+        pot: float
+            potential
+        acc: 1D numpy.ndarray
+            acceleration (x, y, z)
+        tidal_tensor: 2D numpy.ndarray (3,3)
+            tidal tensor, T_ij = - d^2(pot)/dx_i dx_j
+        """
+        x, y, z = pos*self.rscale
+        t = time*self.tscale
+        R = np.sqrt(x*x+y*y)
+        phi = np.arctan2(y, x)
+        gp = self.potential
+        pot = gp.evaluatePotentials(self.pot, R, z, phi=phi, t=t)/self.pscale
+        acc_R = gp.evaluateRforces(self.pot, R, z, phi=phi, t=t)
+        acc_phi = gp.evaluatephitorques(self.pot, R, z, phi=phi, t=t)
+        acc_z = gp.evaluatezforces(self.pot, R, z, phi=phi, t=t)
+        cosphi = np.cos(phi)
+        sinphi = np.sin(phi)
+        acc = np.zeros(3)
+        acc[0] = cosphi*acc_R
+        acc[1] = sinphi*acc_R
+        if (R>0):
+            acc[0] -= sinphi*acc_phi/R
+            acc[1] += cosphi*acc_phi/R
+        acc[2] = acc_z
+        acc /= self.fscale
+        tidal_tensor = gp.ttensor(self.pot, R, z, phi=phi, t=t)*self.rscale/self.fscale
+        return pot, acc, tidal_tensor
+
+class TidalRadius(DictNpArrayMix):
+    """ Tidal (Jacobi) radius of a star cluster in the galactic potential and the escapers
+    Keys: (class members)
+        time (1D): time
+        rtid (1D): tidal radius
+        mass (1D): mass inside the tidal radius
+        n    (1D): number of objects (singles and binary c.m.) inside the tidal radius
+        omega (2D,3): angular velocity of the cluster center orbit
+        pot_gal (1D): galactic potential at the cluster center
+        freq2 (1D): Omega^2 + e^T T e, where e is the unit vector to the galactic center and T is the tidal tensor (G*mass/rtid^3)
+    """
+    def __init__ (self, _dat=None, _offset=int(0), _append=False, **kwargs):
+        """ DictNpArrayMix type initialzation, see help(DictNpArrayMix.__init__)
+
+        Parameters
+        ----------
+        keyword arguments:
+            G: gravitational constant (1.0)
+            rtid_factor: escapers should have distances larger than rtid_factor * tidal radius (1.0)
+        """
+        keys = [['time',1], ['rtid',1], ['mass',1], ['n',1], ['omega',3], ['pot_gal',1], ['freq2',1]]
+        DictNpArrayMix.__init__(self, keys, _dat, _offset, _append, **kwargs)
+        if (not 'G' in self.initargs.keys()): self.initargs['G'] = 1.0
+        if (not 'rtid_factor' in self.initargs.keys()): self.initargs['rtid_factor'] = 1.0
+
+    def calcOneSnapshot(self, time, single, binary, center_pos, center_vel, potential):
+        """ Calculate the tidal radius of one snapshot and find escapers
+        The galactic potential, acceleration and tidal tensor are evaluated once at the cluster center, then all singles and binaries are classified together.
+
+        The angular velocity of the cluster orbit is Omega = R_c x V_c / |R_c|^2, where R_c and V_c are the position and velocity of the cluster center.
+        The tidal radius is r_t = (G M(<r_t) / freq2)^(1/3), freq2 = Omega^2 + e^T T e, where e is the unit vector to the galactic center and T is the tidal tensor,
+        M(<r_t) is obtained by iteration.
+        The Jacobi energy per unit mass in the frame rotating with Omega is
+            E_J = 0.5 |u - Omega x r|^2 + pot - pot_gal(R_c) + acc_gal(R_c) . r - 0.5 |Omega x r|^2,
+        where r and u are the position and velocity relative to the cluster center, and pot is the potential of the PeTar data (including the galactic potential).
+        The objects with E_J > -1.5 G M(<r_t) / r_t (the Jacobi energy at the Lagrangian points) and r > rtid_factor * r_t are escapers.
+
+        Parameters
+        ----------
+        time: float
+            time of the snapshot
+        single: Particle
+            single stars, positions are relative to the cluster center, velocities are in the galactic frame
+        binary: Binary
+            binaries, positions are relative to the cluster center, velocities are in the galactic frame
+        center_pos: 1D numpy.ndarray
+            position of the cluster center in the galactic frame
+        center_vel: 1D numpy.ndarray
+            velocity of the cluster center in the galactic frame
+        potential: GalpyPotential
+            galactic potential
+
+        Return
+        ----------
+        single_sel: 1D numpy.ndarray (bool)
+            True for single escapers
+        binary_sel: 1D numpy.ndarray (bool)
+            True for binary escapers
+        """
+        G = self.initargs['G']
+        rtid_factor = self.initargs['rtid_factor']
+
+        pot_gal, acc_gal, tidal_tensor = potential.evaluate(center_pos, time)
+        r_c2 = center_pos.dot(center_pos)
+        omega = np.cross(center_pos, center_vel)/r_c2
+        e_c = center_pos/np.sqrt(r_c2)
+        freq2 = omega.dot(omega) + e_c.dot(tidal_tensor.dot(e_c))
+
+        # singles and binary c.m. together
+        single.calcR2()
+        binary.calcR2()
+        binary.calcPot()
+        pos = np.concatenate((single.pos, binary.pos))
+        vel = np.concatenate((single.vel, binary.vel)) - center_vel
+        mass = np.concatenate((single.mass, binary.mass))
+        pot = np.concatenate((single.pot, binary.pot))
+        r = np.sqrt(np.concatenate((single.r2, binary.r2)))
+
+        # tidal radius by iteration of enclosed mass
+        rsort = np.argsort(r)
+        r_sort = r[rsort]
+        mcum = np.cumsum(mass[rsort])
+        mtid = mcum[-1] if (mcum.size>0) else 0.0
+        rtid = np.inf
+        ntid = r.size
+        if (freq2>0) & (mtid>0):
+            for i in range(100):
+                rtid = (G*mtid/freq2)**(1.0/3.0)
+                ntid = np.searchsorted(r_sort, rtid, side='right')
+                mtid_new = mcum[ntid-1] if (ntid>0) else 0.0
+                if (mtid_new==mtid): break
+                mtid = mtid_new
+                if (mtid==0):
+                    rtid = 0.0
+                    break
+
+        # Jacobi energy
+        omega_r = np.cross(omega, pos)
+        dv = vel - omega_r
+        ej = 0.5*vecDot(dv, dv) + pot - pot_gal + pos.dot(acc_gal) - 0.5*vecDot(omega_r, omega_r)
+        ej_crit = -1.5*G*mtid/rtid if (rtid>0) else 0.0
+        sel = (ej > ej_crit) & (r > rtid_factor*rtid)
+
+        self.time = np.append(self.time, time)
+        self.rtid = np.append(self.rtid, rtid)
+        self.mass = np.append(self.mass, mtid)
+        self.n = np.append(self.n, ntid)
+        self.omega = np.append(self.omega, [omega], axis=0)
+        self.pot_gal = np.append(self.pot_gal, pot_gal)
+        self.freq2 = np.append(self.freq2, freq2)
+        self.size += 1
+
+        return sel[:single.size], sel[single.size:]
@@ -0,0 +1,244 @@
+# particle-major trajectory store transposed from snapshots
+import numpy as np
+import multiprocessing as mp
+import json
+import os
+from .base import *
+from .data import *
+from .parallel_data_process import *
+
+class ParticleTrajectory(Particle):
+    """ Time series of particles read from TrajectoryStore
+    Keys: (class members)
+        time (1D): time of the snapshot
+        [Particle] (inherited)
+    """
+    def __init__ (self, _dat=None, _offset=int(0), _append=False, **kwargs):
+        """ DictNpArrayMix type initialzation, see help(DictNpArrayMix.__init__)
+
+        Parameters
+        ----------
+        keyword arguments:
+            particle_type: basic particle type: hermite, hard, soft (soft), do not change this, if read PeTar data.
+            interrupt_mode: PeTar interrupt mode: base, bse, none (none)
+        """
+        DictNpArrayMix.__init__(self, [['time',1]], _dat, _offset, _append, **kwargs)
+        Particle.__init__(self, _dat, _offset+self.ncols, True, **kwargs)
+
+class TrajectoryIndex(DictNpArrayMix):
+    """ Index of ids in TrajectoryStore
+    Keys: (class members)
+        id (1D): particle id (sorted)
+        chunk (1D): chunk index
+        start (1D): start row in the chunk
+        count (1D): number of rows (snapshots containing the particle)
+        t_first (1D): first time the particle exists
+        t_last (1D): last time the particle exists
+    """
+    def __init__ (self, _dat=None, _offset=int(0), _append=False, **kwargs):
+        """ DictNpArrayMix type initialzation, see help(DictNpArrayMix.__init__)
+        """
+        keys = [['id',1], ['chunk',1], ['start',1], ['count',1], ['t_first',1], ['t_last',1]]
+        DictNpArrayMix.__init__(self, keys, _dat, _offset, _append, **kwargs)
+
+def _findColumnIndex(data, name):
+    """ Find the column index of a member in the data file
+    """
+    icol = 0
+    for key, parameter in data.keys:
+        if (key==name): return icol
+        icol += parameter if (type(parameter)==int) else data[key].ncols
+    raise ValueError('Member ',name,' is not found')
+
+def _readTrajectorySnapshot(file_path, chunk_size, kwargs):
+    """ Read one snapshot and split rows (time + particle columns) by the id chunk index
+    """
+    header = PeTarDataHeader(file_path)
+    snap = readSnapshotData(file_path, False)
+    if (snap.shape[0]==0): return header.time, dict()
+    particle = Particle(snap, **kwargs)
+    dat = np.concatenate((np.full((snap.shape[0],1), header.time), snap), axis=1)
+    ichunk = np.floor_divide(particle.id, chunk_size).astype(np.int64)
+    order = np.argsort(ichunk, kind='stable')
+    ichunk_sort = ichunk[order]
+    keys, start = np.unique(ichunk_sort, return_index=True)
+    end = np.append(start[1:], ichunk_sort.size)
+    return header.time, dict([(int(k), dat[order[s:e]]) for k, s, e in zip(keys, start, end)])
+
+def createTrajectoryStore(path_list, store_path, n_cpu=int(0), chunk_size=int(1000), **kwargs):
+    """ Transpose snapshots into a particle-major store
+
+    The particles are grouped into chunks by id // chunk_size.
+    The snapshots are read in parallel and the rows are appended to temporary files of chunks, thus the memory usage is bounded by a few snapshots.
+    Then each chunk is sorted by (id, time) and saved as [store_path]/chunk.[chunk index].npy.
+    The index (index.npy) records for each id: chunk index, start row and number of rows in the chunk, first and last times.
+    Particles that join or leave the system (e.g. escapers, mergers) only have rows in the snapshots where they exist,
+    their time ranges are recorded in the index.
+
+    Parameters
+    ----------
+    path_list: list
+        snapshot file paths
+    store_path: string
+        directory of the store
+    n_cpu: int (0)
+        number of processes to read snapshots, if 0, use all CPU cores
+    chunk_size: int (1000)
+        id range of one chunk
+    kwargs: dict
+        keyword arguments of Particle, e.g. interrupt_mode
+
+    Return
+    ----------
+    store: TrajectoryStore
+    """
+    os.makedirs(store_path, exist_ok=True)
+    if (n_cpu==0): n_cpu = mp.cpu_count()
+    n_cpu = max(1, min(n_cpu, len(path_list)))
+    ncols = ParticleTrajectory(**kwargs).ncols
+
+    # the temporary files are opened for each write, thus the number of open files does not increase with the number of chunks
+    tmp_files = dict()
+    times = []
+    def appendChunks(time, chunks):
+        times.append(time)
+        for k, dat in chunks.items():
+            if (dat.shape[1]!=ncols):
+                raise ValueError('Number of columns ',dat.shape[1]-1,' of snapshot at time ',time,' is inconsistent with the particle type ',ncols-1)
+            mode = 'ab'
+            if (not k in tmp_files.keys()):
+                tmp_files[k] = os.path.join(store_path, 'chunk.'+str(k)+'.tmp')
+                mode = 'wb'
+            with open(tmp_files[k], mode) as f:
+                f.write(np.ascontiguousarray(dat, dtype=np.float64).tobytes())
+
+    if (n_cpu>1):
+        pool = mp.Pool(n_cpu)
+        for time, chunks in pool.imap(_createTrajectoryWorker, [(path, chunk_size, kwargs) for path in path_list]):
+            appendChunks(time, chunks)
+        pool.close()
+        pool.join()
+    else:
+        for path in path_list:
+            time, chunks = _readTrajectorySnapshot(path, chunk_size, kwargs)
+            appendChunks(time, chunks)
+
+    id_col = _findColumnIndex(ParticleTrajectory(**kwargs), 'id')
+    index = []
+    for k in sorted(tmp_files.keys()):
+        tmp_name = tmp_files[k]
+        dat = np.fromfile(tmp_name, dtype=np.float64).reshape(-1, ncols)
+        dat = dat[np.lexsort((dat[:,0], dat[:,id_col]))]
+        np.save(os.path.join(store_path, 'chunk.'+str(k)+'.npy'), dat)
+        os.remove(tmp_name)
+        ids, start, count = np.unique(dat[:,id_col], return_index=True, return_counts=True)
+        t_first = dat[start, 0]
+        t_last = dat[start+count-1, 0]
+        index.append(np.array([ids, np.full(ids.size, k), start, count, t_first, t_last]).T)
+    index = np.concatenate(index) if (len(index)>0) else np.zeros((0,6))
+    np.save(os.path.join(store_path, 'index.npy'), index)
+    with open(os.path.join(store_path, 'meta.json'), 'w') as f:
+        json.dump({'chunk_size':chunk_size, 'ncols':ncols, 'initargs':kwargs, 'times':sorted(times)}, f)
+    return TrajectoryStore(store_path)
+
+def _createTrajectoryWorker(args):
+    return _readTrajectorySnapshot(*args)
+
+class TrajectoryStore():
+    """ Particle-major store of snapshots generated by createTrajectoryStore
+    The chunk files are memory-mapped, thus reading the time series of a few particles only touches their rows.
+
+    Members:
+        path: directory of the store
+        index: TrajectoryIndex of all ids
+        times: 1D numpy.ndarray, times of all snapshots
+        chunk_size: id range of one chunk
+        initargs: keyword arguments of Particle
+    """
+    def __init__(self, path):
+        """
+        Parameters
+        ----------
+        path: string
+            directory of the store
+        """
+        self.path = path
+        with open(os.path.join(path, 'meta.json'), 'r') as f:
+            meta = json.load(f)
+        self.chunk_size = meta['chunk_size']
+        self.initargs = meta['initargs']
+        self.times = np.array(meta['times'])
+        self.index = TrajectoryIndex(np.load(os.path.join(path, 'index.npy')).reshape(-1,6))
+        self._chunks = dict()
+
+    def _getChunk(self, k):
+        if (not k in self._chunks.keys()):
+            self._chunks[k] = np.load(os.path.join(self.path, 'chunk.'+str(k)+'.npy'), mmap_mode='r')
+        return self._chunks[k]
+
+    def findIds(self, ids):
+        """ Find the index rows of ids
+
+        Parameters
+        ----------
+        ids: 1D numpy.ndarray | list
+            particle ids
+
+        Return
+        ----------
+        irow: 1D numpy.ndarray (int)
+            row indices in the member index, -1 if the id does not exist
+        """
+        ids = np.atleast_1d(np.asarray(ids, dtype=float))
+        irow = np.searchsorted(self.index.id, ids)
+        irow_clip = np.minimum(irow, max(self.index.size-1, 0))
+        found = (irow<self.index.size) & (self.index.size>0)
+        found[found] = (self.index.id[irow_clip[found]]==ids[found])
+        return np.where(found, irow_clip, -1)
+
+    def getTimeRange(self, ids):
+        """ Get the first and last times of particles existing in snapshots
+
+        Parameters
+        ----------
+        ids: 1D numpy.ndarray | list
+            particle ids
+
+        Return
+        ----------
+        index: TrajectoryIndex
+            index rows of existing ids
+        """
+        irow = self.findIds(ids)
+        return self.index[irow[irow>=0]]
+
+    def getTrajectory(self, ids, t_min=None, t_max=None):
+        """ Get the time series of particles
+
+        Parameters
+        ----------
+        ids: 1D numpy.ndarray | list
+            particle ids, the ids that do not exist are ignored
+        t_min: float (None)
+            minimum time, if None, no lower limit
+        t_max: float (None)
+            maximum time, if None, no upper limit
+
+        Return
+        ----------
+        data: ParticleTrajectory
+            rows are sorted by the order of ids and then time
+        """
+        irow = self.findIds(ids)
+        irow = irow[irow>=0]
+        blocks = []
+        for i in irow:
+            k = int(self.index.chunk[i])
+            start = int(self.index.start[i])
+            dat = self._getChunk(k)[start:start+int(self.index.count[i])]
+            if (t_min is not None): dat = dat[dat[:,0]>=t_min]
+            if (t_max is not None): dat = dat[dat[:,0]<=t_max]
+            blocks.append(np.array(dat))
+        data = ParticleTrajectory(**self.initargs)
+        if (len(blocks)>0): data.readArray(np.concatenate(blocks))
+        return data
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import petar
+import getopt
+
+if __name__ == '__main__':
+
+    output_prefix=None
+    n_rank=None
+    n_cpu=0
+    ask_flag=False
+    suffixes=['esc','group','sse','bse']
+
+    def usage():
+        print("Gether separated output data due to multiple MPI processes (file suffixes: "+' '.join(suffixes)+")")
+        print("Each rank file is read once, the records of ranks are merged in the time order.")
+        print("In the same pass, the group records are split by the number of members to [output prefix].group.n[number of members],")
+        print("and the SSE/BSE records are split to [output prefix].sse.[type_change|sn_kick] and [output prefix].bse.[type_change|sn_kick|dynamic_merge].")
+        print("The list of snapshot files is written to [output prefix].snap.lst.")
+        print("Usage: petar.data.gether [options] [data filename prefix]")
+        print("       data filename prefix is defined by \"petar -f\", defaulted case is \"data\".")
+        print("option:")
+        print("  -h(--help): help")
+        print("  -f(--output-prefix): output filename prefix (default: data filename prefix)")
+        print("  -n(--n-mpi): MPI processes number (default: auto detect)")
+        print("  -i(--ask): before remove existing gethered files, ask first (default: no ask)")
+        print("  --n-cpu: number of CPU processes to gether suffixes in parallel (default: all cores)")
+        print("  --suffixes [S,S,...]: file suffixes to gether (default: "+','.join(suffixes)+")")
+
+    try:
+        shortargs = 'f:n:ih'
+        longargs = ['output-prefix=','n-mpi=','ask','n-cpu=','suffixes=','help']
+        opts,remainder= getopt.getopt( sys.argv[1:], shortargs, longargs)
+
+        for opt,arg in opts:
+            if opt in ('-h','--help'):
+                usage()
+                sys.exit(1)
+            elif opt in ('-f','--output-prefix'):
+                output_prefix = arg
+            elif opt in ('-n','--n-mpi'):
+                n_rank = int(arg)
+            elif opt in ('-i','--ask'):
+                ask_flag = True
+            elif opt in ('--n-cpu',):
+                n_cpu = int(arg)
+            elif opt in ('--suffixes',):
+                suffixes = arg.split(',')
+            else:
+                assert False, "unhandeld option"
+
+    except getopt.GetoptError:
+        print('getopt error!')
+        usage()
+        sys.exit(1)
+
+    if (len(remainder)==0):
+        print('Error, file name not provided')
+        usage()
+        sys.exit(1)
+    filename_prefix = remainder[0]
+    if (output_prefix is None): output_prefix = filename_prefix
+
+    print('data filename prefix: ', filename_prefix, ' output filename prefix: ', output_prefix)
+
+    if (ask_flag):
+        suffixes_keep = []
+        for suffix in suffixes:
+            out_name = output_prefix + '.' + suffix
+            if (os.path.exists(out_name)):
+                answer = input('remove existing gethered file '+out_name+'? [y/n] ')
+                if (answer.strip().lower() not in ['y','yes']): continue
+            suffixes_keep.append(suffix)
+        suffixes = suffixes_keep
+
+    output_list = petar.getherData(filename_prefix, output_prefix, suffixes, n_rank, n_cpu)
+    for name in output_list: print('generate ', name)
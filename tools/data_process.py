@@ -5,34 +5,82 @@ import multiprocessing as mp
 import sys
 import petar
 import getopt
+import time
+import os
 
 if __name__ == '__main__':
 
     filename_prefix='data'
     average_mode='sphere'
     read_flag=False
+    resume_flag=False
     n_cpu=0
+    pipeline_args=None
+    shared_memory=False
+    stage_modules=[]
+    cache_flag=False
+    cache_max_size=None
+    config_filename=None
+    galpy_args=dict()
+    daemon_flag=False
+    daemon_args=dict()
+    poll_interval=10.0
+    max_idle=None
 
     def usage():
         print("A tool for processing a list of snapshot data to detect binaries, calculate Langragian radii and properties, get the density center and core radius")
         print("Usage: petar.data.process [options] data_filename")
-        print("data_filename: A list of snapshot data path, each line for one snapshot")
+        print("data_filename: A list of snapshot data path, each line for one snapshot;")
+        print("               in the daemon mode, the snapshot filename prefix defined by \"petar -f\" (can include the directory)")
         print("option:")
         print("  -h(--help): help")
-        print("  -p(--filename-prefix): prefix of output file names for: [prefix].[lagr|esc.[single|binary]|core] (data)")
+        print("  -p(--filename-prefix): prefix of output file names for: [prefix].[lagr|esc.[single|binary]|core|tidal|process_prof] (data)")
         print("  -m(--mass-fraction): Lagrangian radii mass fraction (0.1,0.3,0.5,0.7,0.9)")
         print("  -G(--gravitational-constant): Gravitational constant (if interrupt-mode=bse: ",petar.G_MSUN_PC_MYR,"; else 1.0)")
         print("  -b(--r-max-binary): maximum sepration for detecting binaries (0.1)")
         print("  -B(--full-binary): calculate full binary orbital parameters (simple_mode=False in Binary class), this option increases computing time")
         print("  -a(--average-mode): Lagrangian properity average mode: sphere: average from center to Lagragian radii; shell: average between two neighbor radii (sphere)")
-        print("  -r(--read-data): read existing single, binary and core data to avoid expensive KDTree construction, no argument, disabled in default")
+        print("  -r(--read-data): read existing single, binary and core data to avoid expensive KDTree construction without checking whether they are consistent with the snapshots and parameters, no argument, disabled in default; --cache is recommended instead")
         print("  -e(--r-escape): a constant escape distance criterion, in default, it is 20*half-mass radius")
+        print("  --galpy-type-arg [S]: the galactic potential used in the petar option --galpy-type-arg;")
+        print("                        if any of --galpy-* options is given, the tidal radius is calculated and saved in [prefix].tidal,")
+        print("                        and escapers are selected by the Jacobi energy and the tidal radius instead of -e, see help(petar.TidalRadius.calcOneSnapshot);")
+        print("                        the positions and velocities of snapshots should be in the galactic frame and the potential should include the galactic potential;")
+        print("                        galpy is required")
+        print("  --galpy-set [S]: the pre-defined galactic potential used in the petar option --galpy-set: MWPotential2014")
+        print("  --galpy-conf-file [S]: the configure file of the galactic potential used in the petar option --galpy-conf-file")
+        print("  --galpy-units [S]: unit scaling between the snapshot data and galpy: std: snapshots in [Msun, pc, Myr] (petar -u 1); none: no scaling (std if -i bse, else none)")
+        print("  --rtid-factor [F]: escapers should be outside rtid-factor * tidal radius (1.0)")
         print("  -i(--interrupt-mode): interruption mode: no, base, bse (no)")
         print("  -n(--n-cpu): number of CPU threads for parallel processing (all threads)")
+        print("  --pipeline: overlap reading, computing and writing of snapshots in each process by using reader and writer threads, disabled in default")
+        print("  --n-reader [I]: number of reader threads per process in the pipeline mode (1)")
+        print("  --n-writer [I]: number of writer threads per process in the pipeline mode (1)")
+        print("  --read-queue [I]: maximum number of snapshots in flight per process in the pipeline mode (2)")
+        print("  --write-queue [I]: maximum number of single/binary data waiting for writing per process in the pipeline mode (4)")
+        print("  --shared-memory: transfer results between processes through shared memory instead of pickling, disabled in default")
+        print("  --cache: reuse the single, binary and core data of snapshots if the cache manifest [prefix].cache records that they are generated from the same snapshot content with the same -G, -b, -B and -i options;")
+        print("           other snapshots are processed and the manifest is updated, disabled in default")
+        print("  --cache-max-size [F]: after processing, remove the single and binary data of the least recently used snapshots in the cache manifest until their total size is below the given value in MB")
+        print("  --config-file [S]: a file of additional configurations evaluated in the same pass, each line contains the options of one configuration:")
+        print("                     -p (required), -m, -b, -a and -e, with the same format as the command line options, the other options are the same as the command line;")
+        print("                     the snapshots are read and the binaries, density center and core are calculated once for all configurations;")
+        print("                     the results of each configuration are saved with its own prefix; the single and binary data are saved for the command line configuration")
+        print("  --stage-module [S]: a python file to import before processing, which registers user-defined analysis stages by petar.registerProcessStage;")
+        print("                      the results are saved in [prefix].[stage name]; this option can be used multiple times")
+        print("  --resume: read existing [prefix].[lagr|core|esc_single|esc_binary|tidal|bse_status], only process snapshots with new times and append results, disabled in default")
+        print("  --daemon: process snapshots while petar is running: poll the snapshots [data_filename].[file id], process the completed ones on a worker pool")
+        print("            and append the results as the resume mode; the results and the summary file are replaced atomically after each update;")
+        print("            -r and --config-file are not supported, disabled in default")
+        print("  --poll-interval [F]: polling time interval in seconds in the daemon mode (10.0)")
+        print("  --stable-time [F]: a snapshot is completed if its size and modification time are unchanged for this time in seconds (5.0)")
+        print("  --nice [I]: run the daemon and workers with at least this niceness to reduce the impact on the simulation (10)")
+        print("  --summary-file [S]: JSON file of the latest results (time, core radius, Lagrangian radii, numbers of escapers) for monitoring ([prefix].summary)")
+        print("  --max-idle [F]: stop the daemon if no new or modified snapshot is found within this time in seconds (run until interrupted)")
 
     try:
         shortargs = 'p:m:G:b:Ba:re:i:n:h'
-        longargs = ['mass-fraction=','gravitational-constant=','r-max-binary=','full-binary','average-mode=', 'filename-prefix=','read-data','r-escape=','interrupt-mode=','n-cpu=','help']
+        longargs = ['mass-fraction=','gravitational-constant=','r-max-binary=','full-binary','average-mode=', 'filename-prefix=','read-data','r-escape=','interrupt-mode=','n-cpu=','resume','pipeline','n-reader=','n-writer=','read-queue=','write-queue=','shared-memory','stage-module=','cache','cache-max-size=','config-file=','galpy-type-arg=','galpy-set=','galpy-conf-file=','galpy-units=','rtid-factor=','daemon','poll-interval=','stable-time=','nice=','summary-file=','max-idle=','help']
         opts,remainder= getopt.getopt( sys.argv[1:], shortargs, longargs)
 
         kwargs=dict()
@@ -60,6 +108,55 @@ if __name__ == '__main__':
                 read_flag = True
             elif opt in ('-e','--r-escape'):
                 kwargs['r_escape'] = float(arg)
+            elif opt in ('--resume',):
+                resume_flag = True
+            elif opt in ('--shared-memory',):
+                shared_memory = True
+            elif opt in ('--cache',):
+                cache_flag = True
+            elif opt in ('--cache-max-size',):
+                cache_flag = True
+                cache_max_size = float(arg)
+            elif opt in ('--config-file',):
+                config_filename = arg
+            elif opt in ('--galpy-type-arg',):
+                galpy_args['type_arg'] = arg
+            elif opt in ('--galpy-set',):
+                galpy_args['pre_define_type'] = arg
+            elif opt in ('--galpy-conf-file',):
+                galpy_args['config_filename'] = arg
+            elif opt in ('--galpy-units',):
+                galpy_args['unit'] = arg
+            elif opt in ('--rtid-factor',):
+                kwargs['rtid_factor'] = float(arg)
+            elif opt in ('--stage-module',):
+                stage_modules.append(arg)
+            elif opt in ('--daemon',):
+                daemon_flag = True
+            elif opt in ('--poll-interval',):
+                poll_interval = float(arg)
+            elif opt in ('--stable-time',):
+                daemon_args['stable_time'] = float(arg)
+            elif opt in ('--nice',):
+                daemon_args['nice'] = int(arg)
+            elif opt in ('--summary-file',):
+                daemon_args['summary_filename'] = arg
+            elif opt in ('--max-idle',):
+                max_idle = float(arg)
+            elif opt in ('--pipeline',):
+                if (pipeline_args is None): pipeline_args=dict()
+            elif opt in ('--n-reader',):
+                if (pipeline_args is None): pipeline_args=dict()
+                pipeline_args['n_reader'] = int(arg)
+            elif opt in ('--n-writer',):
+                if (pipeline_args is None): pipeline_args=dict()
+                pipeline_args['n_writer'] = int(arg)
+            elif opt in ('--read-queue',):
+                if (pipeline_args is None): pipeline_args=dict()
+                pipeline_args['read_queue_size'] = int(arg)
+            elif opt in ('--write-queue',):
+                if (pipeline_args is None): pipeline_args=dict()
+                pipeline_args['write_queue_size'] = int(arg)
             else:
                 assert False, "unhandeld option"
 
@@ -74,22 +171,126 @@ if __name__ == '__main__':
         if ('interrupt_mode' in kwargs.keys()):
             if (kwargs['interrupt_mode']=='bse'): kwargs['G'] = 0.00449830997959438 # pc^3/(Msun*Myr^2)
 
+    if (len(galpy_args)>0):
+        if (not 'unit' in galpy_args.keys()):
+            if ('interrupt_mode' in kwargs.keys()):
+                if (kwargs['interrupt_mode']=='bse'): galpy_args['unit'] = 'std'
+        elif (galpy_args['unit']=='none'): galpy_args.pop('unit')
+        kwargs['galpy_potential'] = galpy_args
+
     kwargs['filename_prefix'] = filename_prefix
 
     for key, item in kwargs.items(): print(key,':',item)
 
+    for module_path in stage_modules:
+        petar.loadProcessStageModule(module_path)
+    stage_names = list(petar.process_stage_registry.keys())
+    if (len(stage_names)>0): print('analysis stages:',stage_names)
+
+    configs = None
+    if (config_filename is not None):
+        configs = []
+        for line in open(config_filename,'r').read().splitlines():
+            line = line.strip()
+            if (line=='') | (line.startswith('#')): continue
+            config_opts, config_remainder = getopt.getopt(line.split(), 'p:m:b:a:e:', ['filename-prefix=','mass-fraction=','r-max-binary=','average-mode=','r-escape='])
+            config=dict()
+            for opt,arg in config_opts:
+                if opt in ('-p','--filename-prefix'):
+                    config['filename_prefix'] = arg
+                elif opt in ('-m','--mass-fraction'):
+                    config['mass_fraction'] = np.array([float(x) for x in arg.split(',')])
+                elif opt in ('-b','--r-max-binary'):
+                    config['r_max_binary'] = float(arg)
+                elif opt in ('-a','--average-mode'):
+                    config['average_mode'] = arg
+                elif opt in ('-e','--r-escape'):
+                    config['r_escape'] = float(arg)
+            if (not 'filename_prefix' in config.keys()) | (len(config_remainder)>0):
+                print('Configuration error in line: ',line,', -p is required and only -p, -m, -b, -a, -e are supported')
+                sys.exit(1)
+            configs.append(config)
+        print('additional configurations:')
+        for config in configs: print(config)
+        if (resume_flag):
+            print('Error: the resume mode does not support additional configurations')
+            sys.exit(1)
+
+    if (daemon_flag):
+        if (read_flag) | (configs is not None):
+            print('Error: the daemon mode does not support -r and --config-file')
+            sys.exit(1)
+        if (shared_memory): print('Warning: --shared-memory is not used in the daemon mode')
+        cache = None
+        if (cache_flag): cache = petar.ProcessCache(filename_prefix+'.cache', **kwargs)
+        daemon = petar.DataProcessDaemon(filename, n_cpu, pipeline_args=pipeline_args, cache=cache, **daemon_args, **kwargs)
+        print('Daemon mode: watch snapshots',filename+'.[file id]',', processed snapshots:',daemon.result['lagr'].size,', summary file:',daemon.summary_filename)
+        daemon.run(poll_interval, max_idle)
+        sys.exit(0)
+
     fl = open(filename,'r')
     file_list = fl.read()
     path_list = file_list.splitlines()
-     
-    result,time_profile = petar.parallelDataProcessList(path_list, n_cpu, read_flag, **kwargs)
 
-    for key in ['lagr','core','bse_status', 'esc_single', 'esc_binary']:
-        if key in result.keys():
-            key_filename  = filename_prefix + '.' + key
-            result[key].savetxt(key_filename)
-            print (key,"data is saved in file:",key_filename)
+    if (resume_flag):
+        result_pre = petar.loadDataProcessResult(**kwargs)
+        path_list = petar.findNewSnapshots(path_list, result_pre['lagr'].time)
+        print('Resume from existing data, processed snapshots:',result_pre['lagr'].size,' new snapshots:',len(path_list))
+
+    cache = None
+    if (cache_flag):
+        if (read_flag): 
+            print('Warning: the cache is not used in the read mode (-r)')
+        else:
+            cache = petar.ProcessCache(filename_prefix+'.cache', **kwargs)
+
+    start_time = time.time()
+    result,time_profile = petar.parallelDataProcessList(path_list, n_cpu, read_flag, pipeline_args, shared_memory, cache, configs, **kwargs)
+
+    if (cache is not None):
+        n_hit = sum([cache.valid[path] for path in path_list if path in cache.valid.keys()])
+        cache.save()
+        print('Cache manifest is saved in file:',cache.filename,' reused snapshots:',n_hit,' processed snapshots:',len(path_list)-n_hit)
+        if (cache_max_size is not None):
+            evicted = cache.evict(int(cache_max_size*1024*1024))
+            print('Cache eviction: removed single and binary data of',len(evicted),'snapshots')
+
+    if (resume_flag):
+        result = petar.joinDataProcessResult(result_pre, result)
+
+    def saveResult(result, prefix):
+        for key in ['lagr','core','tidal','bse_status', 'esc_single', 'esc_binary']:
+            if key in result.keys():
+                key_filename  = prefix + '.' + key
+                result[key].savetxt(key_filename)
+                print (key,"data is saved in file:",key_filename)
+
+        for name in stage_names:
+            if (name in result.keys()):
+                if (result[name] is not None):
+                    key_filename  = prefix + '.' + name
+                    petar.createProcessStage(name).save(result[name], key_filename)
+                    print (name,"data is saved in file:",key_filename)
+
+    saveResult(result, filename_prefix)
+    if ('configs' in result.keys()):
+        for config_kwargs, config_result in result['configs']:
+            # the core data are the same for all configurations
+            if ('core' in result.keys()): config_result['core'] = result['core']
+            saveResult(config_result, config_kwargs['filename_prefix'])
      
-    print ('CPU time profile:')
-    for key, item in time_profile.items():
-        print (key,item,)
+    wall_time = time.time() - start_time
+
+    prof_filename = filename_prefix + '.process_prof'
+    prof_all = time_profile['snapshot']
+    if (resume_flag) and (os.path.exists(prof_filename)):
+        # append to the profile of the processed snapshots, the same as the daemon mode
+        if (os.path.getsize(prof_filename)>0):
+            prof_pre = petar.ProcessProfile()
+            prof_pre.loadtxt(prof_filename)
+            prof_all = petar.join(prof_pre, prof_all)
+    prof_all.savetxt(prof_filename)
+    print ('Profile data of each snapshot is saved in file:',prof_filename)
+    print ('Time profile per snapshot [s]:')
+    time_profile['snapshot'].printSummary(wall_time)
+    if ('pipeline' in time_profile.keys()): time_profile['pipeline'].printSummary()
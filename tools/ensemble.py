@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+import numpy as np
+import sys
+import petar
+import getopt
+
+if __name__ == '__main__':
+
+    filename_prefix='data'
+    output_prefix='ensemble'
+    n_cpu=0
+    percentiles=[10,50,90]
+    time_grid=None
+
+    def usage():
+        print("A tool for calculating the ensemble statistics of Lagrangian radii and properties, BSE status and escapers of many runs processed by petar.data.process")
+        print("The time series of all runs are interpolated to a common time grid, then the mean, standard deviation and percentiles over runs are calculated")
+        print("Usage: petar.data.ensemble [options] run_list_filename")
+        print("run_list_filename: A list of run directories, each line for one run")
+        print("option:")
+        print("  -h(--help): help")
+        print("  -p(--filename-prefix): prefix of the data files of petar.data.process in each run directory: [prefix].[lagr|esc_single|esc_binary|bse_status] (data)")
+        print("  -o(--output-prefix): prefix of output file names: [prefix].[lagr|esc_count|bse_status].[mean|std|p[percentile]] and [prefix].n_run (ensemble)")
+        print("  -m(--mass-fraction): Lagrangian radii mass fraction used in petar.data.process (0.1,0.3,0.5,0.7,0.9)")
+        print("  -i(--interrupt-mode): interruption mode used in petar.data.process: no, base, bse (no)")
+        print("  -n(--n-cpu): number of CPU threads for loading data (all threads)")
+        print("  --percentile [F,F,...]: percentiles to calculate (10,50,90)")
+        print("  --time-grid [F,F,F]: the common time grid: start time, end time, time interval; in default, the union of snapshot times of all runs in the common time range is used")
+
+    try:
+        shortargs = 'p:o:m:i:n:h'
+        longargs = ['filename-prefix=','output-prefix=','mass-fraction=','interrupt-mode=','n-cpu=','percentile=','time-grid=','help']
+        opts,remainder= getopt.getopt( sys.argv[1:], shortargs, longargs)
+
+        kwargs=dict()
+        for opt,arg in opts:
+            if opt in ('-h','--help'):
+                usage()
+                sys.exit(1)
+            elif opt in ('-p','--filename-prefix'):
+                filename_prefix = arg
+            elif opt in ('-o','--output-prefix'):
+                output_prefix = arg
+            elif opt in ('-m','--mass-fraction'):
+                kwargs['mass_fraction'] = np.array([float(x) for x in arg.split(',')])
+            elif opt in ('-i','--interrupt-mode'):
+                kwargs['interrupt_mode'] = arg
+            elif opt in ('-n','--n-cpu'):
+                n_cpu = int(arg)
+            elif opt in ('--percentile',):
+                percentiles = [float(x) for x in arg.split(',')]
+            elif opt in ('--time-grid',):
+                t_start, t_end, dt = [float(x) for x in arg.split(',')]
+                time_grid = np.arange(t_start, t_end+0.5*dt, dt)
+            else:
+                assert False, "unhandeld option"
+
+    except getopt.GetoptError:
+        print('getopt error!')
+        usage()
+        sys.exit(1)
+
+    filename = remainder[0]
+    kwargs['filename_prefix'] = filename_prefix
+
+    for key, item in kwargs.items(): print(key,':',item)
+
+    path_list = [path for path in open(filename,'r').read().splitlines() if path.strip()!='']
+    print('Number of runs:',len(path_list))
+
+    result = petar.ensembleDataProcessResult(path_list, time_grid, n_cpu, percentiles, **kwargs)
+
+    for key in ['lagr','esc_count','bse_status']:
+        if key in result.keys():
+            for stat_name, item in result[key].items():
+                key_filename = output_prefix + '.' + key + '.' + stat_name
+                item.savetxt(key_filename)
+            print (key,"statistics are saved in files:",output_prefix + '.' + key + '.[' + '|'.join(result[key].keys()) +']')
+
+    if ('n_run' in result.keys()):
+        key_filename = output_prefix + '.n_run'
+        np.savetxt(key_filename, np.transpose([result['time_grid'], result['n_run']]))
+        print ("time grid and number of runs are saved in file:",key_filename)
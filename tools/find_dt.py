@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+
+import numpy as np
+import sys
+import petar
+import getopt
+
+if __name__ == '__main__':
+
+    prefix=None
+    options=''
+    command='petar'
+    dt_soft=None
+    n_mpi=1
+    n_omp=None
+    n_core=0
+    theta_list=[0.3]
+    k_range=3
+    work_dir='.find_dt'
+    output_file='find_dt.result'
+
+    def usage():
+        print("Find the tree time step (and the opening angle) for the best performance of petar")
+        print("Short test runs with different tree time steps are performed concurrently within the CPU core budget,")
+        print("the golden-section search is used to find the step with the minimum wallclock time per time unit for each opening angle.")
+        print("The wallclock time is obtained from the profile output ([prefix].prof.rank.*) and the energy error from the status output ([prefix].status).")
+        print("Runs much slower than the best one are terminated early.")
+        print("Usage: petar.find.dt [options] [petar data filename]")
+        print("option:")
+        print("  -h(--help): help")
+        print("  -r(--run-prefix): user defined prefix before the petar commander, please use \" \" to enclose the options; if used, -m is suppressed (default: mpiexec -n [MPI number] if MPI number > 1)")
+        print("  -a(--petar-options): user defined options used for petar commander, please use \" \" to enclose the options.")
+        print("      For example, \"-b [binary number] -u [unit set] -G [gravitaitonal constant]\".")
+        print("      Notice that \"-o\", \"-w\", \"-t\", \"-s\" and \"-T\" from the petar commander cannot be used inside this -a block (default: \"\")")
+        print("  -p(--petar-command): petar commander name (default: petar)")
+        print("  -s(--dt-soft): center of the searching range of tree time step (default: auto)")
+        print("  -m(--n-mpi): number of MPI processors per run (default: 1)")
+        print("  -o(--n-omp): number of OpenMP processors per MPI processor (default: OMP_NUM_THREADS of the environment is used; one core per MPI processor is assumed for the core budget)")
+        print("  -n(--n-core): number of CPU cores used for all concurrent runs (default: all cores)")
+        print("  -d(--work-dir): directory to store the test runs (default: .find_dt)")
+        print("  -f(--output-file): file to save the results of all runs (default: find_dt.result)")
+        print("  --theta [F,F,...]: opening angles to test (default: 0.3)")
+        print("  --dt-range [I]: the searching range of the tree time step is [dt_soft*0.5^dt_range, dt_soft*2^dt_range] (default: 3)")
+        print("  --n-step [I]: number of tree steps of each run (default: 6)")
+        print("  --kill-factor [F]: terminate the run if its wallclock time exceeds the initialization time + this factor * the best wallclock time per time unit * the evolved time (default: 3.0)")
+        print("  --timeout [F]: maximum wallclock time (seconds) of runs before any run finishes (default: 10000)")
+        print("  --use-gpu: the profile contains GPU columns (petar is compiled with GPU profile)")
+        print("Notice that petar only accepts a tree time step of 0.5^[integer number], the step size is regularized.")
+
+    try:
+        shortargs = 'r:a:p:s:m:o:n:d:f:h'
+        longargs = ['run-prefix=','petar-options=','petar-command=','dt-soft=','n-mpi=','n-omp=','n-core=','work-dir=','output-file=','theta=','dt-range=','n-step=','kill-factor=','timeout=','use-gpu','help']
+        opts,remainder= getopt.getopt( sys.argv[1:], shortargs, longargs)
+
+        kwargs=dict()
+        for opt,arg in opts:
+            if opt in ('-h','--help'):
+                usage()
+                sys.exit(1)
+            elif opt in ('-r','--run-prefix'):
+                prefix = arg
+            elif opt in ('-a','--petar-options'):
+                options = arg
+            elif opt in ('-p','--petar-command'):
+                command = arg
+            elif opt in ('-s','--dt-soft'):
+                dt_soft = float(arg)
+            elif opt in ('-m','--n-mpi'):
+                n_mpi = int(arg)
+            elif opt in ('-o','--n-omp'):
+                n_omp = int(arg)
+            elif opt in ('-n','--n-core'):
+                n_core = int(arg)
+            elif opt in ('-d','--work-dir'):
+                work_dir = arg
+            elif opt in ('-f','--output-file'):
+                output_file = arg
+            elif opt in ('--theta',):
+                theta_list = [float(x) for x in arg.split(',')]
+            elif opt in ('--dt-range',):
+                k_range = int(arg)
+            elif opt in ('--n-step',):
+                kwargs['n_step'] = int(arg)
+            elif opt in ('--kill-factor',):
+                kwargs['kill_factor'] = float(arg)
+            elif opt in ('--timeout',):
+                kwargs['timeout'] = float(arg)
+            elif opt in ('--use-gpu',):
+                kwargs['use_gpu'] = True
+            else:
+                assert False, "unhandeld option"
+
+    except getopt.GetoptError:
+        print('getopt error!')
+        usage()
+        sys.exit(1)
+
+    if (len(remainder)==0):
+        print('Error, file name not provided')
+        usage()
+        sys.exit(1)
+    filename = remainder[0]
+
+    optimizer = petar.TreeStepOptimizer(filename, command, options, prefix, n_mpi, n_omp, n_core, work_dir, **kwargs)
+    print('commander: ', ' '.join(optimizer.command))
+    print('Number of concurrent runs: ', optimizer.n_parallel)
+
+    best = optimizer.search(dt_soft, theta_list, k_range)
+
+    print('Results of all runs (*: no other run is both faster and more accurate):')
+    optimizer.results.printSummary()
+    optimizer.results.savetxt(output_file)
+    print('Results are saved in file:', output_file)
+
+    for theta, res in best.items():
+        if (res.flag[0]==0):
+            print('Best performance choice: theta: %g tree step: %.14g wallclock time per time unit: %g slowdown energy error: %g' % (theta, res.dt_soft[0], res.cost[0], res.error_sd[0]))
+        else:
+            print('No finished run for theta: %g' % theta)
+    finished = optimizer.results.flag==0
+    if (finished.sum()>0):
+        ibest = np.where(finished)[0][np.argmin(optimizer.results.cost[finished])]
+        print(' '.join(optimizer.command[:-1]), '-s %.14g -T %g' % (optimizer.results.dt_soft[ibest], optimizer.results.theta[ibest]), optimizer.command[-1])
@@ -180,7 +180,8 @@ class PlotLagr:
 
     def plot(self, lagr, tnow):
         nfrac=lagr.initargs['mass_fraction'].size + 1
-        sel = (lagr.time==tnow)
+        sel = np.atleast_1d(lagr.findTimeIndex(tnow))
+        sel = sel[sel>=0]
         for mi in range(nfrac):
             self.ptcls[mi].set_data(lagr.time[sel], lagr.all.r[sel,mi])
         return self.ptcls
@@ -360,8 +361,7 @@ def plotOne(file_path, axe, plots, core, lagr, **kwargs):
 
     pos=np.array([0,0])
     if (data.cm_mode=='core'):
-        sel=(core.time==float(data['t']))
-        pos=core[sel].pos[0]
+        pos=core.atTimes([float(data['t'])]).pos[0]
     xcm, ycm=data.correctCM(plots['xy'].cm_boxsize, pos)
 
     if ('unit_time' in kwargs.keys()):
@@ -505,6 +505,13 @@ def createImage(_path_list, model_list, frame_xsize, frame_ysize, ncol, plot_ite
 
     return n_frame
 
+def createImageShared(_path_list, model_list, frame_xsize, frame_ysize, ncol, plot_item, core_desc, lagr_desc, **kwargs):
+    """ createImage with core and lagr data obtained from shared memory descriptors (petar.shareDict)
+    """
+    core = petar.loadSharedDict(core_desc, copy=False)
+    lagr = petar.loadSharedDict(lagr_desc, copy=False)
+    return createImage(_path_list, model_list, frame_xsize, frame_ysize, ncol, plot_item, core, lagr, **kwargs)
+
 if __name__ == '__main__':
 
     filename='dat.lst'
@@ -521,6 +528,7 @@ if __name__ == '__main__':
     plot_format='mp4'
     n_cpu = 0
     plot_images=True
+    shared_memory=False
 
     pxy = PlotXY()
     pxy_zoom = PlotXY()
@@ -553,6 +561,7 @@ if __name__ == '__main__':
         print("  --interrupt-mode  [S]: no, base, bse: ",data.interrupt_mode)
         print("  --generate-binary [I]: 0: no binary, 1: detect binary by using KDtree (slow), 2: read single and binary data generated by petar.data.process: ", data.generate_binary)
         print("  --n-cpu       [I]: number of CPU processors to use: all CPU cores")
+        print("  --shared-memory  : share core and Lagrangian data with all processes through shared memory instead of copying them to each process")
         print("  --lum-min     [F]: minimum lumonisity: ",phr.lum_min)
         print("  --lum-max     [F]: maximum lumonisity: ",phr.lum_max)
         print("  --temp-min    [F]: minimum temperature: ",phr.temp_min)
@@ -593,7 +602,7 @@ if __name__ == '__main__':
 
     try:
         shortargs = 's:f:R:z:o:G:l:L:iHbh'
-        longargs = ['help','n-cpu=','lum-min=','lum-max=','temp-min=','temp-max=','semi-min=','semi-max=','ecc-min=','ecc-max=','rlagr-min=','rlagr-max=','rlagr-scale=','time-min=','time-max=','interrupt-mode=','xcol=','ycol=','mcol=','unit-length=','unit-time=','skiprows=','generate-binary=','plot-ncols=','plot-xsize=','plot-ysize=','suppress-images','format=','cm-mode=','core-file=','n-layer-cross=','n-layer-point=','layer-alpha=','marker-scale=','cm-boxsize=','compare-in-column']
+        longargs = ['help','n-cpu=','lum-min=','lum-max=','temp-min=','temp-max=','semi-min=','semi-max=','ecc-min=','ecc-max=','rlagr-min=','rlagr-max=','rlagr-scale=','time-min=','time-max=','interrupt-mode=','xcol=','ycol=','mcol=','unit-length=','unit-time=','skiprows=','generate-binary=','plot-ncols=','plot-xsize=','plot-ysize=','suppress-images','format=','cm-mode=','core-file=','n-layer-cross=','n-layer-point=','layer-alpha=','marker-scale=','cm-boxsize=','compare-in-column','shared-memory']
         opts,remainder= getopt.getopt( sys.argv[1:], shortargs, longargs)
 
         kwargs=dict()
@@ -695,6 +704,8 @@ if __name__ == '__main__':
                 plot_format = arg
             elif opt in ('--compare-in-column'):
                 kwargs['compare_in_column'] = True
+            elif opt in ('--shared-memory',):
+                shared_memory = True
             else:
                 assert False, "unhandeld option"
 
@@ -734,6 +745,10 @@ if __name__ == '__main__':
     if (plot_images):
         if (n_cpu==int(0)):
             n_cpu = mp.cpu_count()
+        if (shared_memory):
+            petar.initialSharedMemory()
+            core_desc = petar.shareDict(core)
+            lagr_desc = petar.shareDict(lagr)
         pool = mp.Pool(n_cpu)
         
         n_files=len(path_list)
@@ -746,12 +761,19 @@ if __name__ == '__main__':
         results=[None]*n_cpu
         for rank in range(n_cpu):
             #createImage(file_part[rank], model_list, frame_xsize, frame_ysize, ncol, plot_item, core, lagr, **kwargs)
-            results[rank]=pool.apply_async(createImage, (file_part[rank], model_list, frame_xsize, frame_ysize, ncol, plot_item, core, lagr), kwargs)
+            if (shared_memory):
+                results[rank]=pool.apply_async(createImageShared, (file_part[rank], model_list, frame_xsize, frame_ysize, ncol, plot_item, core_desc, lagr_desc), kwargs)
+            else:
+                results[rank]=pool.apply_async(createImage, (file_part[rank], model_list, frame_xsize, frame_ysize, ncol, plot_item, core, lagr), kwargs)
 
         # Step 3: Don't forget to close
         pool.close()
         pool.join()
 
+        if (shared_memory):
+            for desc in list(core_desc.values()) + list(lagr_desc.values()):
+                if (desc[0]=='shared'): petar.unlinkSharedDictNpArrayMix(desc[1])
+
         png_list = [path_list[i]+'.png' for i in range(n_files)]
         create_movie(png_list, fps, output_file+'.'+plot_format)
 
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+import sys
+import petar
+import getopt
+
+if __name__ == '__main__':
+
+    pack_filename='data.pack'
+    n_cpu=0
+    companions=True
+    level=6
+
+    def usage():
+        print("Pack snapshots and their single/binary files (generated by petar.data.process) into one indexed file")
+        print("The snapshots are read and compressed in parallel, each file is stored as a block of separately compressed columns.")
+        print("The index (file id, time, number of rows, byte offset) is stored at the end of the pack file for random access by time.")
+        print("The snapshots can be read by petar.SnapshotPack([pack filename]).load(time=[time]).")
+        print("The list of packed paths ([pack filename].[file id]) is written to [pack filename].lst,")
+        print("which can be used by petar.data.process instead of the original snapshot list.")
+        print("Usage: petar.data.pack [options] snapshot_list_filename")
+        print("snapshot_list_filename: A list of snapshot data path, each line for one snapshot (e.g. generated by petar.data.gether)")
+        print("option:")
+        print("  -h(--help): help")
+        print("  -o(--output): pack filename (data.pack)")
+        print("  -n(--n-cpu): number of CPU processes for reading and compressing snapshots (all cores)")
+        print("  -l(--level): zlib compression level 0-9 (6)")
+        print("  --no-companions: do not pack the single and binary files of snapshots")
+
+    try:
+        shortargs = 'o:n:l:h'
+        longargs = ['output=','n-cpu=','level=','no-companions','help']
+        opts,remainder= getopt.getopt( sys.argv[1:], shortargs, longargs)
+
+        for opt,arg in opts:
+            if opt in ('-h','--help'):
+                usage()
+                sys.exit(1)
+            elif opt in ('-o','--output'):
+                pack_filename = arg
+            elif opt in ('-n','--n-cpu'):
+                n_cpu = int(arg)
+            elif opt in ('-l','--level'):
+                level = int(arg)
+            elif opt in ('--no-companions',):
+                companions = False
+            else:
+                assert False, "unhandeld option"
+
+    except getopt.GetoptError:
+        print('getopt error!')
+        usage()
+        sys.exit(1)
+
+    if (len(remainder)==0):
+        print('Error, snapshot list filename not provided')
+        usage()
+        sys.exit(1)
+    filename = remainder[0]
+    path_list = [path for path in open(filename,'r').read().splitlines() if path.strip()!='']
+    print('Number of snapshots:', len(path_list))
+
+    pack = petar.packSnapshots(path_list, pack_filename, n_cpu, companions, level)
+    with open(pack_filename+'.lst','w') as f:
+        for path in pack.getPathList(): f.write(path+'\n')
+    print('Number of blocks:', pack.index.size, ', pack file:', pack_filename, ', packed path list:', pack_filename+'.lst')
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+
+import sys
+import petar
+import getopt
+
+if __name__ == '__main__':
+
+    store_path='trajectory'
+    n_cpu=0
+    chunk_size=1000
+
+    def usage():
+        print("Transpose snapshots into a particle-major trajectory store for fast access of time series of individual particles")
+        print("Particles are grouped into chunks by id // chunk_size, each chunk is sorted by id and time and saved as a numpy binary file with an id index.")
+        print("The time series of particles can be read by petar.TrajectoryStore([store path]).getTrajectory([ids]).")
+        print("Usage: petar.data.trajectory [options] snapshot_list_filename")
+        print("snapshot_list_filename: A list of snapshot data path, each line for one snapshot (e.g. generated by petar.data.gether)")
+        print("option:")
+        print("  -h(--help): help")
+        print("  -o(--output-path): directory of the store (trajectory)")
+        print("  -i(--interrupt-mode): no: no interruption; base: PeTar base interruption; bse: SSE/BSE stellar evolution (no)")
+        print("  -n(--n-cpu): number of CPU threads for reading snapshots (all threads)")
+        print("  -c(--chunk-size): id range of one chunk (1000)")
+
+    try:
+        shortargs = 'o:i:n:c:h'
+        longargs = ['output-path=','interrupt-mode=','n-cpu=','chunk-size=','help']
+        opts,remainder= getopt.getopt( sys.argv[1:], shortargs, longargs)
+
+        kwargs=dict()
+        for opt,arg in opts:
+            if opt in ('-h','--help'):
+                usage()
+                sys.exit(1)
+            elif opt in ('-o','--output-path'):
+                store_path = arg
+            elif opt in ('-i','--interrupt-mode'):
+                kwargs['interrupt_mode'] = arg
+            elif opt in ('-n','--n-cpu'):
+                n_cpu = int(arg)
+            elif opt in ('-c','--chunk-size'):
+                chunk_size = int(arg)
+            else:
+                assert False, "unhandeld option"
+
+    except getopt.GetoptError:
+        print('getopt error!')
+        usage()
+        sys.exit(1)
+
+    filename = remainder[0]
+    path_list = [path for path in open(filename,'r').read().splitlines() if path.strip()!='']
+    print('Number of snapshots:', len(path_list))
+
+    store = petar.createTrajectoryStore(path_list, store_path, n_cpu, chunk_size, **kwargs)
+    print('Number of particles:', store.index.size, ', store path:', store_path)